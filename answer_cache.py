@@ -0,0 +1,247 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+import city_matcher
+import dataset_store
+import intent_router
+import tracing
+
+# ====== Konfigurasi ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "answers.sqlite"))
+INDEX_DIR = os.getenv("TRAVEL_INDEX_DIR", os.path.join(BASE_DIR, "faiss_travel_assistant"))
+ENABLED = os.getenv("ANSWER_CACHE", "1") == "1"
+TTL = float(os.getenv("ANSWER_CACHE_TTL", str(6 * 60 * 60)))
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = 5000
+
+# Jawaban yang bergantung pada waktu/teks bebas tidak pernah di-cache
+NO_CACHE_INTENTS = {"get_current_date", "get_translate_response"}
+
+
+class CacheKey(NamedTuple):
+    city: str       # kota ternormalisasi ("" jika tidak ada)
+    intent: str
+    text: str       # pertanyaan ternormalisasi dengan nama kota/moda di-mask
+    exact: str      # hash kunci exact
+
+
+class CacheHit(NamedTuple):
+    answer: str
+    kind: str       # "exact" / "semantic"
+    similarity: float
+    saved_llm_calls: int
+    saved_s: float
+
+
+def make_key(question: str, intent: str, confidence: float, city: str = None, gazetteer=None) -> CacheKey:
+    city_key = city_matcher.normalize(city or "")
+    text = " ".join(city_matcher.normalize(intent_router.mask_entities(question, gazetteer)).split())
+    if intent in intent_router.CITY_INTENTS and confidence >= intent_router.CONFIDENCE_THRESHOLD and city_key:
+        # Intent spesifik per kota: (kota, intent) saja sudah cukup
+        raw = f"{city_key}\x00{intent}"
+    else:
+        # Intent "agent" terlalu umum, jadi teks pertanyaan ikut jadi kunci
+        raw = f"{city_key}\x00{intent}\x00{text}"
+    return CacheKey(city_key, intent, text, hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+
+# ====== Versi Data (CSV dataset + index FAISS) ======
+_hash_memo = {}   # path -> ((size, mtime_ns), sha1 isi)
+_hash_lock = threading.Lock()
+
+
+def _content_hash(path: str) -> str:
+    # Isi file hanya di-hash ulang jika ukuran/mtime berubah
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        memo = _hash_memo.get(path)
+        if memo is not None and memo[0] == stamp:
+            return memo[1]
+    digest = dataset_store.file_version(path)
+    with _hash_lock:
+        _hash_memo[path] = (stamp, digest)
+    return digest
+
+
+def data_version(dataset_dir: str = dataset_store.DATASET_DIR, index_dir: str = INDEX_DIR) -> str:
+    paths = [dataset_store.csv_path(name, dataset_dir) for name in dataset_store.SCHEMAS]
+    if os.path.isdir(index_dir):
+        paths += [os.path.join(index_dir, name) for name in sorted(os.listdir(index_dir))]
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.isfile(path):
+            digest.update(f"{os.path.basename(path)}:{_content_hash(path)};".encode())
+    return digest.hexdigest()[:12]
+
+
+# ====== Cache Jawaban ======
+class AnswerCache:
+    def __init__(self, embeddings=None, db_path: str = DEFAULT_CACHE_PATH, ttl: float = TTL,
+                 threshold: float = SIMILARITY_THRESHOLD, max_entries: int = MAX_ENTRIES,
+                 dataset_dir: str = dataset_store.DATASET_DIR, index_dir: str = INDEX_DIR):
+        self.embeddings = embeddings   # None = hanya pencocokan exact
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dataset_dir = dataset_dir
+        self.index_dir = index_dir
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "invalidated": 0,
+                      "saved_llm_calls": 0, "saved_s": 0.0}
+        self._version = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "id INTEGER PRIMARY KEY, scope TEXT, exact_key TEXT, city TEXT, intent TEXT, question TEXT, "
+            "vector BLOB, answer TEXT, version TEXT, created_at REAL, llm_calls INTEGER, latency_s REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_exact ON answers(scope, exact_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_city ON answers(scope, city)")
+        self._conn.commit()
+
+    # ====== Statistik ======
+    def get_stats(self) -> dict:
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            total = hits + self.stats["misses"]
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            return dict(self.stats, hits=hits, hit_rate=(hits / total) if total else 0.0,
+                        entries=entries, version=self._version)
+
+    def _count(self, scope: str, result: str, hit: CacheHit = None):
+        tracing.incr("travel_answer_cache_lookups_total", scope=scope, result=result)
+        if hit is not None:
+            tracing.incr("travel_answer_cache_saved_llm_calls_total", hit.saved_llm_calls, scope=scope)
+            tracing.incr("travel_answer_cache_saved_seconds_total", hit.saved_s, scope=scope)
+
+    # ====== Internal ======
+    def _check_version(self) -> str:
+        # Entri dari versi dataset/index lama dibuang begitu versi berubah
+        version = data_version(self.dataset_dir, self.index_dir)
+        with self._lock:
+            if version != self._version:
+                cursor = self._conn.execute("DELETE FROM answers WHERE version != ?", (version,))
+                self._conn.commit()
+                self.stats["invalidated"] += max(cursor.rowcount, 0)
+                self._version = version
+        return version
+
+    def _embed(self, text: str) -> np.ndarray:
+        # Gagal embed = cache hanya bekerja exact; jawaban tetap dihitung normal
+        if self.embeddings is None:
+            return None
+        try:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        except Exception:
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _hit(self, row, kind: str, similarity: float, started: float) -> CacheHit:
+        answer, llm_calls, latency_s = row
+        saved_s = max(0.0, float(latency_s or 0.0) - (time.perf_counter() - started))
+        with self._lock:
+            self.stats[f"{kind}_hits"] += 1
+            self.stats["saved_llm_calls"] += int(llm_calls or 0)
+            self.stats["saved_s"] += saved_s
+        return CacheHit(answer, kind, similarity, int(llm_calls or 0), saved_s)
+
+    # ====== API ======
+    def lookup(self, scope: str, key: CacheKey):
+        if key.intent in NO_CACHE_INTENTS:
+            return None
+        started = time.perf_counter()
+        version = self._check_version()
+        fresh_after = time.time() - self.ttl
+        with tracing.span("answer_cache", scope=scope) as cache_span:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT answer, llm_calls, latency_s FROM answers "
+                    "WHERE scope = ? AND exact_key = ? AND version = ? AND created_at > ? "
+                    "ORDER BY created_at DESC LIMIT 1", (scope, key.exact, version, fresh_after)).fetchone()
+            if row is not None:
+                hit = self._hit(row, "exact", 1.0, started)
+            else:
+                hit = self._lookup_semantic(scope, key, version, fresh_after, started)
+            cache_span.set(result=hit.kind if hit else "miss")
+        if hit is None:
+            with self._lock:
+                self.stats["misses"] += 1
+        self._count(scope, hit.kind if hit else "miss", hit)
+        return hit
+
+    def _lookup_semantic(self, scope: str, key: CacheKey, version: str, fresh_after: float, started: float):
+        if self.embeddings is None:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector FROM answers WHERE scope = ? AND city = ? AND version = ? AND created_at > ? "
+                "AND vector IS NOT NULL", (scope, key.city, version, fresh_after)).fetchall()
+        if not rows:
+            return None
+        # Kota sudah sama (filter SQL), jadi kemiripan hanya membandingkan pola pertanyaan
+        query = self._embed(key.text)
+        if query is None:
+            return None
+        matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        if float(similarities[best]) < self.threshold:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, llm_calls, latency_s FROM answers WHERE id = ?", (rows[best][0],)).fetchone()
+        return self._hit(row, "semantic", float(similarities[best]), started)
+
+    def store(self, scope: str, key: CacheKey, answer: str, llm_calls: int = 1, latency_s: float = 0.0):
+        if key.intent in NO_CACHE_INTENTS or not answer:
+            return
+        version = self._check_version()
+        vector = self._embed(key.text)
+        vector = vector.tobytes() if vector is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (scope, exact_key, city, intent, question, vector, answer, version, "
+                "created_at, llm_calls, latency_s) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, key.exact, key.city, key.intent, key.text, vector, answer, version,
+                 time.time(), int(llm_calls), float(latency_s)))
+            # Kedaluwarsa dulu, lalu batas ukuran (entri terlama dibuang)
+            self._conn.execute("DELETE FROM answers WHERE created_at <= ?", (time.time() - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY created_at DESC LIMIT ?)",
+                (self.max_entries,))
+            self._conn.commit()
+            self.stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(embeddings=None) -> AnswerCache:
+    # Satu cache per proses, dibagi semua sesi; None jika dimatikan (ANSWER_CACHE=0)
+    global _cache
+    if not ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(embeddings)
+        elif embeddings is not None and _cache.embeddings is None:
+            _cache.embeddings = embeddings
+        return _cache
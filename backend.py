@@ -0,0 +1,180 @@
+import os
+import json
+import uuid
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import answer_cache
+import chat_client
+import chat_service
+import hot_reload
+import resources
+import session_memory
+import streaming
+import tools
+import tracing
+import upstream
+from embedding_cache import MicroBatchedEmbeddings
+
+# ====== Konfigurasi ======
+HOST = os.getenv("BACKEND_HOST", "127.0.0.1")
+PORT = int(os.getenv("BACKEND_PORT", "8000"))
+WORKERS = int(os.getenv("BACKEND_WORKERS", "64"))                     # thread untuk turn (tool/agent sinkron)
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))  # 0 = tanpa micro-batching
+EMBED_BATCH_SIZE = 96
+# Lebih lama dari keepalive klien httpx (5 s), supaya koneksi tidak ditutup server saat klien baru memakainya lagi
+KEEP_ALIVE_S = 75
+
+
+# ====== Resource Bersama ======
+def create_service(cohere_api_key: str, batch_window_ms: float = EMBED_BATCH_WINDOW_MS) -> chat_service.ChatService:
+    # Satu embeddings (di-batch lintas sesi), satu FAISS/docstore dan satu retriever untuk semua sesi
+    limiter = upstream.get_limiter()   # dibagi dengan lapisan upstream (Gemini, Cohere, Wikipedia)
+    embeddings = resources.create_embeddings(cohere_api_key)
+    if batch_window_ms > 0:
+        embeddings = MicroBatchedEmbeddings(embeddings, window=batch_window_ms / 1000, max_batch=EMBED_BATCH_SIZE,
+                                            max_in_flight=limiter.limits["cohere"])
+    # Snapshot dataset/index dipantau dan ditukar di background (HOT_RELOAD=1)
+    reloader = hot_reload.start(embeddings)
+    return chat_service.ChatService(embeddings, answers=answer_cache.get_cache(embeddings), limiter=limiter,
+                                    reloader=reloader, session_store=session_memory.get_store())
+
+
+# ====== Event Stream per Turn ======
+# View chat_service yang mengirim token/langkah agent ke antrean asyncio (dari thread worker)
+class QueueView(chat_service.TurnView):
+    def __init__(self, loop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+
+    def emit(self, event: dict):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    def show_user(self, message: str):
+        self.emit({"type": "user", "text": message})
+
+    def new_sink(self, started: float = None):
+        self.emit({"type": "sink"})
+        return streaming.CallbackSink(lambda token: self.emit({"type": "token", "text": token}),
+                                      on_close=lambda: self.emit({"type": "sink_close"}), started=started)
+
+    def step(self, text: str):
+        self.emit({"type": "step", "text": text})
+
+    def finish_steps(self):
+        self.emit({"type": "finish_steps"})
+
+
+def _run_turn(service, session_id: str, message: str, last_city: str, google_api_key: str, view):
+    trace = tracing.begin_turn(session=session_id)
+    with tracing.activate(trace):
+        result = service.handle(session_id, message, last_city, google_api_key, view)
+    tracing.end_turn(trace)
+    return result
+
+
+# ====== Endpoint ======
+async def chat(request):
+    body = await request.json()
+    service = request.app.state.service
+    session_id = body.get("session_id") or uuid.uuid4().hex
+    google_api_key = request.headers.get("x-google-api-key") or os.getenv("GOOGLE_API_KEY", "")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    view = QueueView(loop, queue)
+    future = loop.run_in_executor(request.app.state.pool, _run_turn, service, session_id, body["message"],
+                                  body.get("last_city"), google_api_key, view)
+    # Dijadwalkan setelah semua event dari thread worker, jadi None selalu menjadi event terakhir
+    future.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def events():
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+        try:
+            result = future.result()
+        except Exception as e:
+            yield json.dumps({"type": "error", "message": str(e)}, ensure_ascii=False) + "\n"
+            return
+        yield json.dumps({
+            "type": "done",
+            "session_id": session_id,
+            "path": result.path,
+            "version": result.version,
+            "route": result.route,
+            "metrics": result.metrics,
+            "entries": [chat_client.encode_entry(role, msg) for role, msg in result.entries],
+        }, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def reset_session(request):
+    request.app.state.service.reset(request.path_params["session_id"])
+    return JSONResponse({"ok": True})
+
+
+async def resolve_table(request):
+    body = await request.json()
+    ref = chat_client.decode_entry({"role": "Table", "table": body})[1]
+    df = await asyncio.get_running_loop().run_in_executor(request.app.state.pool, tools.resolve_table, ref)
+    if df is None:
+        return Response(status_code=204)
+    return Response(chat_client.encode_table(df), media_type="application/json")
+
+
+async def stats(request):
+    return JSONResponse(chat_client.LocalClient(request.app.state.service).get_stats())
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "version": tools.current().version})
+
+
+async def metrics(request):
+    return PlainTextResponse(tracing.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def create_app(service: chat_service.ChatService = None, workers: int = WORKERS) -> Starlette:
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn")
+        if service is None:
+            load_dotenv()
+            app.state.service = await asyncio.get_running_loop().run_in_executor(
+                app.state.pool, create_service, os.environ["COHERE_API_KEY"])
+        else:
+            app.state.service = service
+        yield
+        if app.state.service.reloader is not None:
+            app.state.service.reloader.stop()
+        app.state.pool.shutdown(wait=False)
+
+    return Starlette(routes=[
+        Route("/chat", chat, methods=["POST"]),
+        Route("/sessions/{session_id}/reset", reset_session, methods=["POST"]),
+        Route("/tables/resolve", resolve_table, methods=["POST"]),
+        Route("/stats", stats),
+        Route("/health", health),
+        Route("/metrics", metrics),
+    ], lifespan=lifespan)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend asyncio travel assistant (app.py sebagai klien tipis).")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(workers=args.workers), host=args.host, port=args.port, timeout_keep_alive=KEEP_ALIVE_S)
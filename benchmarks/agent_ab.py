@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Pertanyaan multi-tool yang jatuh ke agent; {city} diisi kota dari dataset
+QUESTIONS = [
+    "ceritakan {city}, lalu cek hotel dan promo untuk liburan ke sana",
+    "liburan ke {city}: info tujuan, jadwal transport dan hotel yang tersedia",
+    "apa menariknya {city}? sekalian cari hotel, transport dan promo",
+]
+
+
+def summarize(samples_s: list) -> dict:
+    if not samples_s:
+        return {"n": 0}
+    arr = np.asarray(samples_s) * 1000
+    return {"n": len(arr), "mean_ms": float(arr.mean()), "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)), "max_ms": float(arr.max())}
+
+
+# ====== Satu Mode Agent ======
+def run_mode(mode: str, turns: int, rng: random.Random) -> dict:
+    import intent_router
+    import tools
+    from chat_service import ChatService, TurnView
+
+    service = ChatService(answers=None, agent_mode=mode)
+    cities = tools.gazetteer.cities()
+    route = intent_router.RouteDecision("destination", 0.0, {}, None, "bench")
+    wall, first_token, llm_calls, tool_calls, paths = [], [], [], [], {}
+    for i in range(turns):
+        session = service.session(f"ab-{mode}-{i}")
+        message = rng.choice(QUESTIONS).format(city=rng.choice(cities))
+        with tools.pinned():
+            path, metrics = service.run_agent(session, [], message, route, "bench", TurnView())
+        paths[path] = paths.get(path, 0) + 1
+        wall.append(metrics["total_s"])
+        llm_calls.append(metrics["llm_calls"])
+        tool_calls.append(metrics["tool_calls"] or 0)
+        if metrics["first_llm_token_s"] is not None:
+            first_token.append(metrics["first_llm_token_s"])
+    return {"mode": mode, "turns": turns, "paths": paths, "wall": summarize(wall),
+            "first_llm_token": summarize(first_token), "mean_llm_calls": float(np.mean(llm_calls)),
+            "mean_tool_calls": float(np.mean(tool_calls))}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="A/B agent ReAct vs rencana-lalu-eksekusi: panggilan LLM per turn dan wall time (offline).")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=1000, help="Baris dataset sintetis")
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--wiki-latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="agent_ab_results.json")
+    args = parser.parse_args()
+
+    from benchmarks import fakes, synthetic_data
+
+    with tempfile.TemporaryDirectory(prefix="travel-ab-") as work_root:
+        synthetic_data.generate(work_root, args.rows, args.seed)
+        # Harus di-set sebelum tools diimpor
+        os.environ.update(TRAVEL_DATASET_DIR=work_root, TRAVEL_INDEX_DIR=os.path.join(work_root, "index"),
+                          ANSWER_CACHE="0", SESSION_MEMORY_STORE="0", COHERE_API_KEY="bench")
+        fake = fakes.install(llm_latency_s=args.llm_latency, token_latency_s=args.token_latency,
+                             wiki_latency_s=args.wiki_latency)
+        import build_vectorstore
+        import hot_reload
+        # get_transport_schedule butuh index FAISS di snapshot
+        build_vectorstore.build(full=True)
+        hot_reload.SnapshotReloader(fake["embeddings"]).load_initial()
+        results = {}
+        for mode in ("react", "plan"):
+            result = run_mode(mode, args.turns, random.Random(args.seed))
+            results[mode] = result
+            print(f"   {mode:>5}: {result['mean_llm_calls']:.1f} panggilan LLM, "
+                  f"{result['mean_tool_calls']:.1f} tool per turn, wall p50 {result['wall']['p50_ms']:.0f} ms / "
+                  f"p95 {result['wall']['p95_ms']:.0f} ms, jalur {result['paths']}", file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": vars(args), "modes": results}, f, indent=2)
+    print(f"✅ Hasil benchmark disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import faiss_index  # noqa: E402
+
+DEFAULT_SPECS = "flat,ivf,ivfsq8,ivfpq,hnsw,sq8"
+NPROBES = (1, 4, 16, 64)
+EF_SEARCHES = (16, 64, 256)
+
+
+# ====== Data ======
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    # Campuran gaussian: lebih mirip embedding teks daripada noise seragam
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def vectors_from_index(index_dir: str) -> np.ndarray:
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def make_queries(vectors: np.ndarray, nq: int, seed: int = 1) -> np.ndarray:
+    # Query = dokumen acak + sedikit noise (mirip parafrase dari isi dokumen)
+    rng = np.random.default_rng(seed)
+    base = vectors[rng.choice(len(vectors), nq, replace=len(vectors) < nq)]
+    queries = base + 0.05 * rng.standard_normal(base.shape).astype(np.float32)
+    return np.ascontiguousarray(queries / np.linalg.norm(queries, axis=1, keepdims=True), dtype=np.float32)
+
+
+# ====== Evaluasi ======
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def timed_search(index, queries: np.ndarray, k: int, params=None):
+    # Satu query per panggilan, seperti di aplikasi (bukan batch)
+    found = np.empty((len(queries), k), dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k, params=params)
+        latencies[i] = time.perf_counter() - start
+        found[i] = ids[0]
+    return found, latencies * 1000
+
+
+def sweep(index) -> list:
+    if faiss_index._ivf(index) is not None:
+        return [{"nprobe": n} for n in NPROBES]
+    if isinstance(index, faiss.IndexHNSW):
+        return [{"ef_search": ef} for ef in EF_SEARCHES]
+    return [{}]
+
+
+def evaluate(vectors: np.ndarray, specs: list, nq: int, k: int, train_size: int, nlist: int = None) -> dict:
+    queries = make_queries(vectors, nq)
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    truth, _ = timed_search(flat, queries, k)
+
+    results = []
+    for spec in specs:
+        factory = faiss_index.resolve_factory(spec, vectors.shape[1], len(vectors), nlist=nlist, train_size=train_size)
+        start = time.perf_counter()
+        index, info = faiss_index.build_index(vectors, factory, train_size)
+        build_s = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        for params in sweep(index):
+            search_params = faiss_index.search_parameters(index, **params)
+            found, latency_ms = timed_search(index, queries, k, search_params)
+            results.append(dict(
+                spec=spec, factory=factory, **params,
+                recall=recall_at_k(found, truth),
+                p50_ms=float(np.percentile(latency_ms, 50)),
+                p95_ms=float(np.percentile(latency_ms, 95)),
+                p99_ms=float(np.percentile(latency_ms, 99)),
+                build_s=build_s, train_s=info["train_seconds"], size_mb=size_mb,
+            ))
+    return {"ntotal": int(len(vectors)), "dim": int(vectors.shape[1]), "nq": nq, "k": k, "results": results}
+
+
+def print_table(report: dict):
+    print(f"n={report['ntotal']} dim={report['dim']} nq={report['nq']} recall@{report['k']} vs IndexFlatL2")
+    print(f"{'factory':<16} {'param':>12} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8} {'MB':>8}")
+    for r in report["results"]:
+        param = f"nprobe={r['nprobe']}" if "nprobe" in r else f"ef={r['ef_search']}" if "ef_search" in r else "-"
+        print(f"{r['factory']:<16} {param:>12} {r['recall']:>7.3f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} "
+              f"{r['build_s']:>8.2f} {r['size_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Laporan recall vs latensi tipe index FAISS terhadap baseline flat.")
+    parser.add_argument("--index-dir", help="Pakai vektor dari index yang sudah ada (default: vektor sintetis)")
+    parser.add_argument("--rows", type=int, default=200_000, help="Jumlah vektor sintetis")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--specs", default=DEFAULT_SPECS)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--train-size", type=int, default=faiss_index.TRAIN_SIZE)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    vectors = vectors_from_index(args.index_dir) if args.index_dir else synthetic_vectors(args.rows, args.dim)
+    report = evaluate(vectors, [s.strip() for s in args.specs.split(",") if s.strip()],
+                      args.queries, args.k, args.train_size, args.nlist)
+    print_table(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
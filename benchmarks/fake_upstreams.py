@@ -0,0 +1,156 @@
+import json
+import time
+import random
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Server HTTP lokal yang meniru Gemini (REST v1beta), Cohere (/v1/embed) dan Wikipedia (action API),
+# dengan latensi & error yang bisa diatur saat berjalan. Klien asli (google-generativeai, cohere, requests)
+# diarahkan ke sini lewat GEMINI_API_ENDPOINT / COHERE_BASE_URL / WIKIPEDIA_API_URL.
+
+ANSWER = "Ini jawaban umum dari server pengganti untuk pertanyaan perjalanan Anda."
+
+
+def _vector(text: str, size: int) -> list:
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(size)]
+
+
+class FakeUpstreamServer:
+    def __init__(self, name: str, latency_s: float = 0.0, jitter_s: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, embedding_size: int = 384, seed: int = 42):
+        self.name = name
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.embedding_size = embedding_size
+        self.stats = {"requests": 0, "errors": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def configure(self, **kwargs):
+        # mis. configure(error_rate=1.0) untuk outage, configure(latency_s=5) untuk hulu yang menggantung
+        for key, value in kwargs.items():
+            if not hasattr(self, key):
+                raise AttributeError(key)
+            setattr(self, key, value)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name=f"fake-{self.name}", daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _inject(self) -> int:
+        # Latensi + error acak; mengembalikan status error atau None
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency_s + self._rng.uniform(0, self.jitter_s)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        time.sleep(delay)
+        return self.error_status if failed else None
+
+    # ====== Respons per layanan ======
+    def gemini(self, prompt: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": ANSWER}], "role": "model"}, "finishReason": 1,
+                                "index": 0}],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(ANSWER) // 4,
+                                  "totalTokenCount": (len(prompt) + len(ANSWER)) // 4}}
+
+    def cohere(self, texts: list) -> dict:
+        return {"response_type": "embeddings_by_type", "id": "fake", "texts": texts,
+                "embeddings": {"float": [_vector(text, self.embedding_size) for text in texts]},
+                "meta": {"api_version": {"version": "1"}, "billed_units": {"input_tokens": len(texts)}}}
+
+    def wikipedia(self, params: dict) -> dict:
+        if params.get("list") == "search":
+            return {"query": {"search": [{"ns": 0, "title": params.get("srsearch", "")}]}}
+        title = params.get("titles", "")
+        page = {"pageid": abs(hash(title)) % 100000, "ns": 0, "title": title}
+        if params.get("prop") == "links":
+            page["links"] = []
+        else:
+            sentences = int(params.get("exsentences", 3))
+            page["extract"] = f"{title} adalah sebuah kota di Indonesia. " * sentences
+        return {"batchcomplete": True, "query": {"pages": [page]}}
+
+
+def _handler(fake: FakeUpstreamServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive: pool koneksi klien benar-benar dipakai ulang
+
+        def log_message(self, format, *args):
+            return None
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True   # klien sudah menyerah (timeout)
+
+        def _fail(self, status: int):
+            self._send(status, {"error": {"code": status, "message": f"{fake.name} fake error",
+                                          "status": "UNAVAILABLE"}, "message": f"{fake.name} fake error"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            status = fake._inject()
+            if status:
+                return self._fail(status)
+            if url.path.endswith("/api.php"):
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                return self._send(200, fake.wikipedia(params))
+            self._send(404, {"message": "not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            status = fake._inject()
+            if status:
+                return self._fail(status)
+            if url.path.endswith(":generateContent"):
+                prompt = " ".join(part.get("text", "") for content in body.get("contents", [])
+                                  for part in content.get("parts", []))
+                return self._send(200, fake.gemini(prompt))
+            if url.path.endswith(":streamGenerateContent"):
+                # REST transport membaca stream sebagai satu array JSON
+                return self._send(200, [fake.gemini("")])
+            if url.path.endswith("/embed"):
+                return self._send(200, fake.cohere(body.get("texts", [])))
+            self._send(404, {"message": "not found"})
+
+    return Handler
+
+
+def start_all(**kwargs) -> dict:
+    # Satu server per layanan agar latensi/error bisa diatur terpisah
+    servers = {name: FakeUpstreamServer(name, **kwargs) for name in ("gemini", "cohere", "wikipedia")}
+    urls = {name: server.start() for name, server in servers.items()}
+    return {"servers": servers, "env": {
+        "GEMINI_API_ENDPOINT": urls["gemini"],
+        "COHERE_BASE_URL": urls["cohere"],
+        "WIKIPEDIA_API_URL": urls["wikipedia"] + "/w/api.php",
+    }}
@@ -0,0 +1,228 @@
+import re
+import json
+import time
+import zlib
+import threading
+from typing import Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Pengganti offline untuk Gemini, Cohere dan Wikipedia.
+# Hasilnya deterministik dan latensinya bisa diatur, supaya benchmark bisa dibandingkan antar run.
+
+_TOOL_RESPONSE_RE = re.compile(r"TOOL RESPONSE", re.I)
+_CITY_RE = re.compile(r"Untuk ([^,]+),")
+_QUESTION_RE = re.compile(r"Pertanyaan: (.*)")
+_USER_INPUT_RE = re.compile(r"NOTHING else\):\s*(.*)\Z", re.S)   # akhir template agent chat-conversational
+# Kata kunci pertanyaan -> tool yang dipanggil (urut); tanpa kata kunci: get_destination_info
+KEYWORD_TOOLS = [(("ceritakan", "menarik", "info tujuan"), "get_destination_info"),
+                 (("transport",), "get_transport_schedule"), (("hotel",), "get_hotel_availability"),
+                 (("promo",), "get_promo_by_city")]
+
+
+def needed_tools(question: str) -> list:
+    question = question.lower()
+    needed = [tool for words, tool in KEYWORD_TOOLS if any(word in question for word in words)]
+    return needed or ["get_destination_info"]
+
+
+def _chunks(text: str, size: int = 12) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# ====== Chat Model ======
+class FakeChatModel(BaseChatModel):
+    latency_s: float = 0.0          # jeda sebelum token pertama
+    token_latency_s: float = 0.0    # jeda per potongan token saat streaming
+    tool_first: bool = True         # langkah pertama memanggil tool, lalu Final Answer
+    streaming: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        self.calls += 1
+        texts = [m.content if isinstance(m.content, str) else json.dumps(m.content) for m in messages] or [""]
+        text = texts[-1]
+        # Pertanyaan = pesan user terakhir yang bukan hasil tool; langkah agent ReAct (aksi AI + TOOL RESPONSE)
+        # ditambahkan setelahnya
+        asked_at = max((i for i, (m, t) in enumerate(zip(messages, texts))
+                        if m.type == "human" and not _TOOL_RESPONSE_RE.search(t)), default=0)
+        question = texts[asked_at]
+        city_match = _CITY_RE.search(question)
+        city = city_match.group(1) if city_match else "Surabaya"
+        if "xfailx" in text:
+            return "jawaban tanpa format JSON"  # memicu fallback Gemini di app.py
+        if '{"calls"' in text:
+            # Prompt rencana plan_agent: semua tool sekaligus
+            asked = _QUESTION_RE.search(text)
+            calls = [{"tool": tool, "input": f"location: {city}"} for tool in needed_tools(asked.group(1) if asked else "")]
+            return f"```json\n{json.dumps({'calls': calls}, ensure_ascii=False)}\n```"
+        if "Hasil tool:" in text:
+            # Prompt sintesis plan_agent: teks biasa
+            return f"Berikut ringkasan perjalanan ke {city}: tempat wisata, cuaca dan transportasi umum."
+        user_input = _USER_INPUT_RE.search(question)
+        needed = needed_tools(user_input.group(1) if user_input else question)
+        done = sum(1 for t in texts[asked_at + 1:] if _TOOL_RESPONSE_RE.search(t))
+        if self.tool_first and done < len(needed):
+            # ReAct: satu tool per round trip LLM
+            action = {"action": needed[done], "action_input": f"location: {city}"}
+        else:
+            action = {"action": "Final Answer",
+                      "action_input": f"Berikut ringkasan perjalanan ke {city}: tempat wisata, cuaca dan transportasi umum."}
+        return f"```json\n{json.dumps(action, ensure_ascii=False)}\n```"
+
+    def _usage(self, messages, text: str) -> dict:
+        # Perkiraan kasar: satu token per kata
+        prompt = sum(len(str(m.content).split()) for m in messages)
+        completion = len(text.split())
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_s)
+        text = self._reply(messages)
+        time.sleep(self.token_latency_s * len(_chunks(text)))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_s)
+        text = self._reply(messages)
+        pieces = _chunks(text)
+        for i, piece in enumerate(pieces):
+            if self.token_latency_s:
+                time.sleep(self.token_latency_s)
+            usage = self._usage(messages, text) if i == len(pieces) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+
+# ====== Embeddings ======
+class FakeEmbeddings(Embeddings):
+    def __init__(self, size: int = 384, latency_s: float = 0.0, per_text_latency_s: float = 0.0):
+        self.size = size
+        self.latency_s = latency_s
+        self.per_text_latency_s = per_text_latency_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> list:
+        # Bag-of-words di-hash: teks dengan kata yang sama menghasilkan vektor yang mirip
+        vec = np.zeros(self.size, dtype=np.float32)
+        for token in str(text).lower().split():
+            h = zlib.crc32(token.encode("utf-8"))
+            vec[h % self.size] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s + self.per_text_latency_s * len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+        return self._vector(text)
+
+    def embed(self, texts: List[str], *, input_type: str = None) -> List[List[float]]:
+        # Sama seperti CohereEmbeddings.embed: satu request untuk banyak teks
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s + self.per_text_latency_s * len(texts))
+        return [self._vector(t) for t in texts]
+
+
+# ====== google.generativeai ======
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    latency_s = 0.0
+    token_latency_s = 0.0
+    calls = 0
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", **kwargs):
+        self.model_name = model_name
+
+    def _answer(self, prompt: str) -> str:
+        if "Tiga tempat terkenal" in prompt:
+            return ("**Tempat terkenal:**\n- Monumen Kota\n- Taman Kota\n- Museum Kota\n"
+                    "**Makanan khas:**\n- Soto\n- Rawon\n- Sate\n"
+                    "**Mall terbaik:**\n- Mall Satu\n- Mall Dua\n- Mall Tiga\n"
+                    "**Restoran rekomendasi:**\n- Resto A\n- Resto B\n- Resto C")
+        return "Ini jawaban umum dari model pengganti untuk pertanyaan perjalanan Anda."
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        type(self).calls += 1
+        time.sleep(self.latency_s)
+        text = self._answer(str(prompt))
+        if not stream:
+            time.sleep(self.token_latency_s * len(_chunks(text)))
+            return _Chunk(text)
+
+        def _iter():
+            for piece in _chunks(text):
+                if self.token_latency_s:
+                    time.sleep(self.token_latency_s)
+                yield _Chunk(piece)
+        return _iter()
+
+
+# ====== Wikipedia ======
+class WikipediaStub:
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def summary(self, title, sentences: int = 3, auto_suggest: bool = True, **kwargs) -> str:
+        self.calls += 1
+        time.sleep(self.latency_s)
+        return f"{title} adalah sebuah kota di Indonesia. " * sentences
+
+    def set_lang(self, lang: str):
+        return None
+
+
+def install(llm_latency_s: float = 0.0, token_latency_s: float = 0.0, embed_latency_s: float = 0.0,
+            wiki_latency_s: float = 0.0, embedding_size: int = 384) -> dict:
+    # Pasang semua pengganti ke modul aplikasi; dipanggil sebelum app/tools/build dijalankan
+    import google.generativeai as genai
+    import resources
+    import upstream
+    import build_vectorstore
+
+    embeddings = FakeEmbeddings(size=embedding_size, latency_s=embed_latency_s)
+    wiki = WikipediaStub(latency_s=wiki_latency_s)
+    FakeGenerativeModel.latency_s = llm_latency_s
+    FakeGenerativeModel.token_latency_s = token_latency_s
+
+    chat_models = []
+
+    def chat_factory(**kwargs):
+        model = FakeChatModel(latency_s=llm_latency_s, token_latency_s=token_latency_s,
+                              streaming=bool(kwargs.get("streaming")))
+        chat_models.append(model)
+        return model
+
+    resources.ChatGoogleGenerativeAI = chat_factory
+    resources.CohereEmbeddings = lambda **kwargs: embeddings
+    build_vectorstore.CohereEmbeddings = lambda **kwargs: embeddings
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.configure = lambda **kwargs: None
+    upstream._gemini_models.clear()
+    upstream.wikipedia_client = wiki
+    return {"embeddings": embeddings, "wikipedia": wiki, "generative_model": FakeGenerativeModel,
+            "chat_models": chat_models}
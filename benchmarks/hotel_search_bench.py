@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hotel_search import HotelQuery, HotelSearchIndex  # noqa: E402
+from table_index import TableIndex  # noqa: E402
+from benchmarks.synthetic_data import FACILITIES  # noqa: E402
+
+CALENDAR_START = np.datetime64("2025-06-01", "D")
+
+
+# ====== Data ======
+# Ketersediaan padat (bukan 1-7 malam seperti synthetic_data.hotels): tiap hotel punya peluang kosong per hari
+# sendiri, jadi bitmap benar-benar terisi sepanjang kalender
+def synthetic_hotels(n: int, days: int, cities: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    occupancy = rng.uniform(0.2, 0.9, n)
+    rows, day_offsets = [], []
+    for start in range(0, n, 1 << 15):
+        stop = min(start + (1 << 15), n)
+        free = rng.random((stop - start, days)) > occupancy[start:stop, None]
+        r, d = np.nonzero(free)
+        rows.append(r + start)
+        day_offsets.append(d)
+    rows, day_offsets = np.concatenate(rows), np.concatenate(day_offsets)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))]).astype(np.int32)
+    epoch_days = (CALENDAR_START.astype(np.int64) + day_offsets).astype(np.int32)
+    available = pa.ListArray.from_arrays(pa.array(offsets), pa.array(epoch_days).cast(pa.date32()))
+
+    has_facility = rng.random((n, len(FACILITIES))) < 0.45
+    fac_rows, fac_cols = np.nonzero(has_facility)
+    fac_offsets = np.concatenate([[0], np.cumsum(has_facility.sum(axis=1))]).astype(np.int32)
+    facilities = pa.ListArray.from_arrays(pa.array(fac_offsets), pa.array(np.array(FACILITIES)[fac_cols]))
+
+    df = pd.DataFrame({
+        "location": pd.Categorical([f"Kota {i}" for i in rng.integers(0, cities, n)]),
+        "price_per_night": rng.integers(200_000, 2_500_000, n).astype(np.int32),
+        "rating": np.round(rng.uniform(2.5, 5.0, n), 1).astype(np.float32),
+        "facilities": pd.Series(pd.arrays.ArrowExtensionArray(facilities)),
+        "available_dates": pd.Series(pd.arrays.ArrowExtensionArray(available)),
+    })
+    return df, (rows, day_offsets), has_facility
+
+
+def random_queries(rng, nq: int, days: int, cities: int) -> list:
+    queries = []
+    for i in range(nq):
+        check_in = int(rng.integers(0, days - 7))
+        nights = int(rng.integers(1, 5))
+        facilities = tuple(rng.choice(FACILITIES, int(rng.integers(0, 3)), replace=False))
+        queries.append(HotelQuery(
+            location=f"Kota {rng.integers(0, cities)}" if i % 2 else None,   # separuh tanpa kota (seluruh tabel)
+            check_in=str(CALENDAR_START + check_in), check_out=str(CALENDAR_START + check_in + nights),
+            max_price=float(rng.integers(400_000, 2_500_000)), facilities=facilities,
+            min_rating=float(rng.choice([0, 3.5, 4.0, 4.5]))))
+    return queries
+
+
+# ====== Pembanding: scan penuh atas tanggal yang diratakan ======
+def brute_force(df, exploded, has_facility, query: HotelQuery, k: int) -> np.ndarray:
+    rows, day_offsets = exploded
+    first = int((np.datetime64(query.check_in, "D") - CALENDAR_START).astype(int))
+    last = int((np.datetime64(query.check_out, "D") - CALENDAR_START).astype(int))
+    in_range = (day_offsets >= first) & (day_offsets < last)
+    keep = np.bincount(rows[in_range], minlength=len(df)) == last - first
+    keep &= df["price_per_night"].to_numpy() <= query.max_price
+    keep &= df["rating"].to_numpy() >= query.min_rating
+    for name in query.facilities:
+        keep &= has_facility[:, FACILITIES.index(name)]
+    if query.location is not None:
+        keep &= (df["location"] == query.location).to_numpy()
+    hits = np.flatnonzero(keep)
+    return hits[np.lexsort((hits, df["price_per_night"].to_numpy()[hits]))][:k]
+
+
+def summarize(samples_ms: list) -> dict:
+    arr = np.asarray(samples_ms)
+    return {"p50_ms": float(np.percentile(arr, 50)), "p95_ms": float(np.percentile(arr, 95)),
+            "max_ms": float(arr.max())}
+
+
+def run(n: int, days: int, cities: int, nq: int, k: int, seed: int) -> dict:
+    start = time.perf_counter()
+    df, exploded, has_facility = synthetic_hotels(n, days, cities, seed)
+    generate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table_index = TableIndex(df, "location", sort_columns=["price_per_night", "rating"])
+    index = HotelSearchIndex(table_index)
+    build_s = time.perf_counter() - start
+
+    queries = random_queries(np.random.default_rng(seed + 1), nq, days, cities)
+    search_ms, scan_ms, mismatches, matched = [], [], 0, []
+    for query in queries:
+        start = time.perf_counter()
+        positions, total = index.search(query, order_by="price", limit=k)
+        search_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = brute_force(df, exploded, has_facility, query, k)
+        scan_ms.append((time.perf_counter() - start) * 1000)
+        # Harga bisa sama: bandingkan harga top-k, bukan posisi persis
+        prices = df["price_per_night"].to_numpy()
+        mismatches += not np.array_equal(prices[positions], prices[expected])
+        matched.append(total)
+
+    return {"hotels": n, "days": days, "available_nights": int(len(exploded[0])), "generate_s": generate_s,
+            "build_s": build_s, "index_mb": index.nbytes / 1e6, "queries": nq, "k": k,
+            "mean_matches": float(np.mean(matched)), "mismatches": mismatches,
+            "search": summarize(search_ms), "full_scan": summarize(scan_ms)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark search_hotels: bitmap ketersediaan + bitset fasilitas vs scan penuh.")
+    parser.add_argument("--hotels", default="10000,100000,300000", help="Jumlah hotel per run, dipisah koma")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="hotel_search_results.json")
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(x) for x in args.hotels.split(",")]:
+        result = run(n, args.days, args.cities, args.queries, args.k, args.seed)
+        results.append(result)
+        print(f"   {n:>7} hotel x {args.days} hari: build {result['build_s']:.2f} s, "
+              f"{result['index_mb']:.1f} MB, search p50 {result['search']['p50_ms']:.2f} ms / "
+              f"p95 {result['search']['p95_ms']:.2f} ms (scan p50 {result['full_scan']['p50_ms']:.1f} ms), "
+              f"{result['mismatches']} beda", file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": vars(args), "runs": results}, f, indent=2)
+    print(f"✅ Hasil benchmark disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
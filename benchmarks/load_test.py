@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Campuran pesan per sesi: cabang terstruktur (tanpa LLM) dan agent (LLM + embedding cache jawaban)
+MESSAGES = [
+    ("router", "hotel", "hotel di {city}"),
+    ("agent", "destination", "ceritakan sejarah {city} untuk perjalanan {n}"),
+    ("promo", "promo", "ada promo di {city} dong"),
+    ("agent", "destination", "apa kuliner khas {city} yang wajib dicoba {n}"),
+]
+
+
+def summarize(samples_s: list) -> dict:
+    if not samples_s:
+        return {"n": 0}
+    arr = np.asarray(samples_s) * 1000
+    return {"n": len(arr), "mean_ms": float(arr.mean()), "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)), "max_ms": float(arr.max())}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Statistik yang bukan counter kumulatif: diambil apa adanya dari snapshot akhir
+GAUGES = {"limit", "in_use", "waiting", "largest_batch", "memory_entries", "entries", "version"}
+
+
+def delta(after: dict, before: dict) -> dict:
+    # Selisih statistik kumulatif antara dua snapshot; rasio dihitung ulang dari selisihnya
+    result = {}
+    for key, value in after.items():
+        if isinstance(value, dict):
+            result[key] = delta(value, before.get(key, {}))
+        elif key in GAUGES:
+            result[key] = value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            result[key] = value - before.get(key, 0)
+    if "batches" in result:
+        result["mean_batch"] = result["items"] / result["batches"] if result["batches"] else 0.0
+    if "hit_rate" in result:
+        total = result["hits"] + result["misses"]
+        result["hit_rate"] = result["hits"] / total if total else 0.0
+    return result
+
+
+# ====== Klien Beban ======
+async def run_session(http, session_id: str, turns: int, rng: random.Random, cities: dict, samples: list):
+    for n in range(turns):
+        branch, source, template = MESSAGES[n % len(MESSAGES)]
+        message = template.format(city=rng.choice(cities[source]), n=f"{session_id}-{n}")
+        started = time.perf_counter()
+        first_token = None
+        path = None
+        async with http.stream("POST", "/chat", json={"session_id": session_id, "message": message},
+                               headers={"X-Google-Api-Key": "bench"}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "token" and first_token is None:
+                    first_token = time.perf_counter() - started
+                elif event["type"] == "error":
+                    raise RuntimeError(f"{branch}: {event['message']}")
+                elif event["type"] == "done":
+                    path = event["path"]
+        samples.append({"branch": branch, "path": path, "total_s": time.perf_counter() - started,
+                        "ttft_s": first_token})
+
+
+async def run_level(base_url: str, sessions: int, turns: int, rng: random.Random, cities: dict) -> dict:
+    import httpx
+
+    samples = []
+    limits = httpx.Limits(max_connections=sessions + 8, max_keepalive_connections=sessions + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_session(http, f"s{sessions}-{i}", turns, random.Random(rng.random()), cities, samples)
+            for i in range(sessions)
+        ])
+        wall_s = time.perf_counter() - started
+    result = {"sessions": sessions, "turns": len(samples), "wall_s": wall_s,
+              "turns_per_s": len(samples) / wall_s, "latency": summarize([s["total_s"] for s in samples])}
+    for branch in sorted({s["branch"] for s in samples}):
+        picked = [s for s in samples if s["branch"] == branch]
+        result[branch] = summarize([s["total_s"] for s in picked])
+        ttft = [s["ttft_s"] for s in picked if s["ttft_s"] is not None]
+        if ttft:
+            result[branch]["ttft_p50_ms"] = float(np.percentile(ttft, 50) * 1000)
+    return result
+
+
+# ====== Worker (satu konfigurasi batching per proses) ======
+def prepare_data(rows: int, seed: int):
+    from benchmarks import synthetic_data
+    from dataset_store import convert_all
+    import build_vectorstore
+
+    data_dir = os.environ["TRAVEL_DATASET_DIR"]
+    if not os.path.isdir(data_dir):
+        synthetic_data.generate(data_dir, rows, seed)
+        convert_all(data_dir)
+    if not os.path.isdir(os.environ["TRAVEL_INDEX_DIR"]):
+        build_vectorstore.build(full=True)
+
+
+def run_worker(args) -> dict:
+    from benchmarks import fakes
+
+    fake = fakes.install(llm_latency_s=args.llm_latency, token_latency_s=args.token_latency,
+                         embed_latency_s=args.embed_latency)
+    prepare_data(args.rows, args.seed)
+
+    import uvicorn
+    import backend
+    import tools
+
+    service = backend.create_service("bench", batch_window_ms=args.batch_window_ms)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(backend.create_app(service, workers=args.workers),
+                                           host="127.0.0.1", port=port, log_level="warning",
+                                           timeout_keep_alive=backend.KEEP_ALIVE_S))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    cities = {source: tools.gazetteer.cities(source) or tools.gazetteer.cities()
+              for _, source, _ in MESSAGES}
+    rng = random.Random(args.seed)
+    levels = []
+    for sessions in [int(n) for n in args.sessions.split(",")]:
+        stats_before = json.loads(json.dumps(service_stats(service)))
+        embed_calls_before = fake["embeddings"].calls
+        level = asyncio.run(run_level(base_url, sessions, args.turns, rng, cities))
+        level["embedding_api_calls"] = fake["embeddings"].calls - embed_calls_before
+        level["stats"] = delta(service_stats(service), stats_before)
+        levels.append(level)
+        print(f"   {sessions:>4} sesi: {level['turns_per_s']:.1f} turn/s, p95 {level['latency']['p95_ms']:.0f} ms, "
+              f"{level['embedding_api_calls']} panggilan embed", file=sys.stderr)
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    return {"batch_window_ms": args.batch_window_ms, "levels": levels}
+
+
+def service_stats(service) -> dict:
+    import chat_client
+    return chat_client.LocalClient(service).get_stats()
+
+
+# ====== Orkestrasi ======
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test backend.py dengan pengganti lokal Gemini/Cohere (tanpa jaringan).")
+    parser.add_argument("--sessions", default="1,10,100", help="Jumlah sesi serentak per level, dipisah koma")
+    parser.add_argument("--turns", type=int, default=8, help="Turn per sesi")
+    parser.add_argument("--rows", type=int, default=1000, help="Jumlah baris jadwal transport sintetis")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.08)
+    parser.add_argument("--batch-window-ms", type=float, default=None,
+                        help="Jendela micro-batch embedding (default: backend.EMBED_BATCH_WINDOW_MS)")
+    parser.add_argument("--no-batch", action="store_true", help="Hanya jalankan tanpa micro-batching")
+    parser.add_argument("--compare", action="store_true", help="Jalankan dengan dan tanpa micro-batching")
+    parser.add_argument("--gemini-concurrency", type=int, default=None)
+    parser.add_argument("--cohere-concurrency", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=128, help="Thread turn di backend")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--work-root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    import backend
+    window = backend.EMBED_BATCH_WINDOW_MS if args.batch_window_ms is None else args.batch_window_ms
+    windows = [0.0] if args.no_batch else ([window, 0.0] if args.compare else [window])
+    results = {"meta": {"args": vars(args)}, "runs": []}
+    with tempfile.TemporaryDirectory(prefix="travel-load-") as work_root:
+        for batch_window_ms in windows:
+            print(f"⏱️  jendela batch {batch_window_ms:g} ms ...", file=sys.stderr)
+            env = dict(os.environ,
+                       TRAVEL_DATASET_DIR=os.path.join(work_root, "data"),
+                       TRAVEL_DATASET_FORMAT="auto",
+                       TRAVEL_INDEX_DIR=os.path.join(work_root, "index"),
+                       # Cache embedding/jawaban terpisah per run supaya tiap run mulai dari kosong
+                       EMBEDDING_CACHE_PATH=os.path.join(work_root, f"embeddings-{batch_window_ms:g}.sqlite"),
+                       ANSWER_CACHE_PATH=os.path.join(work_root, f"answers-{batch_window_ms:g}.sqlite"),
+                       SESSION_MEMORY_PATH=os.path.join(work_root, f"sessions-{batch_window_ms:g}.sqlite"),
+                       COHERE_API_KEY="bench")
+            if args.gemini_concurrency:
+                env["GEMINI_CONCURRENCY"] = str(args.gemini_concurrency)
+            if args.cohere_concurrency:
+                env["COHERE_CONCURRENCY"] = str(args.cohere_concurrency)
+            worker_args = [sys.executable, "-m", "benchmarks.load_test", "--worker", "--work-root", work_root,
+                           "--sessions", args.sessions, "--turns", str(args.turns), "--rows", str(args.rows),
+                           "--llm-latency", str(args.llm_latency), "--token-latency", str(args.token_latency),
+                           "--embed-latency", str(args.embed_latency), "--batch-window-ms", str(batch_window_ms),
+                           "--workers", str(args.workers), "--seed", str(args.seed)]
+            proc = subprocess.run(worker_args, cwd=BASE_DIR, env=env, stdout=subprocess.PIPE, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"Worker gagal untuk jendela batch {batch_window_ms:g} ms.")
+            results["runs"].append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"✅ Hasil load test disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pesan per cabang handler utama di app.py; {city} diisi kota dari dataset terkait
+HANDLER_BRANCHES = {
+    "bundle": ("hotel", "rekomendasi hotel dan kendaraan ke {city}"),
+    "promo": ("promo", "ada promo di {city} dong"),
+    "transport": ("transport", "transportasi ke {city} apa saja?"),
+    "router": ("hotel", "hotel di {city}"),
+    "agent": ("destination", "ceritakan sejarah {city}"),
+    "gemini_fallback": ("destination", "xfailx ceritakan sejarah {city}"),
+}
+
+TOOL_FUNCTIONS = [
+    "get_transport_schedule", "get_promo", "get_promo_by_city", "get_destination_info",
+    "get_hotel_availability", "get_recommendation_bundle", "get_all_kendaraan_kota",
+    "get_current_date", "get_translate_response",
+]
+
+
+def summarize(samples_s: list) -> dict:
+    if not samples_s:
+        return {"n": 0}
+    ms = np.array(samples_s) * 1000
+    return {
+        "n": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def rss_mb() -> float:
+    # RSS saat ini (Linux); ru_maxrss hanya memberi puncak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return None
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+# ====== Worker (satu ukuran dataset per proses) ======
+def bench_index(build_index: bool) -> dict:
+    import build_vectorstore
+    import faiss_index
+    import hot_reload
+    import resources
+    import retrieval
+    import tools
+
+    result = {}
+    if build_index:
+        seconds, report = timed(build_vectorstore.build, full=True)
+        result["build_s"] = seconds
+        result["build_report"] = report
+    if not os.path.isdir(hot_reload.INDEX_DIR):
+        return result
+    embeddings = resources.CohereEmbeddings(model=resources.EMBEDDING_MODEL, cohere_api_key="bench")
+    rss_before = rss_mb()
+    seconds, vectorstore = timed(faiss_index.load_vectorstore, hot_reload.INDEX_DIR, embeddings)
+    result["load_s"] = seconds
+    if rss_before is not None:
+        result["load_rss_mb"] = rss_mb() - rss_before
+    result["spec"] = faiss_index.load_spec(hot_reload.INDEX_DIR)
+    seconds, retriever = timed(retrieval.load_retriever, vectorstore, hot_reload.INDEX_DIR, tools.gazetteer)
+    result["retriever_load_s"] = seconds
+    tools.publish(tools.current()._replace(vectorstore=vectorstore, retriever=retriever))
+    return result
+
+
+def bench_tools(iterations: int, rng: random.Random) -> dict:
+    import tools
+
+    cities = tools.gazetteer.cities()
+    results = {}
+    for name in TOOL_FUNCTIONS:
+        fn = getattr(tools, name)
+        if name == "get_transport_schedule" and tools.retriever is None and tools.vectorstore is None:
+            continue
+        samples = []
+        for _ in range(iterations):
+            arg = f"location: {rng.choice(cities)}"
+            seconds, _ = timed(fn, arg)
+            samples.append(seconds)
+        results[name] = summarize(samples)
+    return results
+
+
+def bench_handler(iterations: int, rng: random.Random) -> dict:
+    from streamlit.testing.v1 import AppTest
+    import tools
+
+    at = AppTest.from_file(os.path.join(BASE_DIR, "app.py"), default_timeout=120)
+    at.secrets["COHERE_API_KEY"] = "bench"
+    at.run()
+    at.sidebar.text_input[0].input("bench").run()
+
+    results = {}
+    for branch, (source, template) in HANDLER_BRANCHES.items():
+        cities = tools.gazetteer.cities(source) or tools.gazetteer.cities()
+        samples = []
+        for _ in range(iterations):
+            message = template.format(city=rng.choice(cities))
+            seconds, _ = timed(at.chat_input[0].set_value(message).run)
+            if at.exception:
+                raise RuntimeError(f"{branch}: {at.exception[0].message}")
+            samples.append(seconds)
+        results[branch] = summarize(samples)
+    return results
+
+
+def run_worker(args) -> dict:
+    from benchmarks import fakes
+
+    fake = fakes.install(llm_latency_s=args.llm_latency, token_latency_s=args.token_latency,
+                         embed_latency_s=args.embed_latency, wiki_latency_s=args.wiki_latency)
+    rng = random.Random(args.seed)
+
+    import tools
+    result = {}
+    # Akses pertama memuat dataset + index + gazetteer (lazy di tools.py)
+    result["dataset_load_s"], _ = timed(lambda: (tools.INDEXES, tools.gazetteer))
+    result["dataset_formats"] = dict(tools.DATASET_FORMATS)
+    result["peak_rss_mb_after_load"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result["index"] = bench_index(build_index=not args.skip_index)
+    result["tools"] = bench_tools(args.iterations, rng)
+    if not args.skip_handler:
+        result["handler"] = bench_handler(args.handler_iterations, rng)
+    import answer_cache
+    if answer_cache._cache is not None:
+        result["answer_cache"] = answer_cache._cache.get_stats()
+    result["upstream_calls"] = {
+        "llm": sum(model.calls for model in fake["chat_models"]),
+        "embeddings": fake["embeddings"].calls,
+        "wikipedia": fake["wikipedia"].calls,
+        "gemini": fake["generative_model"].calls,
+    }
+    return result
+
+
+def time_import(env: dict) -> float:
+    # Di worker, tools sudah diimpor fakes.install(); impor dingin diukur di proses baru
+    # (tanpa waktu start interpreter)
+    code = "import time; t = time.perf_counter(); import tools; print(time.perf_counter() - t)"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Impor tools gagal:\n{proc.stderr[-4000:]}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+# ====== Orkestrasi ======
+def run_size(rows: int, args, work_root: str) -> dict:
+    from benchmarks import synthetic_data
+    from dataset_store import convert_all
+
+    data_dir = os.path.join(work_root, f"data-{rows}")
+    gen_s, counts = timed(synthetic_data.generate, data_dir, rows, args.seed)
+    convert_s = None
+    if args.dataset_format == "arrow":
+        convert_s, _ = timed(convert_all, data_dir)
+    env = dict(os.environ,
+               TRAVEL_DATASET_DIR=data_dir,
+               TRAVEL_DATASET_FORMAT="auto" if args.dataset_format == "arrow" else "csv",
+               TRAVEL_INDEX_DIR=os.path.join(work_root, f"index-{rows}"),
+               FAISS_INDEX_SPEC=args.index_spec,
+               EMBEDDING_CACHE_PATH=os.path.join(work_root, f"embeddings-{rows}.sqlite"),
+               ANSWER_CACHE_PATH=os.path.join(work_root, f"answers-{rows}.sqlite"),
+               SESSION_MEMORY_PATH=os.path.join(work_root, f"sessions-{rows}.sqlite"),
+               ANSWER_CACHE="0" if args.no_answer_cache else "1",
+               COHERE_API_KEY="bench")
+    worker_args = [sys.executable, "-m", "benchmarks.run_bench", "--worker",
+                   "--iterations", str(args.iterations), "--handler-iterations", str(args.handler_iterations),
+                   "--llm-latency", str(args.llm_latency), "--token-latency", str(args.token_latency),
+                   "--embed-latency", str(args.embed_latency), "--wiki-latency", str(args.wiki_latency),
+                   "--seed", str(args.seed)]
+    if args.skip_handler:
+        worker_args.append("--skip-handler")
+    if rows > args.max_index_rows:
+        worker_args.append("--skip-index")
+    proc = subprocess.run(worker_args, cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Worker gagal untuk {rows} baris:\n{proc.stderr[-4000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["tools_import_s"] = time_import(env)
+    result["rows"] = counts
+    result["generate_s"] = gen_s
+    result["convert_s"] = convert_s
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latensi offline (tanpa jaringan) untuk travel assistant.")
+    parser.add_argument("--sizes", default="100,10000,100000", help="Jumlah baris jadwal transport, dipisah koma")
+    parser.add_argument("--iterations", type=int, default=200, help="Panggilan per fungsi tools")
+    parser.add_argument("--handler-iterations", type=int, default=20, help="Turn per cabang handler")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--wiki-latency", type=float, default=0.0)
+    parser.add_argument("--max-index-rows", type=int, default=200_000,
+                        help="Di atas ukuran ini build index dilewati (embedding palsu tetap mahal di CPU)")
+    parser.add_argument("--dataset-format", choices=["arrow", "csv"], default="arrow",
+                        help="arrow = konversi ke file Arrow bertipe dulu (dataset_store.py)")
+    parser.add_argument("--index-spec", default="flat", help="Spec index FAISS untuk build (lihat faiss_index.PRESETS)")
+    parser.add_argument("--skip-handler", action="store_true")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Matikan cache jawaban agent/Gemini")
+    parser.add_argument("--skip-index", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args)
+        sys.stdout.write("\n" + json.dumps(result) + "\n")
+        return
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("worker", "skip_index")},
+        },
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="travel-bench-") as work_root:
+        for rows in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"⏱️  {rows} baris ...", file=sys.stderr)
+            report["sizes"][str(rows)] = run_size(rows, args, work_root)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Hasil benchmark disimpan ke {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(BASE_DIR, "dataset")
+
+MODES = ["bis", "kereta", "pesawat", "kapal"]
+PROVIDER_PREFIX = ["PT", "CV", "PO", "UD", "PD"]
+PROVIDER_NAMES = ["Mansur", "Marpaung", "Adriansyah", "Wijaya", "Permadi", "Iswahyudi", "Thamrin", "Irawan",
+                  "Hasanah", "Mandala", "Utama", "Winarno", "Haryanto", "Mangunsong", "Hastuti", "Lestari"]
+FACILITIES = ["WiFi", "AC", "Kolam Renang", "Restoran", "Parkir", "Gym", "Spa", "Sarapan"]
+PROMO_TYPES = ["Promo Kuliner", "Cashback Wisata", "Paket Transportasi", "Diskon Hotel"]
+WEATHER = ["Cerah", "Berawan", "Hujan Ringan", "Hujan Lebat"]
+
+
+def city_pool(n_rows: int, rng) -> np.ndarray:
+    # Kota asli dari dataset + kota sintetis; jumlah kota tumbuh ~sqrt(baris) agar mirip katalog nasional
+    real = set()
+    for name, col in [("Transport_schedule.csv", "destination"), ("hotel_availability.csv", "location"),
+                      ("promo_travel.csv", "location"), ("destination_info.csv", "location")]:
+        real |= set(pd.read_csv(os.path.join(SOURCE_DIR, name))[col].str.strip())
+    real = sorted(real)
+    extra = max(0, int(np.sqrt(n_rows)) - len(real))
+    synthetic = [f"Kota Sintetis {i}" for i in range(extra)]
+    return np.array(real + synthetic, dtype=object)
+
+
+def _dates(rng, n: int, start: str = "2025-06-01", days: int = 365) -> pd.DatetimeIndex:
+    return pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+
+
+def _us_date(dates) -> pd.Series:
+    # Format tanggal dataset asli: 7/10/2025
+    dates = pd.DatetimeIndex(dates)
+    return (pd.Series(dates.month.astype(str)) + "/" + pd.Series(dates.day.astype(str)) + "/" + pd.Series(dates.year.astype(str)))
+
+
+def _clock(rng, n: int) -> pd.Series:
+    return pd.Series(rng.integers(0, 24, n).astype(str)) + ":" + pd.Series(rng.integers(0, 60, n).astype(str)).str.zfill(2)
+
+
+def _providers(rng, n: int) -> pd.Series:
+    prefix = np.array(PROVIDER_PREFIX, dtype=object)[rng.integers(0, len(PROVIDER_PREFIX), n)]
+    name = np.array(PROVIDER_NAMES, dtype=object)[rng.integers(0, len(PROVIDER_NAMES), n)]
+    return pd.Series(prefix + " " + name)
+
+
+def _joined_choices(rng, options: list, n: int, k: int = 3) -> pd.Series:
+    picks = np.array(options, dtype=object)[np.argsort(rng.random((n, len(options))), axis=1)[:, :k]]
+    joined = pd.Series(picks[:, 0])
+    for j in range(1, k):
+        joined = joined + "," + pd.Series(picks[:, j])
+    return joined
+
+
+def transport(n: int, cities, rng) -> pd.DataFrame:
+    return pd.DataFrame({
+        "mode": np.array(MODES, dtype=object)[rng.integers(0, len(MODES), n)],
+        "destination": cities[rng.integers(0, len(cities), n)],
+        "date": _us_date(_dates(rng, n)),
+        "provider": _providers(rng, n),
+        "departure_time": _clock(rng, n),
+        "arrival_time": _clock(rng, n),
+        "price": rng.integers(100_000, 2_000_000, n),
+    })
+
+
+def hotels(n: int, cities, rng) -> pd.DataFrame:
+    start = _dates(rng, n, days=330)
+    nights = rng.integers(1, 8, n)
+    available = pd.Series(start.strftime("%Y-%m-%d"))
+    for offset in range(1, 7):
+        day = pd.Series((start + pd.Timedelta(days=offset)).strftime("%Y-%m-%d"))
+        available = available.where(nights <= offset, available + "," + day)
+    return pd.DataFrame({
+        "location": cities[rng.integers(0, len(cities), n)],
+        "name": _providers(rng, n) + " Tbk",
+        "price_per_night": rng.integers(200_000, 2_500_000, n),
+        "facilities": _joined_choices(rng, FACILITIES, n),
+        "rating": np.round(rng.uniform(2.5, 5.0, n), 1),
+        "available_dates": available,
+    })
+
+
+def promos(n: int, cities, rng) -> pd.DataFrame:
+    start = _dates(rng, n)
+    end = start + pd.to_timedelta(rng.integers(3, 45, n), unit="D")
+    location = cities[rng.integers(0, len(cities), n)]
+    percent = rng.integers(1, 6, n) * 10
+    return pd.DataFrame({
+        "start_date": _us_date(start),
+        "end_date": _us_date(end),
+        "promo_type": np.array(PROMO_TYPES, dtype=object)[rng.integers(0, len(PROMO_TYPES), n)],
+        "location": location,
+        "description": pd.Series(percent.astype(str)) + "% diskon untuk perjalanan ke " + pd.Series(location),
+    })
+
+
+def destinations(cities, rng) -> pd.DataFrame:
+    n = len(cities)
+    return pd.DataFrame({
+        "location": cities,
+        "weather": pd.Series(np.array(WEATHER, dtype=object)[rng.integers(0, len(WEATHER), n)])
+                   + ", " + pd.Series(rng.integers(22, 34, n).astype(str)) + "°C",
+        "popular_places": "Alun-alun " + pd.Series(cities) + ", Museum " + pd.Series(cities) + ", Taman Kota",
+        "public_transport": "Angkot, Ojek Online, Taksi",
+    })
+
+
+def generate(out_dir: str, rows: int, seed: int = 42) -> dict:
+    # rows = jumlah baris jadwal transport; hotel & promo diskalakan proporsional seperti dataset asli
+    rng = np.random.default_rng(seed)
+    cities = city_pool(rows, rng)
+    os.makedirs(out_dir, exist_ok=True)
+    frames = {
+        "Transport_schedule.csv": transport(rows, cities, rng),
+        "hotel_availability.csv": hotels(max(1, rows // 2), cities, rng),
+        "promo_travel.csv": promos(max(1, rows // 2), cities, rng),
+        "destination_info.csv": destinations(cities, rng),
+    }
+    for name, df in frames.items():
+        df.to_csv(os.path.join(out_dir, name), index=False)
+    return {name: len(df) for name, df in frames.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buat dataset sintetis dengan skema yang sama seperti dataset/.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(generate(args.out_dir, args.rows, args.seed))
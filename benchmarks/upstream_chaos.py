@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Skenario: (nama, pengaturan server palsu, key identik untuk semua panggilan?); dijalankan berurutan,
+# state circuit breaker terbawa ke skenario berikutnya
+SCENARIOS = [
+    ("healthy", {"latency_s": 0.05}, False),
+    ("slow", {"latency_s": 0.2, "jitter_s": 0.3}, False),
+    ("flaky_30pct", {"latency_s": 0.05, "error_rate": 0.3}, False),
+    ("outage", {"latency_s": 0.05, "error_rate": 1.0}, False),
+    ("recovery", {"latency_s": 0.05}, False),
+    ("hang", {"latency_s": 3.0}, False),
+    ("burst_identical", {"latency_s": 0.3}, True),
+]
+
+
+def summarize(samples_s: list) -> dict:
+    if not samples_s:
+        return {"n": 0}
+    arr = np.asarray(samples_s) * 1000
+    return {"n": len(arr), "mean_ms": float(arr.mean()), "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)), "max_ms": float(arr.max())}
+
+
+def delta(after: dict, before: dict) -> dict:
+    return {key: value - before.get(key, 0) if isinstance(value, int) else value for key, value in after.items()}
+
+
+# ====== Klien per Layanan ======
+def make_clients(upstream) -> dict:
+    from langchain_cohere import CohereEmbeddings
+
+    upstream.configure_gemini("bench")
+    embeddings = upstream.GuardedEmbeddings(
+        CohereEmbeddings(model="embed-multilingual-v3.0", cohere_api_key="bench", **upstream.cohere_options()))
+    return {
+        "gemini": lambda text: upstream.gemini_generate(text, source="chaos", key=text).text,
+        "cohere": embeddings.embed_query,
+        "wikipedia": lambda text: upstream.wikipedia_summary(text, auto_suggest=False),
+    }
+
+
+def run_scenario(upstream, server, call, name: str, calls: int, concurrency: int, identical: bool) -> dict:
+    stats_before, server_before = upstream.get(server.name).get_stats(), server.get_stats()
+    outcomes, latencies = {}, []
+
+    def one(i: int):
+        started = time.perf_counter()
+        try:
+            call("Bandung" if identical else f"{name} {i}")
+            outcome = "ok"
+        except upstream.UpstreamError as e:
+            outcome = type(e).__name__
+        except Exception as e:   # error permintaan yang tidak dicoba ulang
+            outcome = type(e).__name__
+        return outcome, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for outcome, elapsed in pool.map(one, range(calls)):
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            latencies.append(elapsed)
+    return {"outcomes": outcomes, "latency": summarize(latencies),
+            "upstream": delta(upstream.get(server.name).get_stats(), stats_before),
+            "server": delta(server.get_stats(), server_before)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Uji ketahanan klien hulu (Gemini, Cohere, Wikipedia) terhadap server palsu lokal "
+                    "dengan latensi & error yang disuntikkan.")
+    parser.add_argument("--upstreams", default="gemini,cohere,wikipedia")
+    parser.add_argument("--calls", type=int, default=40, help="Panggilan per skenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Thread pemanggil serentak")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Timeout per percobaan (detik)")
+    parser.add_argument("--deadline", type=float, default=3.0, help="Deadline total per panggilan (detik)")
+    parser.add_argument("--breaker-reset", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="upstream_chaos_results.json")
+    args = parser.parse_args()
+
+    from benchmarks import fake_upstreams
+
+    fakes = fake_upstreams.start_all(seed=args.seed)
+    names = [name.strip() for name in args.upstreams.split(",") if name.strip()]
+    # Harus di-set sebelum upstream diimpor: endpoint ke server palsu, timeout/deadline dipersingkat
+    os.environ.update(fakes["env"])
+    for name in names:
+        prefix = name.upper()
+        os.environ.update({f"{prefix}_TIMEOUT_S": str(args.timeout), f"{prefix}_DEADLINE_S": str(args.deadline),
+                           f"{prefix}_BREAKER_RESET_S": str(args.breaker_reset)})
+    import upstream
+
+    clients = make_clients(upstream)
+    results = {}
+    try:
+        for name in names:
+            server = fakes["servers"][name]
+            results[name] = {}
+            for scenario, settings, identical in SCENARIOS:
+                server.configure(**{"latency_s": 0.0, "jitter_s": 0.0, "error_rate": 0.0, **settings})
+                if scenario == "recovery":
+                    time.sleep(args.breaker_reset)   # circuit half-open: satu panggilan percobaan ke hulu
+                result = run_scenario(upstream, server, clients[name], scenario, args.calls, args.concurrency,
+                                      identical)
+                results[name][scenario] = result
+                print(f"   {name:>9} {scenario:<16} {result['outcomes']} p50 {result['latency']['p50_ms']:.0f} ms / "
+                      f"max {result['latency']['max_ms']:.0f} ms, {result['server']['requests']} request ke server, "
+                      f"circuit {result['upstream']['state']}", file=sys.stderr)
+                if scenario == "hang":
+                    # Percobaan yang ditinggal timeout masih memegang slot sampai server menjawab;
+                    # tunggu slot kembali dan circuit half-open sebelum skenario berikutnya
+                    time.sleep(max(settings["latency_s"], args.breaker_reset))
+    finally:
+        for server in fakes["servers"].values():
+            server.stop()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": vars(args), "upstreams": results}, f, indent=2)
+    print(f"✅ Hasil benchmark disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
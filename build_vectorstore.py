@@ -1,53 +1,265 @@
 import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
-from langchain.docstore.document import Document
-from langchain.vectorstores import FAISS
+from langchain_community.vectorstores import FAISS
 from langchain_cohere import CohereEmbeddings
 from dotenv import load_dotenv
-import getpass
-
-# Load .env (agar COHERE_API_KEY bisa dipanggil dengan aman)
-# ====== Load .env ======
-load_dotenv()
-cohere_api_key = os.getenv("COHERE_API_KEY")  # Ambil dari .env
-
-# Pastikan API Key tersedia
-# Atur API Key
-if not (cohere_api_key):
-    st.warning("🔐 Masukkan COHERE_API_KEY di .env.")
-    st.stop()
-
-# Inisialisasi embeddings
-embeddings = CohereEmbeddings(
-    model="embed-multilingual-light-v3.0",
-    cohere_api_key=cohere_api_key
-)
-
-# Fungsi bantu untuk ubah DataFrame ke list of Documents
-def df_to_documents(df, label):
-    docs = []
-    for _, row in df.iterrows():
-        content = f"{label}: " + ', '.join([f"{col}: {val}" for col, val in row.items()])
-        docs.append(Document(page_content=content))
-    return docs
-
-# Load semua dataset
-datasets = {
-    "Transport Schedule": "D:\zaidan\Project Akhir\dataset\Transport_schedule.csv",
-    "Promo Travel": "D:\zaidan\Project Akhir\dataset\promo_travel.csv",
-    "Destination Info": "D:\zaidan\Project Akhir\dataset\destination_info.csv",
-    "Hotel Availability": "D:\zaidan\Project Akhir\dataset\hotel_availability.csv"
+
+import dataset_store
+import docstore
+import faiss_index
+import upstream
+from embedding_cache import CachedEmbeddings
+from retrieval import LEXICAL_FILENAME, LexicalIndex, document_metadata
+
+# ====== Lokasi File ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.getenv("TRAVEL_DATASET_DIR", os.path.join(BASE_DIR, "dataset"))
+INDEX_DIR = os.getenv("TRAVEL_INDEX_DIR", os.path.join(BASE_DIR, "faiss_travel_assistant"))
+EMBEDDING_MODEL = "embed-multilingual-light-v3.0"
+
+# Label dataset dipakai sebagai prefix isi dokumen
+DATASET_FILES = {
+    "Transport Schedule": "Transport_schedule.csv",
+    "Promo Travel": "promo_travel.csv",
+    "Destination Info": "destination_info.csv",
+    "Hotel Availability": "hotel_availability.csv"
 }
 
-# Gabungkan semua dokumen
-all_documents = []
-for label, path in datasets.items():
+
+def dataset_paths(dataset_dir: str = DATASET_DIR) -> dict:
+    return {label: os.path.join(dataset_dir, filename) for label, filename in DATASET_FILES.items()}
+
+
+def manifest_path(index_dir: str = INDEX_DIR) -> str:
+    # Manifest di samping folder index (bukan di dalamnya) agar tidak ikut tertukar saat simpan atomik
+    return f"{index_dir}.manifest.json"
+
+
+MANIFEST_PATH = manifest_path()
+datasets = dataset_paths()
+
+BATCH_SIZE = 96  # batas jumlah teks per request embed Cohere
+CONCURRENCY = 4
+
+
+def get_embeddings():
+    # Load .env (agar COHERE_API_KEY bisa dipanggil dengan aman)
+    load_dotenv()
+    cohere_api_key = os.getenv("COHERE_API_KEY")
+    if not cohere_api_key:
+        sys.exit("🔐 Masukkan COHERE_API_KEY di .env.")
+    cohere = CohereEmbeddings(model=EMBEDDING_MODEL, cohere_api_key=cohere_api_key, **upstream.cohere_options())
+    # Embedding dokumen juga di-cache, jadi rebuild penuh tidak mengulang panggilan API
+    return CachedEmbeddings(upstream.GuardedEmbeddings(cohere), model_name=EMBEDDING_MODEL)
+
+
+# ====== Render Dokumen ======
+def render_contents(df: pd.DataFrame, label: str) -> list:
+    # Versi vektor dari "label: col: val, col: val" per baris (tanpa iterrows)
+    content = None
+    for col in df.columns:
+        part = f"{col}: " + df[col].astype(str)
+        content = part if content is None else content + ", " + part
+    if content is None:
+        return []
+    return (f"{label}: " + content).tolist()
+
+
+def content_ids(contents: list, label: str) -> list:
+    # ID dokumen = hash isi baris; baris identik diberi nomor urut agar tetap unik
+    ids = []
+    seen = {}
+    for content in contents:
+        digest = hashlib.sha1(f"{label}\x00{content}".encode("utf-8")).hexdigest()[:20]
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(digest if seen[digest] == 1 else f"{digest}-{seen[digest]}")
+    return ids
+
+
+# ====== Manifest ======
+def load_manifest(path: str = MANIFEST_PATH):
     if not os.path.exists(path):
-        raise FileNotFoundError(f"File tidak ditemukan: {path}")
-    df = pd.read_csv(path)
-    all_documents.extend(df_to_documents(df, label))
-
-# Buat FAISS index dan simpan
-vectorstore = FAISS.from_documents(all_documents, embeddings)
-vectorstore.save_local("faiss_travel_assistant")
-print("✅ Vectorstore berhasil dibuat dan disimpan ke folder 'faiss_travel_assistant'")
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+# ====== Embedding Paralel ======
+def embed_in_batches(embeddings, texts: list, batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY) -> list:
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(embeddings.embed_documents, batches))
+    return [vector for batch in results for vector in batch]
+
+
+# ====== Simpan Atomik ======
+def save_index_atomic(vectorstore, lexical: LexicalIndex = None, index_dir: str = INDEX_DIR, spec: dict = None):
+    tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+    old_dir = f"{index_dir}.old-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    faiss_index.save_vectorstore(vectorstore, tmp_dir)
+    if lexical is not None:
+        lexical.save(tmp_dir)  # index BM25 ikut ditukar bersama index FAISS
+    if spec is not None:
+        faiss_index.save_spec(tmp_dir, spec)
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# ====== Build ======
+def build(full: bool = False, batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY,
+          index_spec: str = faiss_index.DEFAULT_SPEC, nlist: int = None, train_size: int = faiss_index.TRAIN_SIZE,
+          nprobe: int = faiss_index.DEFAULT_NPROBE, ef_search: int = faiss_index.DEFAULT_EF_SEARCH,
+          embeddings=None, dataset_dir: str = DATASET_DIR, index_dir: str = INDEX_DIR) -> list:
+    # embeddings & folder bisa diberikan pemanggil (hot_reload.py memakai embeddings & folder milik aplikasi)
+    embeddings = embeddings or get_embeddings()
+    manifest = None if full else load_manifest(manifest_path(index_dir))
+    if manifest is not None and manifest.get("index_spec", "flat") != index_spec:
+        print(f"⚠️ Spec index berubah ({manifest.get('index_spec', 'flat')} -> {index_spec}), build ulang penuh.")
+        manifest = None
+
+    vectorstore = None
+    if manifest is not None and os.path.isdir(index_dir):
+        if docstore.is_legacy(index_dir):
+            print("ℹ️ Memindahkan index.pkl lama ke docstore SQLite.")
+            docstore.migrate(index_dir)
+        try:
+            vectorstore = faiss_index.load_vectorstore(index_dir, embeddings, mmap=False, in_memory=True)
+        except Exception as e:
+            print(f"⚠️ Index lama tidak bisa dimuat ({e}), build ulang penuh.")
+        if vectorstore is not None and vectorstore.index.ntotal != manifest.get("ntotal"):
+            print("⚠️ Manifest tidak cocok dengan index, build ulang penuh.")
+            vectorstore, manifest = None, None
+        elif vectorstore is not None and not faiss_index.supports_incremental(vectorstore.index):
+            # Vektor diambil dari embedding cache, jadi build ulang tidak memanggil API lagi
+            print("⚠️ Index IVF/HNSW tidak mendukung update inkremental, build ulang penuh.")
+            vectorstore, manifest = None, None
+    if vectorstore is None:
+        # Tanpa index lama (folder index hilang walau manifest masih ada) semua baris harus di-embed ulang;
+        # manifest lama akan menganggapnya sudah ada dan menghasilkan index parsial
+        manifest = {"model": EMBEDDING_MODEL, "datasets": {}}
+    rebuilt = vectorstore is None
+
+    report = []
+    all_ids, all_contents, all_metadatas = [], [], []
+    for label, path in dataset_paths(dataset_dir).items():
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File tidak ditemukan: {path}")
+        start = time.perf_counter()
+
+        df = pd.read_csv(path)
+        contents = render_contents(df, label)
+        ids = content_ids(contents, label)
+        metadatas = document_metadata(df, label)
+        all_ids.extend(ids)
+        all_contents.extend(contents)
+        all_metadatas.extend(metadatas)
+
+        old_ids = set(manifest["datasets"].get(label, {}).get("ids", []))
+        new_rows = [(doc_id, content, meta) for doc_id, content, meta in zip(ids, contents, metadatas)
+                    if doc_id not in old_ids]
+        deleted = list(old_ids - set(ids))
+
+        if deleted and vectorstore is not None:
+            vectorstore.delete(deleted)
+
+        if new_rows:
+            texts = [content for _, content, _ in new_rows]
+            vectors = embed_in_batches(embeddings, texts, batch_size, concurrency)
+            text_embeddings = list(zip(texts, vectors))
+            new_ids = [doc_id for doc_id, _, _ in new_rows]
+            new_metadatas = [meta for _, _, meta in new_rows]
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=new_metadatas, ids=new_ids)
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=new_metadatas, ids=new_ids)
+
+        manifest["datasets"][label] = {"path": os.path.relpath(path, BASE_DIR), "ids": ids}
+        report.append({
+            "dataset": label,
+            "rows": len(ids),
+            "embedded": len(new_rows),
+            "skipped": len(ids) - len(new_rows),
+            "deleted": len(deleted),
+            "seconds": round(time.perf_counter() - start, 3),
+        })
+
+    if vectorstore is None:
+        raise ValueError("Tidak ada dokumen untuk dibuat index.")
+
+    spec = faiss_index.load_spec(index_dir) if os.path.isdir(index_dir) else {}
+    if rebuilt:
+        # Dokumen dikumpulkan di index flat dulu, lalu dipindah ke tipe index yang diminta
+        index = vectorstore.index
+        factory = faiss_index.resolve_factory(index_spec, index.d, index.ntotal, nlist=nlist, train_size=train_size)
+        spec = {"spec": index_spec, "factory": factory}
+        if factory != "Flat":
+            vectors = index.reconstruct_n(0, index.ntotal)
+            vectorstore.index, info = faiss_index.build_index(vectors, factory, train_size)
+            spec.update(info)
+    spec.update(nprobe=nprobe, ef_search=ef_search, ntotal=vectorstore.index.ntotal)
+    expected = sum(r["rows"] for r in report)
+    if vectorstore.index.ntotal != expected:
+        raise ValueError(f"Index berisi {vectorstore.index.ntotal} vektor, dataset {expected} baris; "
+                         "index tidak disimpan, jalankan ulang dengan --full.")
+
+    # Index leksikal (BM25) dibangun ulang penuh: murah dan tanpa panggilan API
+    lexical_missing = not os.path.exists(os.path.join(index_dir, LEXICAL_FILENAME))
+    changed = any(r["embedded"] or r["deleted"] for r in report)
+    if changed or rebuilt or lexical_missing or not os.path.isdir(index_dir):
+        save_index_atomic(vectorstore, LexicalIndex.build(all_ids, all_contents, all_metadatas), index_dir, spec)
+    elif spec != faiss_index.load_spec(index_dir):
+        faiss_index.save_spec(index_dir, spec)  # hanya default nprobe/efSearch yang berubah
+    manifest["ntotal"] = vectorstore.index.ntotal
+    manifest["index_spec"] = index_spec
+    save_manifest(manifest, manifest_path(index_dir))
+    return report
+
+
+def print_report(report: list):
+    print(f"{'dataset':<20} {'rows':>7} {'embedded':>9} {'skipped':>8} {'deleted':>8} {'detik':>8}")
+    for r in report:
+        print(f"{r['dataset']:<20} {r['rows']:>7} {r['embedded']:>9} {r['skipped']:>8} {r['deleted']:>8} {r['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bangun / perbarui FAISS index travel assistant.")
+    parser.add_argument("--full", action="store_true", help="Abaikan manifest dan bangun ulang semua dokumen")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--skip-typed", action="store_true", help="Jangan tulis ulang file Arrow bertipe untuk tools.py")
+    parser.add_argument("--index-spec", default=faiss_index.DEFAULT_SPEC,
+                        help=f"{', '.join(faiss_index.PRESETS)} atau string index_factory FAISS (mis. IVF4096,PQ48)")
+    parser.add_argument("--nlist", type=int, default=None, help="Jumlah list IVF (default ~4*sqrt(n))")
+    parser.add_argument("--train-size", type=int, default=faiss_index.TRAIN_SIZE)
+    parser.add_argument("--nprobe", type=int, default=faiss_index.DEFAULT_NPROBE, help="Default nprobe saat pencarian (IVF)")
+    parser.add_argument("--ef-search", type=int, default=faiss_index.DEFAULT_EF_SEARCH, help="Default efSearch (HNSW)")
+    args = parser.parse_args()
+
+    report = build(full=args.full, batch_size=args.batch_size, concurrency=args.concurrency,
+                   index_spec=args.index_spec, nlist=args.nlist, train_size=args.train_size,
+                   nprobe=args.nprobe, ef_search=args.ef_search)
+    print_report(report)
+    print(f"✅ Vectorstore berhasil disimpan ke folder '{os.path.basename(INDEX_DIR)}'")
+    if not args.skip_typed and dataset_store.pa is not None:
+        dataset_store.convert_all(DATASET_DIR)
+        print("✅ Dataset bertipe (Arrow) diperbarui untuk tools.py")
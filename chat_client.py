@@ -0,0 +1,130 @@
+import io
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+try:
+    import httpx
+except ImportError:  # hanya dibutuhkan untuk mode backend (TRAVEL_BACKEND_URL)
+    httpx = None
+
+import dataset_store
+import tools
+import upstream
+from chat_service import TurnResult
+from concurrency import TTLCache
+from table_index import TableRef
+
+TABLE_CACHE_TTL = 10 * 60
+
+
+# ====== Serialisasi Entri Riwayat ======
+def encode_entry(role: str, msg) -> dict:
+    if isinstance(msg, TableRef):
+        return {"role": role, "table": {"dataset": msg.dataset, "positions": msg.positions.tolist(),
+                                        "version": msg.version}}
+    return {"role": role, "text": str(msg)}
+
+
+def decode_entry(entry: dict) -> tuple:
+    table = entry.get("table")
+    if table is not None:
+        return entry["role"], TableRef(table["dataset"], np.asarray(table["positions"], dtype=np.int32), table["version"])
+    return entry["role"], entry["text"]
+
+
+def encode_table(df: pd.DataFrame) -> str:
+    # Kolom list (Arrow) digabung jadi teks dulu; tanggal dikirim sebagai ISO
+    return dataset_store.as_text_frame(df).to_json(orient="split", date_format="iso", index=False)
+
+
+# ====== Klien Lokal (layanan di proses yang sama) ======
+class LocalClient:
+    def __init__(self, service):
+        self.service = service
+
+    def chat(self, session_id: str, message: str, last_city: str, google_api_key: str, view) -> TurnResult:
+        return self.service.handle(session_id, message, last_city, google_api_key, view)
+
+    def reset(self, session_id: str):
+        self.service.reset(session_id)
+
+    def resolve_table(self, ref: TableRef):
+        return tools.resolve_table(ref)
+
+    def get_stats(self) -> dict:
+        stats = {"limits": self.service.limiter.get_stats()}
+        if self.service.reloader is not None:
+            stats["snapshot"] = self.service.reloader.get_stats()
+        if self.service.embeddings is not None:
+            stats["embeddings"] = self.service.embeddings.get_stats()
+        if self.service.answers is not None:
+            stats["answer_cache"] = self.service.answers.get_stats()
+        if self.service.session_store is not None:
+            stats["session_memory"] = self.service.session_store.get_stats()
+        stats["upstreams"] = upstream.get_stats()
+        return stats
+
+
+# ====== Klien HTTP (backend.py) ======
+# app.py hanya merender; routing, tool, retrieval dan agent berjalan di backend
+class HttpClient:
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        if httpx is None:
+            raise RuntimeError("⚠️ httpx belum terpasang: pip install httpx")
+        self.base_url = base_url.rstrip("/")
+        self._http = httpx.Client(base_url=self.base_url, timeout=timeout)
+        self._tables = TTLCache(maxsize=256, ttl=TABLE_CACHE_TTL)
+
+    def chat(self, session_id: str, message: str, last_city: str, google_api_key: str, view) -> TurnResult:
+        payload = {"session_id": session_id, "message": message, "last_city": last_city}
+        sink = None
+        with self._http.stream("POST", "/chat", json=payload, headers={"X-Google-Api-Key": google_api_key}) as response:
+            response.raise_for_status()
+            # Event NDJSON diputar ulang ke view yang sama dengan mode lokal
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                kind = event["type"]
+                if kind == "user":
+                    view.show_user(event["text"])
+                elif kind == "sink":
+                    sink = view.new_sink()
+                elif kind == "token" and sink is not None:
+                    sink.write(event["text"])
+                elif kind == "sink_close" and sink is not None:
+                    sink.close()
+                elif kind == "step":
+                    view.step(event["text"])
+                elif kind == "finish_steps":
+                    view.finish_steps()
+                elif kind == "error":
+                    raise RuntimeError(event["message"])
+                elif kind == "done":
+                    entries = [decode_entry(e) for e in event["entries"]]
+                    return TurnResult(entries, event["path"], event.get("metrics"), event.get("version"),
+                                      event.get("route"))
+        raise RuntimeError("Backend menutup koneksi sebelum turn selesai.")
+
+    def reset(self, session_id: str):
+        self._http.post(f"/sessions/{session_id}/reset").raise_for_status()
+
+    def resolve_table(self, ref: TableRef):
+        key = (ref.dataset, ref.version, hashlib.sha1(ref.positions.tobytes()).hexdigest())
+        df = self._tables.get(key)
+        if df is None:
+            response = self._http.post("/tables/resolve", json=encode_entry("Table", ref)["table"])
+            response.raise_for_status()
+            if response.status_code == 204:
+                return None  # dataset sudah berganti versi
+            df = pd.read_json(io.StringIO(response.text), orient="split")
+            self._tables.set(key, df)
+        return df
+
+    def get_stats(self) -> dict:
+        response = self._http.get("/stats")
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,446 @@
+import time
+import json
+import hashlib
+import threading
+from typing import NamedTuple
+
+from langchain.agents import Tool
+
+import answer_cache
+import chat_store
+import intent_router
+import plan_agent
+import resources
+import session_memory
+import streaming
+import tools
+import tracing
+import upstream
+from concurrency import TTLCache, UpstreamLimiter
+
+# ====== Konfigurasi ======
+SESSION_TTL = 2 * 60 * 60
+MAX_SESSIONS = 10_000
+TRANSPORT_KEYWORDS = ["transportasi", "kendaraan", "harga", "tiket", "biaya"]
+
+DEGRADED_ANSWER = ("⚠️ Asisten AI sedang sibuk atau tidak dapat dihubungi. Coba lagi sebentar lagi; "
+                   "sementara itu, berikut data yang tersedia secara lokal (jika ada).")
+
+ROUTED_TABLES = {
+    "get_transport_schedule": ("transport", "🚍 Informasi Transportasi ke {city}", "date"),
+    "get_hotel_availability": ("hotel", "🏨 Hotel yang tersedia di {city}", "price_per_night"),
+    "get_promo_by_city": ("promo", "🏱 Berikut promo yang tersedia untuk kota **{city}**:", "end_date"),
+    "get_destination_info": ("destination", "📍 Info destinasi **{city}**:", None),
+}
+
+
+class TurnResult(NamedTuple):
+    entries: list       # entri riwayat baru turn ini: (role, pesan/TableRef)
+    path: str           # cabang yang menjawab (bundle/promo/transport/router/agent/cache/gemini)
+    metrics: dict       # TTFT & total untuk cabang yang streaming, None untuk cabang tabel
+    version: str = None  # versi snapshot data yang menjawab turn ini
+    route: str = None    # keputusan intent router: "intent (confidence, alasan)"
+
+
+# ====== Tampilan Turn ======
+# Tanpa UI: token & langkah agent hanya dikumpulkan. app.py (Streamlit) dan backend.py (event stream)
+# memakai subclass dengan method yang sama.
+class TurnView:
+    def show_user(self, message: str):
+        pass
+
+    def new_sink(self, started: float = None):
+        return streaming.CallbackSink(lambda token: None, started=started)
+
+    def step(self, text: str):
+        pass
+
+    def finish_steps(self):
+        pass
+
+    # StreamlitAgentHandler menulis langkah tool lewat objek dengan method write()
+    def write(self, text: str):
+        self.step(text)
+
+
+# ====== Sesi ======
+class Session:
+    def __init__(self, session_id: str, store=None):
+        self.session_id = session_id
+        self.history = []            # konteks kota (chat_store.CHAT_HISTORY_LIMIT)
+        self.last_city = None
+        # Konteks prompt agent & fallback Gemini: ringkasan + turn terbaru dalam budget token,
+        # dipulihkan dari SQLite jika sesi pernah ada (restart proses / reconnect)
+        self.store = store
+        self.context = store.load(session_id) if store is not None else session_memory.SessionMemory(session_id)
+        self.memory = resources.create_memory(self.context)
+        self.agent = None
+        self.agent_key = None
+        self.planner = None          # plan_agent.PlanExecuteAgent (AGENT_MODE=plan/ab)
+        self.planner_key = None
+        self.lock = threading.Lock()  # satu turn per sesi dalam satu waktu
+
+    def add(self, entries: list, role: str, msg):
+        chat_store.append(self.history, role, msg)
+        entries.append((role, msg))
+
+    def remember(self, entries: list, summarizer=None):
+        # Dipanggil sekali di akhir turn: turn yang sedang berjalan tidak ikut konteksnya sendiri
+        for role, msg in entries:
+            self.context.add(role, msg)
+        self.context.compact(summarizer)
+        if self.store is not None:
+            self.store.save(self.context)
+
+
+# ====== Layanan Chat ======
+class ChatService:
+    def __init__(self, embeddings=None, llm_factory=resources.create_llm, answers=None, limiter: UpstreamLimiter = None,
+                 reloader=None, agent_mode: str = plan_agent.AGENT_MODE, session_store=None):
+        self.embeddings = embeddings
+        self.llm_factory = llm_factory
+        self.answers = answers
+        self.reloader = reloader      # hot_reload.SnapshotReloader (opsional, untuk statistik)
+        self.limiter = limiter or upstream.get_limiter()   # batas per layanan hulu (upstream.LIMITS)
+        self.agent_mode = agent_mode   # react / plan / ab
+        self.session_store = session_store   # session_memory.SessionStore (opsional)
+        self._sessions = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL)
+        self._llms = {}
+        self._lock = threading.Lock()
+
+    # ====== Sesi & Resource ======
+    def session(self, session_id: str) -> Session:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.session_store)
+            self._sessions.set(session_id, session)  # perpanjang TTL tiap dipakai
+            return session
+
+    def reset(self, session_id: str):
+        self._sessions.pop(session_id)
+        if self.session_store is not None:
+            self.session_store.delete(session_id)
+
+    def _llm(self, google_api_key: str):
+        key = hashlib.sha1(google_api_key.encode()).hexdigest()
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = self._llms[key] = self.llm_factory(google_api_key)
+        upstream.configure_gemini(google_api_key)  # fallback Gemini memakai key yang sama
+        return llm
+
+    def _tool_list(self, session: Session) -> list:
+        def wrap_tool_with_context(tool_func):
+            def wrapper(input_str):
+                if session.last_city:
+                    # Selalu timpa dengan last_city
+                    input_str = f"location: {session.last_city}"
+                return tool_func(input_str)
+            return wrapper
+
+        def wrap_structured_tool(tool_func):
+            # Tool dengan input JSON: last_city hanya mengisi lokasi yang kosong, filter lain tetap dipakai
+            def wrapper(input_str):
+                args = tools.extract_args(input_str)
+                if session.last_city and not args.get("location"):
+                    args["location"] = session.last_city
+                return tool_func(json.dumps(args, ensure_ascii=False))
+            return wrapper
+
+        return [
+            Tool.from_function(name="get_transport_schedule", func=wrap_tool_with_context(tools.get_transport_schedule),
+                               description="Cari jadwal transportasi ke kota tertentu berdasarkan vektor dari FAISS."),
+            Tool.from_function(name="get_promo", func=wrap_tool_with_context(tools.get_promo),
+                               description="Lihat semua promo perjalanan yang tersedia."),
+            Tool.from_function(name="get_promo_by_city", func=wrap_tool_with_context(tools.get_promo_by_city),
+                               description="Lihat promo perjalanan untuk kota tertentu."),
+            Tool.from_function(name="get_destination_info", func=wrap_tool_with_context(tools.get_destination_info),
+                               description="Dapatkan info tempat wisata dan cuaca dari lokasi tertentu."),
+            Tool.from_function(name="get_hotel_availability", func=wrap_tool_with_context(tools.get_hotel_availability),
+                               description="Lihat hotel yang tersedia di lokasi tertentu."),
+            Tool.from_function(name="search_hotels", func=wrap_structured_tool(tools.search_hotels),
+                               description="Cari hotel dengan filter. Input JSON: location, check_in & check_out "
+                                           "(YYYY-MM-DD, check_out = tanggal keluar), min_price, max_price, "
+                                           "facilities (list), min_rating, order_by (price/rating), limit."),
+            Tool.from_function(name="get_translate_response", func=wrap_tool_with_context(tools.get_translate_response),
+                               description="Terjemahkan teks ke bahasa yang diminta."),
+            Tool.from_function(name="get_current_date", func=tools.get_current_date,
+                               description="Tampilkan tanggal dan waktu saat ini."),
+            Tool.from_function(name="get_recommendation_bundle",
+                               func=wrap_structured_tool(lambda s: tools.bundle_summary(tools.get_recommendation_bundle(s))),
+                               description="Rekomendasi paket kendaraan + hotel + promo termurah/terbaik ke kota tujuan. "
+                                           "Input JSON: location, date_from & date_to (YYYY-MM-DD, tanggal berangkat), "
+                                           "nights, budget, mode, facilities (list), min_rating, order_by (price/rating), limit."),
+            Tool.from_function(name="get_all_kendaraan_kota", func=tools.get_all_kendaraan_kota,
+                               description="Tampilkan semua moda transportasi dan kota tujuannya.")
+        ]
+
+    def _agent(self, session: Session, google_api_key: str):
+        # Agent memegang memory sesi; dibangun ulang hanya jika API key berubah
+        key = hashlib.sha1(google_api_key.encode()).hexdigest()
+        if session.agent is None or session.agent_key != key:
+            session.agent = resources.create_agent(self._llm(google_api_key), self._tool_list(session), session.memory)
+            session.agent_key = key
+        return session.agent
+
+    def _planner(self, session: Session, google_api_key: str):
+        # Tool & memory sama dengan agent ReAct; slot Gemini hanya dipegang selama panggilan LLM
+        key = hashlib.sha1(google_api_key.encode()).hexdigest()
+        if session.planner is None or session.planner_key != key:
+            session.planner = plan_agent.PlanExecuteAgent(self._llm(google_api_key), self._tool_list(session),
+                                                          session.memory, llm_slot=upstream.get("gemini").guard)
+            session.planner_key = key
+        return session.planner
+
+    # ====== Gemini ======
+    def get_gemini_general_info(self, question: str, context: str = None, sink=None, cache_key=None) -> str:
+        cached = self.answers.lookup("gemini", cache_key) if self.answers is not None and cache_key is not None else None
+        if cached:
+            tracing.annotate(cache=cached.kind)
+            if sink is not None:
+                sink.write(cached.answer)
+                sink.close()
+            return cached.answer
+        started = time.perf_counter()
+        context = context or "No previous context"
+        prompt = f"Berikan jawaban dalam bahasa Indonesia berdasarkan konteks berikut:\n{context}\nPertanyaan: {question}\nJika konteks menyebutkan kota sebelumnya (misalnya Surabaya), gunakan kota itu sebagai default kecuali pengguna menyebut kota baru."
+        if sink is not None:
+            answer = streaming.stream_gemini(prompt, sink)
+        else:
+            answer = upstream.gemini_generate(prompt, source="fallback").text.strip()
+        if self.answers is not None and cache_key is not None:
+            self.answers.store("gemini", cache_key, answer, llm_calls=1, latency_s=time.perf_counter() - started)
+        return answer
+
+    def _summarize(self, summary: str, turns: list) -> str:
+        # Ringkasan berjalan memori sesi; None/gagal = session_memory memakai ringkasan ekstraktif
+        if session_memory.SUMMARIZER != "llm":
+            return None
+        prompt = session_memory.SUMMARY_PROMPT.format(max_words=session_memory.SUMMARY_TOKENS // 2,
+                                                      summary=summary or "-",
+                                                      turns=session_memory.render_turns(turns))
+        return upstream.gemini_generate(prompt, source="memory").text.strip()
+
+    # ====== Deteksi Otomatis Promo & Bundle ======
+    def detect_city_for_promo(self, session: Session, text: str):
+        kota = tools.gazetteer.first_city(text, source="promo")
+        return kota or session.last_city  # Gunakan kota terakhir jika tidak ada yang baru
+
+    def detect_recommendation_bundle(self, session: Session, text: str):
+        text = text.lower()
+        if "rekomendasi" in text and ("hotel" in text or "penginapan" in text) and ("kendaraan" in text or "transport" in text):
+            kota = tools.gazetteer.first_city(text, source="hotel")
+            # Gunakan kota terakhir jika tidak ada yang baru
+            return kota or session.last_city
+        return None  # bukan permintaan bundle; biarkan router/agent yang menangani
+
+    def handle_transport_query(self, session: Session, entries: list, user_input: str) -> bool:
+        kota_dicari = None
+
+        # Cari kota berdasarkan riwayat atau input (satu kali scan gazetteer per pesan)
+        for role, msg in session.history:
+            if role == "User":
+                kota_dicari = tools.gazetteer.first_city(msg, source="transport")
+                if kota_dicari:
+                    break
+        if not kota_dicari:
+            kota_dicari = tools.gazetteer.first_city(user_input, source="transport")
+        if not kota_dicari and tools.gazetteer.has_city(session.last_city, source="transport"):
+            kota_dicari = session.last_city
+
+        # Cari jenis kendaraan dari kolom 'mode'
+        mode_dicari = tools.gazetteer.first_mode(user_input)
+
+        if kota_dicari:
+            df_filtered = tools.transport_index.select(kota_dicari, order_by="date")
+
+            # Filter juga jika mode kendaraan disebut
+            if mode_dicari:
+                df_filtered = df_filtered[df_filtered["mode"].str.strip().str.lower() == mode_dicari.lower()]
+
+            if not df_filtered.empty:
+                session.add(entries, "Bot", f"Berikut info {mode_dicari or 'transportasi'} menuju {kota_dicari.title()}")
+                session.add(entries, "Table", tools.table_ref("transport", df_filtered))
+                return True  # tanda bahwa pertanyaan sudah ditangani
+
+        return False  # tidak ada yang ditampilkan
+
+    # ====== Router Intent (tanpa LLM) ======
+    def handle_routed_intent(self, session: Session, entries: list, decision) -> bool:
+        # Intent terstruktur dijawab langsung dari index lokal, tanpa round trip ke Gemini
+        city = decision.args.get("location")
+        if decision.tool in ROUTED_TABLES:
+            dataset, title, order_by = ROUTED_TABLES[decision.tool]
+            df = tools.INDEXES[dataset].select(city, order_by=order_by)
+            mode = decision.args.get("mode")
+            if dataset == "transport" and mode:
+                df = df[df["mode"].str.strip().str.lower() == mode.lower()]
+            if df.empty:
+                return False
+            session.add(entries, "Bot", title.format(city=city.title()))
+            session.add(entries, "Table", tools.table_ref(dataset, df))
+            return True
+        if decision.tool == "get_promo":
+            session.add(entries, "Bot", "🏱 Berikut promo perjalanan yang tersedia:")
+            session.add(entries, "Table", tools.table_ref("promo", tools.promo_index.select(order_by="end_date", limit=tools.DEFAULT_LIMIT)))
+            return True
+        if decision.tool == "get_recommendation_bundle":
+            result = tools.get_recommendation_bundle(json.dumps({"location": city}))
+            self._add_bundle(session, entries, result)
+            return True
+        if decision.tool == "get_current_date":
+            session.add(entries, "Bot", tools.get_current_date())
+            return True
+        if decision.tool == "get_all_kendaraan_kota":
+            session.add(entries, "Bot", tools.get_all_kendaraan_kota())
+            return True
+        return False
+
+    def _add_bundle(self, session: Session, entries: list, result: dict):
+        if result["bundles"] is not None:
+            session.add(entries, "Bot", tools.bundle_summary(result))
+        else:
+            session.add(entries, "Bot", f"**Rekomendasi untuk kota {result['location']}:**")
+        if result["transport"] is not None:
+            session.add(entries, "Table", tools.table_ref("transport", result["transport"]))
+        if result["hotel"] is not None:
+            session.add(entries, "Table", tools.table_ref("hotel", result["hotel"]))
+
+    # ====== Agent ======
+    def run_agent(self, session: Session, entries: list, user_input: str, route, google_api_key: str,
+                  view: TurnView) -> tuple:
+        # Tambahkan konteks kota ke user_input jika ada last_city
+        enriched_input = user_input
+        if session.last_city:
+            enriched_input = f"Untuk {session.last_city}, {user_input}"
+
+        # Jawaban di-stream ke view; langkah tool tampil saat dijalankan
+        view.show_user(user_input)
+        sink = view.new_sink()
+        handler = streaming.StreamlitAgentHandler(sink, view)
+        path = "agent"
+        mode = plan_agent.choose_mode(session.session_id, self.agent_mode)
+        llm_calls, tool_calls, first_llm_token_s = 0, None, None
+        # Bagian riwayat dari prompt (dibatasi MEMORY_TOKEN_BUDGET), dicatat per turn
+        memory_tokens = session.context.tokens()
+        # Pertanyaan serupa (kota + intent, atau embedding mirip) dijawab dari cache tanpa ReAct loop
+        cache_key = answer_cache.make_key(enriched_input, route.intent, route.confidence,
+                                          route.args.get("location"), tools.gazetteer)
+        cached = self.answers.lookup("agent", cache_key) if self.answers is not None else None
+        try:
+            if cached:
+                path = "cache"
+                tracing.annotate(cache=cached.kind)
+                response = cached.answer
+                sink.write(response)
+            elif mode == "plan":
+                planner = self._planner(session, google_api_key)
+                try:
+                    response = planner.run(enriched_input, sink, view, callbacks=tracing.langchain_callbacks())
+                finally:
+                    llm_calls = planner.stats.get("llm_calls", 0)
+                tool_calls, first_llm_token_s = planner.stats["tool_calls"], planner.stats["first_llm_token_s"]
+            else:
+                agent_executor = self._agent(session, google_api_key)
+                try:
+                    with upstream.get("gemini").guard():
+                        response = agent_executor.run(enriched_input, callbacks=[handler, *tracing.langchain_callbacks()])
+                finally:
+                    llm_calls = handler.llm_calls
+                tool_calls, first_llm_token_s = handler.tool_calls, handler.first_llm_token_s
+            if not cached:
+                if not response or "I don't know" in response.lower():
+                    raise ValueError("Jawaban tidak relevan, pakai fallback")
+                if self.answers is not None:
+                    self.answers.store("agent", cache_key, response, llm_calls=llm_calls, latency_s=sink.elapsed_s)
+            sink.close()
+        except Exception:
+            # Fallback ke Gemini dengan konteks riwayat
+            path = "gemini"
+            sink = view.new_sink(started=sink.started)   # TTFT & total tetap dari awal turn
+            try:
+                response = self.get_gemini_general_info(enriched_input, session.context.render(), sink=sink,
+                                                        cache_key=cache_key)
+                llm_calls += 1
+            except upstream.UpstreamError as e:
+                # Gemini tidak tersedia (circuit terbuka / deadline): langsung jawab dari data lokal
+                path = "degraded"
+                tracing.annotate(upstream_error=str(e))
+                response = DEGRADED_ANSWER
+                sink.write(response)
+                sink.close()
+        view.finish_steps()
+        session.add(entries, "Bot", response)
+        if path == "degraded" and route.args.get("location"):
+            # Intent berkeyakinan rendah tetap dicoba: tabel lokal lebih baik daripada tidak ada jawaban
+            self.handle_routed_intent(session, entries, route._replace(tool=route.tool or route.intent))
+        # agent_mode & llm_calls untuk perbandingan A/B (benchmarks/agent_ab.py, tracing)
+        tracing.annotate(agent_mode=mode, llm_calls=llm_calls, memory_tokens=memory_tokens,
+                         prompt_tokens=memory_tokens + session_memory.estimate_tokens(enriched_input))
+        tracing.incr("travel_agent_turns_total", mode=mode, path=path)
+        tracing.incr("travel_agent_llm_calls_total", llm_calls, mode=mode)
+        metrics = {"path": path, "ttft_s": sink.first_token_s, "total_s": sink.elapsed_s,
+                   "first_llm_token_s": first_llm_token_s, "agent_mode": mode, "llm_calls": llm_calls,
+                   "tool_calls": tool_calls, "memory_tokens": memory_tokens}
+        return path, metrics
+
+    # ====== Proses Utama ======
+    def handle(self, session_id: str, user_input: str, last_city: str = None, google_api_key: str = "",
+               view: TurnView = None) -> TurnResult:
+        view = view or TurnView()
+        session = self.session(session_id)
+        # Seluruh turn (routing, tool, agent) membaca satu snapshot data, walau reload terjadi di tengah turn
+        with session.lock, tools.pinned() as snapshot:
+            tracing.annotate(snapshot=snapshot.version)
+            session.last_city = last_city
+            with tracing.span("routing") as routing_span:
+                kota_promo = self.detect_city_for_promo(session, user_input)
+                kota_bundle = self.detect_recommendation_bundle(session, user_input)
+                route = intent_router.get_router(tools.gazetteer).route(user_input, session.last_city)
+                routing_span.set(intent=route.intent, confidence=round(route.confidence, 3), reason=route.reason)
+
+            entries = []
+            metrics = None
+            try:
+                session.add(entries, "User", user_input)
+
+                if kota_bundle:
+                    path = "bundle"
+                    # Pastikan kota_bundle ada, gunakan last_city sebagai fallback
+                    city_to_use = kota_bundle or session.last_city
+                    if not city_to_use:
+                        session.add(entries, "Bot", "Kota tujuan belum ditentukan. Silakan masukkan kota terlebih dahulu.")
+                    else:
+                        self._add_bundle(session, entries, tools.get_recommendation_bundle(city_to_use))
+
+                elif kota_promo and "promo" in user_input.lower():
+                    path = "promo"
+                    promo_df = tools.promo_index.select(kota_promo, order_by="end_date")
+                    if not promo_df.empty:
+                        session.add(entries, "Bot", f"🏱 Berikut promo yang tersedia untuk kota **{kota_promo.title()}**:")
+                        session.add(entries, "Table", tools.table_ref("promo", promo_df))
+                    else:
+                        session.add(entries, "Bot", f"🏱 Tidak ada promo tersedia untuk kota **{kota_promo.title()}**.")
+
+                elif any(kata in user_input.lower() for kata in TRANSPORT_KEYWORDS):
+                    path = "transport"
+                    if not self.handle_transport_query(session, entries, user_input):
+                        session.add(entries, "Bot", "⚠️ Tidak ditemukan data transportasi yang cocok.")
+
+                elif route.tool and self.handle_routed_intent(session, entries, route):
+                    path = "router"  # Dijawab langsung oleh tool lokal, tanpa agent
+                    tracing.annotate(tool=route.tool)
+
+                else:
+                    path, metrics = self.run_agent(session, entries, user_input, route, google_api_key, view)
+
+            except Exception as e:
+                path = "error"
+                session.add(entries, "Bot", f"🚨 Kesalahan: {e}")
+
+            session.remember(entries, self._summarize)
+            tracing.annotate(branch=path)
+            return TurnResult(entries, path, metrics, snapshot.version,
+                              f"{route.intent} ({route.confidence:.2f}, {route.reason})")
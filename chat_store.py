@@ -0,0 +1,57 @@
+import os
+import math
+
+import pandas as pd
+
+from table_index import TableRef
+
+# ====== Batas Riwayat & Jendela Render ======
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "200"))   # entri maksimum per sesi
+RENDER_WINDOW = int(os.getenv("CHAT_RENDER_WINDOW", "12"))         # entri per halaman di area utama
+SIDEBAR_WINDOW = int(os.getenv("CHAT_SIDEBAR_WINDOW", "8"))        # entri terakhir di sidebar
+
+
+def append(history: list, role: str, msg, limit: int = CHAT_HISTORY_LIMIT):
+    history.append((role, msg))
+    if limit and len(history) > limit:
+        del history[:len(history) - limit]
+
+
+def render_entry(target, role: str, msg, resolve, full: bool = True):
+    if role == "User":
+        target.markdown(f"🧟‍♂️ **User:** {msg}")
+    elif role == "Bot":
+        target.markdown(f"🤖 **Bot:** {msg}")
+    elif role == "Table":
+        if not full:
+            target.caption(f"📊 {msg}")
+            return
+        # Tabel baru di-resolve ke DataFrame saat dirender
+        df = resolve(msg) if isinstance(msg, TableRef) else msg
+        if df is None:
+            target.caption("⚠️ Data tabel sudah diperbarui, tabel lama tidak tersedia.")
+        elif isinstance(df, pd.DataFrame):
+            target.dataframe(df.reset_index(drop=True))
+
+
+def render_recent(target, history: list, resolve, window: int = SIDEBAR_WINDOW):
+    # Versi ringkas untuk sidebar: hanya entri terakhir, tabel sebagai keterangan singkat
+    if len(history) > window:
+        target.caption(f"… {len(history) - window} pesan sebelumnya")
+    for role, msg in history[-window:]:
+        render_entry(target, role, msg, resolve, full=False)
+
+
+def render_paginated(target, history: list, resolve, window: int = RENDER_WINDOW, key: str = "history_page"):
+    total = len(history)
+    pages = max(1, math.ceil(total / window))
+    page = 1
+    if pages > 1:
+        page = int(target.number_input("Halaman riwayat (1 = terbaru)", min_value=1, max_value=pages,
+                                       value=1, step=1, key=key))
+    end = total - (page - 1) * window
+    start = max(0, end - window)
+    if start > 0:
+        target.caption(f"… {start} pesan lebih lama di halaman berikutnya")
+    for role, msg in history[start:end]:
+        render_entry(target, role, msg, resolve)
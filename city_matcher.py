@@ -0,0 +1,245 @@
+from collections import deque
+from typing import NamedTuple
+
+# ====== Alias & Variasi Penulisan ======
+# alias -> nama kanonik; hanya dipakai jika nama kanoniknya ada di dataset
+CITY_ALIASES = {
+    "jogja": "Yogyakarta",
+    "jogjakarta": "Yogyakarta",
+    "yogya": "Yogyakarta",
+    "djokja": "Yogyakarta",
+    "jkt": "Jakarta",
+    "dki jakarta": "Jakarta",
+    "sby": "Surabaya",
+    "suroboyo": "Surabaya",
+    "bdg": "Bandung",
+    "makasar": "Makassar",
+    "ujung pandang": "Makassar",
+    "surakarta": "Solo",
+    "palangka raya": "Palangkaraya",
+    "pangkal pinang": "Pangkalpinang",
+    "pare pare": "Parepare",
+    "tangsel": "Tangerang Selatan",
+    "padang panjang": "Padangpanjang",
+    "padangsidempuan": "Padang Sidempuan",
+    "pematang siantar": "Pematangsiantar",
+    "tebing tinggi": "Tebingtinggi",
+    "bandarlampung": "Bandar Lampung",
+    "singapura": "Singapore",
+    "kl": "Kuala Lumpur",
+}
+
+MODE_ALIASES = {
+    "bus": "bis",
+    "kereta api": "kereta",
+    "krl": "kereta",
+    "pesawat terbang": "pesawat",
+    "kapal laut": "kapal",
+    "kapal ferry": "kapal",
+    "ferry": "kapal",
+}
+
+TYPO_MIN_LENGTH = 7  # nama pendek tidak diberi varian typo agar tidak bentrok dengan kata umum
+
+
+class Mention(NamedTuple):
+    kind: str       # "city" atau "mode"
+    value: str      # nama kanonik
+    start: int
+    end: int
+    surface: str    # potongan teks asli yang cocok
+    exact: bool     # False jika cocok lewat varian typo
+
+
+def normalize(text: str) -> str:
+    # Panjang string dipertahankan agar posisi match bisa dipetakan ke teks asli
+    return "".join(ch if ch.isalnum() else " " for ch in str(text).lower())
+
+
+def _pattern_key(name: str) -> str:
+    return " ".join(normalize(name).split())
+
+
+def _typo_variants(key: str) -> set:
+    # Hapus satu huruf (kecuali huruf pertama) dan tukar dua huruf bersebelahan
+    variants = set()
+    for i in range(1, len(key)):
+        if key[i] != " ":
+            variants.add(key[:i] + key[i + 1:])
+    for i in range(1, len(key) - 1):
+        if key[i] != key[i + 1] and " " not in key[i:i + 2]:
+            variants.add(key[:i] + key[i + 1] + key[i] + key[i + 2:])
+    variants.discard(key)
+    return variants
+
+
+# Gazetteer kota & moda transportasi berbasis automaton Aho-Corasick.
+# Semua nama dicari dalam satu kali scan teks, dengan batas kata dan leftmost-longest match,
+# sehingga biaya per pesan tidak bergantung pada jumlah kota di katalog.
+class CityGazetteer:
+    def __init__(self):
+        self._entities = {}     # (kind, key kanonik) -> {"value": ..., "sources": set()}
+        self._patterns = {}     # pola -> (kind, key kanonik, exact) ; None jika ambigu
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    # ====== Registrasi ======
+    def add_entity(self, kind: str, name: str, source: str = None):
+        key = _pattern_key(name)
+        if not key:
+            return
+        entity = self._entities.setdefault((kind, key), {"value": str(name).strip(), "sources": set()})
+        if kind == "city" and entity["value"].islower() and not str(name).strip().islower():
+            entity["value"] = str(name).strip()  # utamakan "Solo" daripada "solo"
+        if source:
+            entity["sources"].add(source)
+        self._built = False
+
+    def build(self):
+        patterns = {}
+        typo_patterns = {}
+        for kind, key in self._entities:
+            patterns[key] = (kind, key, True)
+        aliases = [(CITY_ALIASES, "city"), (MODE_ALIASES, "mode")]
+        for table, kind in aliases:
+            for alias, target in table.items():
+                target_key = _pattern_key(target)
+                if (kind, target_key) in self._entities:
+                    patterns.setdefault(_pattern_key(alias), (kind, target_key, True))
+        for (kind, key) in self._entities:
+            if kind == "city" and len(key) >= TYPO_MIN_LENGTH:
+                for variant in _typo_variants(key):
+                    if variant in typo_patterns and typo_patterns[variant] != (kind, key, False):
+                        typo_patterns[variant] = None  # varian milik dua kota: abaikan
+                    else:
+                        typo_patterns[variant] = (kind, key, False)
+        for variant, target in typo_patterns.items():
+            if target is not None and variant not in patterns:
+                patterns[variant] = target
+        self._patterns = patterns
+        self._compile(list(patterns))
+        self._built = True
+        return self
+
+    def _compile(self, keys: list):
+        goto, out = [{}], [[]]
+        for key in keys:
+            state = 0
+            for ch in key:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(key)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    # ====== Pencarian ======
+    def find_all(self, text: str) -> list:
+        if not self._built:
+            self.build()
+        if not text:
+            return []
+        norm = normalize(text)
+        # Spasi ganda di teks dipadatkan agar "Banda  Aceh" tetap cocok; simpan peta posisi
+        chars, positions = [], []
+        prev_space = True
+        for i, ch in enumerate(norm):
+            if ch == " ":
+                if prev_space:
+                    continue
+                prev_space = True
+            else:
+                prev_space = False
+            chars.append(ch)
+            positions.append(i)
+        compact = "".join(chars)
+
+        goto, fail, out = self._goto, self._fail, self._out
+        candidates = []
+        state = 0
+        for i, ch in enumerate(compact):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for key in out[state]:
+                start = i - len(key) + 1
+                end = i + 1
+                # Batas kata: "Metro" tidak cocok di dalam "metropolitan"
+                if start > 0 and compact[start - 1] != " ":
+                    continue
+                if end < len(compact) and compact[end] != " ":
+                    continue
+                candidates.append((start, end, key))
+
+        # Leftmost-longest, tanpa tumpang tindih
+        candidates.sort(key=lambda c: (c[0], -(c[1] - c[0])))
+        mentions = []
+        last_end = -1
+        for start, end, key in candidates:
+            if start < last_end:
+                continue
+            kind, entity_key, exact = self._patterns[key]
+            entity = self._entities[(kind, entity_key)]
+            orig_start, orig_end = positions[start], positions[end - 1] + 1
+            mentions.append(Mention(kind, entity["value"], orig_start, orig_end, text[orig_start:orig_end], exact))
+            last_end = end
+        return mentions
+
+    def find_cities(self, text: str, source: str = None) -> list:
+        return [m for m in self.find_all(text) if m.kind == "city" and self._has(m, source)]
+
+    def find_modes(self, text: str) -> list:
+        return [m for m in self.find_all(text) if m.kind == "mode"]
+
+    def first_city(self, text: str, source: str = None):
+        cities = self.find_cities(text, source)
+        return cities[0].value if cities else None
+
+    def first_mode(self, text: str):
+        modes = self.find_modes(text)
+        return modes[0].value if modes else None
+
+    def has_city(self, name: str, source: str = None) -> bool:
+        entity = self._entities.get(("city", _pattern_key(name or "")))
+        return entity is not None and (source is None or source in entity["sources"])
+
+    def cities(self, source: str = None) -> list:
+        return sorted(e["value"] for (kind, _), e in self._entities.items()
+                      if kind == "city" and (source is None or source in e["sources"]))
+
+    def _has(self, mention: Mention, source: str) -> bool:
+        if source is None:
+            return True
+        return source in self._entities[(mention.kind, _pattern_key(mention.value))]["sources"]
+
+
+def build_from_datasets(df_transport, df_promo, df_destination, df_hotel) -> CityGazetteer:
+    gazetteer = CityGazetteer()
+    columns = [
+        (df_transport, "destination", "transport"),
+        (df_promo, "location", "promo"),
+        (df_destination, "location", "destination"),
+        (df_hotel, "location", "hotel"),
+    ]
+    for df, col, source in columns:
+        for name in df[col].dropna().unique():
+            gazetteer.add_entity("city", name, source)
+    for mode in df_transport["mode"].dropna().unique():
+        gazetteer.add_entity("mode", mode, "transport")
+    return gazetteer.build()
@@ -0,0 +1,198 @@
+import time
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# Cache sederhana dengan TTL dan batas ukuran (LRU), aman dipakai lintas thread/sesi
+class TTLCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Single-flight: panggilan serentak dengan key yang sama hanya menjalankan fungsi sekali,
+# pemanggil lain menunggu hasil yang sama.
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# Micro-batching: permintaan dari banyak thread/sesi dikumpulkan selama `window` detik
+# (atau sampai max_batch) lalu diproses dengan satu panggilan fn(list item) -> list hasil.
+class MicroBatcher:
+    def __init__(self, fn, window: float = 0.005, max_batch: int = 96, max_in_flight: int = 2,
+                 name: str = "batcher"):
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = {"items": 0, "batches": 0, "largest_batch": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Batch berikutnya tetap dikumpulkan selama batch sebelumnya masih berjalan; jika semua slot
+        # terpakai, antrean terus bertambah sehingga batch berikutnya lebih besar
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=name)
+        threading.Thread(target=self._collect, name=f"{name}-collector", daemon=True).start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            self._slots.acquire()
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._pool.submit(self._run, batch)
+            except RuntimeError as e:   # pool sudah ditutup (proses berhenti)
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+
+    def _run(self, batch: list):
+        with self._lock:
+            self.stats["items"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        try:
+            results = self.fn([item for item, _ in batch])
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            batches = self.stats["batches"]
+            return dict(self.stats, mean_batch=(self.stats["items"] / batches) if batches else 0.0)
+
+
+# Batas konkurensi per layanan hulu (mis. gemini, cohere), dibagi semua sesi dalam proses
+class UpstreamLimiter:
+    def __init__(self, limits: dict):
+        self.limits = dict(limits)
+        self._semaphores = {name: threading.BoundedSemaphore(n) for name, n in limits.items()}
+        self._lock = threading.Lock()
+        self._stats = {name: {"calls": 0, "in_use": 0, "waiting": 0, "wait_s": 0.0, "rejected": 0} for name in limits}
+
+    def acquire(self, name: str, timeout: float = None, max_waiting: int = None) -> bool:
+        # False jika slot tidak didapat sebelum timeout, atau antrean sudah max_waiting (load shedding)
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:   # layanan tanpa batas
+            return True
+        stat = self._stats[name]
+        with self._lock:
+            if max_waiting is not None and stat["waiting"] >= max_waiting:
+                stat["rejected"] += 1
+                return False
+            stat["waiting"] += 1
+        start = time.perf_counter()
+        acquired = semaphore.acquire(timeout=timeout) if timeout is not None else semaphore.acquire()
+        with self._lock:
+            stat["waiting"] -= 1
+            stat["wait_s"] += time.perf_counter() - start
+            if not acquired:
+                stat["rejected"] += 1
+                return False
+            stat["in_use"] += 1
+            stat["calls"] += 1
+        return True
+
+    def release(self, name: str):
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            return
+        with self._lock:
+            self._stats[name]["in_use"] -= 1
+        semaphore.release()
+
+    @contextmanager
+    def slot(self, name: str):
+        self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {name: dict(stat, limit=self.limits[name]) for name, stat in self._stats.items()}
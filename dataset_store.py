@@ -0,0 +1,204 @@
+import os
+import hashlib
+import argparse
+from typing import NamedTuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # tanpa pyarrow: dataset selalu dibaca dari CSV
+    pa = None
+
+# ====== Lokasi & Format ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.getenv("TRAVEL_DATASET_DIR", os.path.join(BASE_DIR, "dataset"))
+# auto = pakai file Arrow jika ada dan masih sesuai dengan CSV-nya; csv = selalu baca CSV
+DATASET_FORMAT = os.getenv("TRAVEL_DATASET_FORMAT", "auto")
+TYPED_SUFFIX = ".arrow"
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+
+
+# Tipe kolom per dataset; kolom yang tidak disebut tetap string
+class DatasetSchema(NamedTuple):
+    filename: str
+    dates: tuple = ()
+    categories: tuple = ()
+    integers: tuple = ()
+    floats: tuple = ()
+    lists: dict = {}          # kolom -> pemisah
+    date_lists: tuple = ()    # kolom list yang isinya tanggal
+
+
+SCHEMAS = {
+    "transport": DatasetSchema(
+        "Transport_schedule.csv", dates=("date",),
+        categories=("mode", "destination", "provider", "departure_time", "arrival_time"),
+        integers=("price",)),
+    "promo": DatasetSchema(
+        "promo_travel.csv", dates=("start_date", "end_date"), categories=("promo_type", "location")),
+    "destination": DatasetSchema(
+        "destination_info.csv", categories=("location",),
+        lists={"popular_places": ",", "public_transport": ","}),
+    "hotel": DatasetSchema(
+        "hotel_availability.csv", categories=("location",), integers=("price_per_night",),
+        floats=("rating",), lists={"facilities": ",", "available_dates": ","}, date_lists=("available_dates",)),
+}
+
+
+def csv_path(name: str, dataset_dir: str = DATASET_DIR) -> str:
+    return os.path.join(dataset_dir, SCHEMAS[name].filename)
+
+
+def typed_path(name: str, dataset_dir: str = DATASET_DIR) -> str:
+    return os.path.splitext(csv_path(name, dataset_dir))[0] + TYPED_SUFFIX
+
+
+def file_version(path: str) -> str:
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()[:12]
+
+
+# ====== Konversi CSV -> Arrow bertipe ======
+def _parse_dates(column):
+    parsed = [pc.strptime(column, format=fmt, unit="s", error_is_null=True) for fmt in DATE_FORMATS]
+    return pc.coalesce(*parsed).cast(pa.date32())
+
+
+def _split_list(column, sep: str, as_date: bool = False):
+    chunks = []
+    for chunk in pc.split_pattern(column, sep).chunks:
+        values = pc.utf8_trim_whitespace(chunk.flatten())
+        if as_date:
+            values = _parse_dates(values)
+        offsets = pc.subtract(chunk.offsets, chunk.offsets[0])
+        chunks.append(pa.ListArray.from_arrays(offsets, values))
+    item = pa.date32() if as_date else pa.string()
+    return pa.chunked_array(chunks, type=pa.list_(item))
+
+
+def _narrow_int(column):
+    bounds = pc.min_max(column)
+    low, high = bounds["min"].as_py() or 0, bounds["max"].as_py() or 0
+    for arrow_type, limit in ((pa.int8(), 2 ** 7), (pa.int16(), 2 ** 15), (pa.int32(), 2 ** 31)):
+        if -limit <= low and high < limit:
+            return column.cast(arrow_type)
+    return column.cast(pa.int64())
+
+
+def _categorical(column):
+    encoded = pc.dictionary_encode(column)
+    size = max((len(chunk.dictionary) for chunk in encoded.chunks), default=0)
+    index_type = pa.int8() if size < 2 ** 7 else pa.int16() if size < 2 ** 15 else pa.int32()
+    return encoded.cast(pa.dictionary(index_type, pa.string()))
+
+
+def read_typed_csv(path: str, schema: DatasetSchema):
+    # Semua kolom non-angka dibaca sebagai string dulu agar inferensi pyarrow tidak menebak tipe sendiri
+    header = pd.read_csv(path, nrows=0).columns
+    numeric = set(schema.integers) | set(schema.floats)
+    options = pa_csv.ConvertOptions(column_types={c: pa.string() for c in header if c not in numeric})
+    table = pa_csv.read_csv(path, convert_options=options)
+
+    columns = []
+    for name in table.column_names:
+        column = table[name]
+        if name in schema.dates:
+            column = _parse_dates(column)
+        elif name in schema.lists:
+            column = _split_list(column, schema.lists[name], as_date=name in schema.date_lists)
+        elif name in schema.categories:
+            column = _categorical(column)
+        elif name in schema.integers:
+            column = _narrow_int(column)
+        elif name in schema.floats:
+            column = column.cast(pa.float32())
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
+
+
+def convert(name: str, dataset_dir: str = DATASET_DIR) -> str:
+    source = csv_path(name, dataset_dir)
+    table = read_typed_csv(source, SCHEMAS[name])
+    stat = os.stat(source)
+    # Identitas CSV sumber disimpan di metadata, dipakai untuk mendeteksi file Arrow yang basi
+    table = table.replace_schema_metadata({
+        "source_version": file_version(source),
+        "source_size": str(stat.st_size),
+        "source_mtime_ns": str(stat.st_mtime_ns),
+    })
+    target = typed_path(name, dataset_dir)
+    tmp_path = f"{target}.tmp"
+    # IPC tanpa kompresi agar bisa di-memory-map tanpa salinan
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, target)
+    return target
+
+
+def convert_all(dataset_dir: str = DATASET_DIR) -> dict:
+    return {name: convert(name, dataset_dir) for name in SCHEMAS}
+
+
+# ====== Load ======
+def _typed_is_fresh(metadata: dict, source: str) -> bool:
+    if not os.path.exists(source):
+        return True  # hanya file Arrow yang tersedia
+    stat = os.stat(source)
+    if str(stat.st_size) != metadata.get("source_size"):
+        return False
+    if str(stat.st_mtime_ns) == metadata.get("source_mtime_ns"):
+        return True
+    # mtime berubah (mis. setelah checkout ulang): cek isi
+    return file_version(source) == metadata.get("source_version")
+
+
+def _to_pandas(table) -> pd.DataFrame:
+    # String & list tetap di buffer Arrow (ter-mmap); kategori jadi pandas Categorical
+    def types_mapper(arrow_type):
+        if pa.types.is_string(arrow_type) or pa.types.is_list(arrow_type):
+            return pd.ArrowDtype(arrow_type)
+        return None
+    return table.to_pandas(types_mapper=types_mapper, date_as_object=False)
+
+
+def load(name: str, dataset_dir: str = DATASET_DIR, fmt: str = DATASET_FORMAT):
+    # -> (DataFrame, versi CSV sumber, format yang dipakai)
+    source = csv_path(name, dataset_dir)
+    target = typed_path(name, dataset_dir)
+    if pa is not None and fmt != "csv" and os.path.exists(target):
+        source_file = pa.memory_map(target, "r")
+        table = pa.ipc.open_file(source_file).read_all()
+        metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+        if _typed_is_fresh(metadata, source):
+            return _to_pandas(table), metadata.get("source_version"), "arrow"
+    return pd.read_csv(source), file_version(source), "csv"
+
+
+def as_text_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Kolom list digabung kembali jadi "a, b, c" untuk teks yang dikirim ke LLM
+    list_columns = [c for c in df.columns
+                    if isinstance(df[c].dtype, pd.ArrowDtype) and pa.types.is_list(df[c].dtype.pyarrow_dtype)]
+    if not list_columns:
+        return df
+    df = df.copy()
+    for col in list_columns:
+        values = pc.cast(df[col].array._pa_array, pa.list_(pa.string()))
+        df[col] = pd.Series(pc.binary_join(values, ", "), index=df.index).fillna("")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Konversi dataset CSV ke file Arrow bertipe (memory-mappable).")
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    args = parser.parse_args()
+
+    if pa is None:
+        raise SystemExit("⚠️ pyarrow belum terpasang: pip install pyarrow")
+    for name, path in convert_all(args.dataset_dir).items():
+        print(f"✅ {name}: {os.path.relpath(path, args.dataset_dir)} ({os.path.getsize(path) / 1e6:.1f} MB)")
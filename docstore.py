@@ -0,0 +1,176 @@
+import os
+import json
+import pickle
+import sqlite3
+import argparse
+import threading
+from collections.abc import Mapping
+
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+# ====== Lokasi File ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.getenv("TRAVEL_INDEX_DIR", os.path.join(BASE_DIR, "faiss_travel_assistant"))
+DOCSTORE_FILENAME = "docstore.sqlite"
+LEGACY_FILENAME = "index.pkl"   # format lama FAISS.save_local (pickle)
+
+# Satu baris per vektor; faiss_id = posisi vektor di index FAISS
+SCHEMA = """
+CREATE TABLE documents (
+    faiss_id INTEGER PRIMARY KEY,
+    doc_id   TEXT NOT NULL UNIQUE,
+    content  TEXT NOT NULL,
+    metadata TEXT NOT NULL
+)
+"""
+
+
+def docstore_path(index_dir: str) -> str:
+    return os.path.join(index_dir, DOCSTORE_FILENAME)
+
+
+def is_legacy(index_dir: str) -> bool:
+    return not os.path.exists(docstore_path(index_dir)) and os.path.exists(os.path.join(index_dir, LEGACY_FILENAME))
+
+
+# ====== Docstore SQLite (read-only, dibaca per baris hasil) ======
+class SQLiteDocstore(Docstore):
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()   # satu koneksi per thread (sesi Streamlit, pool tool)
+        # Koneksi awal memegang file yang dimuat. Jika index ditulis ulang (hot reload), thread baru
+        # yang masih memakai snapshot lama membaca lewat koneksi ini, bukan file pengganti di path yang sama.
+        self._origin = self._connect()
+        self._origin.execute("SELECT 1 FROM documents LIMIT 1").fetchall()   # paksa file dibuka sekarang
+        self._inode = os.stat(path).st_ino
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            replaced = not os.path.exists(self.path) or os.stat(self.path).st_ino != self._inode
+            conn = self._origin if replaced else self._connect()
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and conn is not self._origin:
+            conn.close()
+        self._origin.close()
+
+    def search(self, search: str):
+        row = self.connection.execute(
+            "SELECT content, metadata FROM documents WHERE doc_id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."  # sama dengan InMemoryDocstore
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+class SQLiteIdMap(Mapping):
+    # Pengganti dict index_to_docstore_id: FAISS id -> doc_id, dibaca saat dibutuhkan
+    def __init__(self, store: SQLiteDocstore):
+        self.store = store
+
+    def __getitem__(self, faiss_id):
+        row = self.store.connection.execute(
+            "SELECT doc_id FROM documents WHERE faiss_id = ?", (int(faiss_id),)).fetchone()
+        if row is None:
+            raise KeyError(faiss_id)
+        return row[0]
+
+    def __iter__(self):
+        for (faiss_id,) in self.store.connection.execute("SELECT faiss_id FROM documents ORDER BY faiss_id"):
+            yield faiss_id
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def items(self):
+        # Satu query untuk semua pasangan id (tanpa isi dokumen)
+        return self.store.connection.execute("SELECT faiss_id, doc_id FROM documents ORDER BY faiss_id").fetchall()
+
+    def values(self):
+        return [doc_id for _, doc_id in self.items()]
+
+
+def open_docstore(index_dir: str):
+    # -> (docstore, index_to_docstore_id) untuk konstruktor FAISS LangChain
+    store = SQLiteDocstore(docstore_path(index_dir))
+    return store, SQLiteIdMap(store)
+
+
+def load_in_memory(index_dir: str):
+    # Untuk build inkremental: FAISS.add/delete butuh docstore & dict yang bisa diubah
+    store, id_map = open_docstore(index_dir)
+    documents = {}
+    index_to_docstore_id = {}
+    for faiss_id, doc_id, content, metadata in store.connection.execute(
+            "SELECT faiss_id, doc_id, content, metadata FROM documents ORDER BY faiss_id"):
+        documents[doc_id] = Document(id=doc_id, page_content=content, metadata=json.loads(metadata))
+        index_to_docstore_id[faiss_id] = doc_id
+    store.close()
+    return InMemoryDocstore(documents), index_to_docstore_id
+
+
+# ====== Tulis ======
+def _rows(docstore, index_to_docstore_id):
+    for faiss_id, doc_id in sorted(index_to_docstore_id.items()):
+        doc = docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            raise ValueError(f"Dokumen {doc_id} (FAISS id {faiss_id}) tidak ada di docstore.")
+        yield int(faiss_id), doc_id, doc.page_content, json.dumps(doc.metadata or {}, ensure_ascii=False)
+
+
+def write_docstore(index_dir: str, docstore, index_to_docstore_id) -> int:
+    path = docstore_path(index_dir)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(SCHEMA)
+        conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", _rows(docstore, index_to_docstore_id))
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+# ====== Migrasi index.pkl -> docstore.sqlite ======
+def migrate(index_dir: str = INDEX_DIR, keep_pickle: bool = False) -> int:
+    legacy_path = os.path.join(index_dir, LEGACY_FILENAME)
+    if not os.path.exists(legacy_path):
+        raise FileNotFoundError(f"{legacy_path} tidak ditemukan.")
+    # Satu-satunya tempat pickle masih dibuka: file lama milik sendiri, dijalankan manual
+    with open(legacy_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    count = write_docstore(index_dir, docstore, index_to_docstore_id)
+    if count != len(index_to_docstore_id):
+        raise ValueError(f"Migrasi tidak lengkap: {count} dari {len(index_to_docstore_id)} dokumen.")
+    if not keep_pickle:
+        os.remove(legacy_path)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Docstore SQLite untuk index FAISS travel assistant.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate", help="Konversi index.pkl lama ke docstore.sqlite")
+    migrate_parser.add_argument("--index-dir", default=INDEX_DIR)
+    migrate_parser.add_argument("--keep-pickle", action="store_true", help="Jangan hapus index.pkl setelah migrasi")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        count = migrate(args.index_dir, args.keep_pickle)
+        print(f"✅ {count} dokumen dipindahkan ke {docstore_path(args.index_dir)}")
@@ -0,0 +1,202 @@
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import tracing
+from concurrency import MicroBatcher
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "embeddings.sqlite"))
+
+
+def normalize_text(text: str) -> str:
+    # "  Transportasi ke  SURABAYA " dan "transportasi ke surabaya" dianggap query yang sama
+    return " ".join(str(text).split()).casefold()
+
+
+# Wrapper embeddings dengan cache LRU di memori dan SQLite di disk.
+# Kunci cache = (model, jenis input, teks ternormalisasi). Query yang sudah pernah
+# di-embed tidak memanggil API sama sekali, juga setelah proses di-restart.
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, model_name: str, db_path: str = DEFAULT_CACHE_PATH,
+                 memory_size: int = 4096, max_entries: int = 100_000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT, dim INTEGER, vector BLOB, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    # ====== Statistik ======
+    @property
+    def hits(self) -> int:
+        return self.stats["memory_hits"] + self.stats["disk_hits"]
+
+    @property
+    def misses(self) -> int:
+        return self.stats["misses"]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return dict(self.stats, hits=self.hits, hit_rate=(self.hits / total) if total else 0.0,
+                        memory_entries=len(self._memory))
+
+    # ====== Internal ======
+    def _key(self, kind: str, text: str) -> str:
+        raw = f"{self.model_name}\x00{kind}\x00{text}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: list) -> dict:
+        found = {}
+        disk_keys = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.stats["memory_hits"] += 1
+                else:
+                    disk_keys.append(key)
+            if disk_keys:
+                placeholders = ",".join("?" * len(disk_keys))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", disk_keys
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.stats["disk_hits"] += 1
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows]
+                    )
+                    self._conn.commit()
+        return found
+
+    def _store(self, items: list):
+        now = time.time()
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(key, self.model_name, len(vector), vector.tobytes(), now) for key, vector in items]
+            )
+            # Eviksi berdasarkan ukuran: buang entri yang paling lama tidak dipakai
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (excess,)
+                )
+                self.stats["evictions"] += excess
+            self._conn.commit()
+
+    def _embed_cached(self, kind: str, texts: list, embed_fn) -> list:
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            with tracing.span("embedding", kind=kind, texts=len(missing), model=self.model_name):
+                vectors = embed_fn(list(missing.values()))
+            new_items = [(key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(missing, vectors)]
+            self._store(new_items)
+            found.update(new_items)
+            with self._lock:
+                self.stats["misses"] += len(missing)
+        return [found[key].tolist() for key in keys]
+
+    # ====== Interface Embeddings ======
+    def embed_query(self, text: str) -> list:
+        normalized = normalize_text(text)
+        return self._embed_cached(
+            "query", [normalized], lambda batch: [self.embeddings.embed_query(t) for t in batch]
+        )[0]
+
+    def embed_documents(self, texts: list) -> list:
+        # Dokumen tidak di-lowercase agar isi yang di-embed tetap sama persis
+        stripped = [" ".join(str(t).split()) for t in texts]
+        return self._embed_cached("document", stripped, self.embeddings.embed_documents)
+
+    def embed_queries(self, texts: list) -> list:
+        # Banyak query sekaligus: semua yang belum ada di cache di-embed dalam satu panggilan API
+        normalized = [normalize_text(t) for t in texts]
+        embed = getattr(self.embeddings, "embed", None)   # CohereEmbeddings.embed(texts, input_type=...)
+        if embed is not None:
+            batch_fn = lambda batch: embed(batch, input_type="search_query")
+        else:
+            batch_fn = lambda batch: [self.embeddings.embed_query(t) for t in batch]
+        return self._embed_cached("query", normalized, batch_fn)
+
+    def peek_query(self, text: str):
+        # Hanya cache memori (tanpa disk/API); None jika belum pernah di-embed di proses ini
+        key = self._key("query", normalize_text(text))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is None:
+                return None
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+        return vector.tolist()
+
+
+# Query dari banyak sesi yang datang dalam jendela pendek digabung jadi satu panggilan embed.
+# Query yang sudah ada di cache memori langsung dijawab tanpa menunggu jendela batch.
+class MicroBatchedEmbeddings(Embeddings):
+    def __init__(self, cached: CachedEmbeddings, window: float = 0.005, max_batch: int = 96,
+                 max_in_flight: int = 2):
+        self.cached = cached
+        # Slot Cohere diambil per panggilan API oleh upstream.GuardedEmbeddings (di bawah cache)
+        self.batcher = MicroBatcher(self.cached.embed_queries, window=window, max_batch=max_batch,
+                                    max_in_flight=max_in_flight, name="embed-batch")
+
+    def get_stats(self) -> dict:
+        return dict(self.cached.get_stats(), batching=self.batcher.get_stats())
+
+    def embed_query(self, text: str) -> list:
+        vector = self.cached.peek_query(text)
+        return vector if vector is not None else self.batcher(text)
+
+    async def aembed_query(self, text: str) -> list:
+        vector = self.cached.peek_query(text)
+        if vector is not None:
+            return vector
+        return await asyncio.wrap_future(self.batcher.submit(text))
+
+    def embed_documents(self, texts: list) -> list:
+        # Dokumen (build index) sudah di-batch sendiri oleh pemanggilnya
+        return self.cached.embed_documents(texts)
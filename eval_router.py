@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import tools
+import intent_router
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EVAL_PATH = os.path.join(BASE_DIR, "dataset", "intent_eval.csv")
+
+
+# Evaluasi offline intent router: akurasi routing dan latensi per pesan (tanpa LLM / jaringan)
+def evaluate(eval_path: str = EVAL_PATH, threshold: float = None) -> dict:
+    router = intent_router.get_router(tools.gazetteer)
+    if threshold is not None:
+        router.threshold = threshold
+    df = pd.read_csv(eval_path)
+
+    rows = []
+    for text, expected in zip(df["text"], df["intent"]):
+        start = time.perf_counter()
+        decision = router.route(text)
+        latency_ms = (time.perf_counter() - start) * 1000
+        expected_tool = None if expected == intent_router.AGENT_INTENT else expected
+        rows.append({
+            "text": text,
+            "expected": expected,
+            "predicted": decision.intent,
+            "tool": decision.tool,
+            "confidence": round(decision.confidence, 3),
+            "reason": decision.reason,
+            "intent_correct": decision.intent == expected,
+            "routing_correct": decision.tool == expected_tool,
+            "latency_ms": latency_ms,
+        })
+    result = pd.DataFrame(rows)
+    latencies = result["latency_ms"].to_numpy()
+    return {
+        "n": len(result),
+        "intent_accuracy": float(result["intent_correct"].mean()),
+        "routing_accuracy": float(result["routing_correct"].mean()),
+        "direct_rate": float(result["tool"].notna().mean()),
+        # Pesan yang seharusnya ke tool tapi malah dikirim ke agent (tidak salah, hanya lebih mahal)
+        "missed_direct": int(((result["tool"].isna()) & (result["expected"] != intent_router.AGENT_INTENT)).sum()),
+        # Pesan yang dijawab tool yang salah (kesalahan yang terlihat oleh pengguna)
+        "wrong_tool": int((result["tool"].notna() & ~result["routing_correct"]).sum()),
+        "latency_ms": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "max": float(latencies.max()),
+        },
+        "per_intent": result.groupby("expected")["routing_correct"].mean().round(3).to_dict(),
+        "errors": result.loc[~result["routing_correct"], ["text", "expected", "predicted", "confidence", "reason"]]
+                        .to_dict(orient="records"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluasi akurasi dan latensi intent router.")
+    parser.add_argument("--eval", default=EVAL_PATH)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Cetak hasil lengkap sebagai JSON")
+    args = parser.parse_args()
+
+    report = evaluate(args.eval, args.threshold)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"Jumlah query       : {report['n']}")
+        print(f"Akurasi intent     : {report['intent_accuracy']:.1%}")
+        print(f"Akurasi routing    : {report['routing_accuracy']:.1%}")
+        print(f"Dijawab langsung   : {report['direct_rate']:.1%} (tanpa LLM)")
+        print(f"Salah tool         : {report['wrong_tool']}  |  terlewat ke agent: {report['missed_direct']}")
+        print(f"Latensi (ms)       : p50 {report['latency_ms']['p50']:.2f}, p95 {report['latency_ms']['p95']:.2f}")
+        for err in report["errors"]:
+            print(f"  ✗ {err['text']!r}: {err['expected']} -> {err['predicted']} ({err['confidence']}, {err['reason']})")
@@ -0,0 +1,108 @@
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+import upstream
+from concurrency import TTLCache, SingleFlight
+from table_index import normalize_key
+
+# ====== Cache Eksplorasi Kota ======
+# Dibagi semua sesi dalam satu proses; rerun dengan kota yang sama tidak memanggil jaringan
+EXPLORE_TTL = 6 * 60 * 60
+_cache = TTLCache(maxsize=512, ttl=EXPLORE_TTL)
+_flight = SingleFlight()
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="explorer")
+
+
+# ====== Wikipedia & Gemini Helper ======
+def get_maps_link(place, city):
+    query = urllib.parse.quote(f"{place} {city}")
+    return f"https://www.google.com/maps/search/?api=1&query={query}"
+
+@tracing.traced("wikipedia")
+def get_city_description(city):
+    # Wikipedia bahasa Indonesia; halaman disambiguasi diganti pilihan pertamanya oleh upstream.py.
+    # upstream.UpstreamError (Wikipedia tidak dapat dihubungi) diteruskan ke pemanggil
+    try:
+        summary = upstream.wikipedia_summary(city, sentences=3, auto_suggest=False)
+    except upstream.UpstreamError:
+        raise
+    except Exception:
+        summary = None
+    return summary or "❗ Deskripsi kota tidak ditemukan."
+
+def get_travel_info_gemini(city):
+    prompt = f"""Berikan informasi perjalanan singkat dengan menggunakan bahasa indonesia untuk kota {city} meliputi:
+1. Tiga tempat terkenal
+2. Tiga makanan khas
+3. Tiga mall terbaik
+4. Tiga restoran rekomendasi
+Jawab hanya dalam bentuk bullet point nama saja, tanpa penjelasan."""
+
+    raw_text = upstream.gemini_generate(prompt, source="explorer").text.strip()
+
+    lines = raw_text.splitlines()
+    result = ""
+
+    # Tambahkan kalimat pembuka secara eksplisit, agar tidak diproses Gemini
+    result += "**Tentu, berikut informasi perjalanan singkat di {} dalam bentuk bullet point:**\n\n".format(city.title())
+
+    current_category = ""
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        # Deteksi heading kategori
+        if any(heading in line.lower() for heading in [
+            "tempat terkenal", "makanan khas", "mall terbaik", "restoran rekomendasi"
+        ]):
+            current_category = line.strip(":")
+            result += f"\n**{current_category}**\n"
+        elif line.startswith(("-", "*")):
+            item = line.lstrip("-* ").strip()
+            maps_link = get_maps_link(item, city)
+            result += f"- [{item}]({maps_link})\n"
+        else:
+            # baris yang bukan heading dan bukan bullet — lewati
+            continue
+
+    return result
+
+
+# ====== Eksplorasi Kota (paralel + cache) ======
+def _fetch_city(city: str, key: str) -> dict:
+    # Wikipedia dan Gemini dijalankan bersamaan: latensi = max(keduanya), bukan jumlahnya
+    desc_future = _pool.submit(tracing.bind(get_city_description), city)
+    info_future = _pool.submit(tracing.bind(get_travel_info_gemini), city)
+
+    complete = True
+    try:
+        travel_info = info_future.result()
+    except Exception as e:
+        travel_info = f"❗ Rekomendasi perjalanan belum tersedia: {e}"
+        complete = False
+    try:
+        description = desc_future.result()
+    except upstream.UpstreamError:
+        description = "❗ Wikipedia sedang tidak dapat dihubungi, coba lagi nanti."
+        complete = False
+
+    result = {
+        "city": city,
+        "description": description,
+        "travel_info": travel_info,
+        "maps_url": get_maps_link(city, city),
+    }
+    if complete:
+        _cache.set(key, result)  # hasil gagal tidak di-cache agar dicoba lagi
+    return result
+
+def explore_city(city: str) -> dict:
+    key = normalize_key(city)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    # Pengguna yang meminta kota sama secara bersamaan hanya memicu satu fetch
+    return _flight.do(key, _fetch_city, city, key)
@@ -0,0 +1,161 @@
+import os
+import json
+import math
+import time
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+import docstore
+
+# ====== Spesifikasi Index ======
+SPEC_FILENAME = "index_spec.json"
+DEFAULT_SPEC = os.getenv("FAISS_INDEX_SPEC", "flat")
+TRAIN_SIZE = int(os.getenv("FAISS_TRAIN_SIZE", "100000"))   # jumlah sampel untuk training IVF/PQ/SQ
+MIN_TRAINED_ROWS = 1000                                     # di bawah ini index terlatih tidak ada gunanya
+MMAP = os.getenv("FAISS_MMAP", "1") == "1"
+
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+HNSW_M = 32
+
+# Nama singkat -> string index_factory FAISS; string factory mentah (mis. "IVF4096,PQ48") juga diterima
+PRESETS = {
+    "flat": "Flat",
+    "ivf": "IVF{nlist},Flat",
+    "ivfsq8": "IVF{nlist},SQ8",
+    "ivfpq": "IVF{nlist},PQ{pq_m}",
+    "hnsw": "HNSW{hnsw_m}",
+    "sq8": "SQ8",
+    "pq": "PQ{pq_m}",
+}
+
+
+def default_nlist(ntotal: int, train_size: int = TRAIN_SIZE) -> int:
+    # ~4*sqrt(n) list, tapi minimal 39 titik training per centroid
+    return int(max(1, min(4 * math.sqrt(ntotal), min(ntotal, train_size) // 39)))
+
+
+def default_pq_m(dim: int) -> int:
+    # Sub-vektor 8 dimensi (384 -> PQ48): kompresi 32x dengan recall yang masih layak
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def resolve_factory(spec: str, dim: int, ntotal: int, nlist: int = None, hnsw_m: int = HNSW_M, pq_m: int = None,
+                    train_size: int = TRAIN_SIZE) -> str:
+    template = PRESETS.get(spec.lower(), spec)
+    factory = template.format(nlist=nlist or default_nlist(ntotal, train_size), hnsw_m=hnsw_m,
+                              pq_m=pq_m or default_pq_m(dim))
+    probe = faiss.index_factory(dim, factory)
+    if not probe.is_trained and ntotal < MIN_TRAINED_ROWS:
+        return "Flat"
+    return factory
+
+
+def build_index(vectors: np.ndarray, factory: str, train_size: int = TRAIN_SIZE, seed: int = 0):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ntotal, dim = vectors.shape
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+    info = {"factory": factory, "ntotal": int(ntotal), "train_rows": 0, "train_seconds": 0.0}
+    if not index.is_trained:
+        # Training cukup pada sampel acak; add tetap memakai semua vektor
+        start = time.perf_counter()
+        if ntotal > train_size:
+            sample = vectors[np.sort(np.random.default_rng(seed).choice(ntotal, train_size, replace=False))]
+        else:
+            sample = vectors
+        index.train(sample)
+        info["train_rows"] = int(len(sample))
+        info["train_seconds"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    for i in range(0, ntotal, 100_000):
+        index.add(vectors[i:i + 100_000])
+    info["add_seconds"] = round(time.perf_counter() - start, 3)
+    return index, info
+
+
+def supports_incremental(index) -> bool:
+    # FAISS.delete di LangChain menganggap id dipadatkan setelah remove_ids. Itu hanya benar
+    # untuk index "flat codes" (Flat/PQ/SQ); IVF menyimpan id eksplisit dan HNSW tidak bisa hapus.
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+# ====== Parameter Pencarian ======
+def _ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def apply_defaults(index, nprobe: int = None, ef_search: int = None):
+    # Default di objek index, dipakai juga oleh vectorstore.similarity_search biasa
+    ivf = _ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = int(nprobe)
+    if isinstance(index, faiss.IndexHNSW) and ef_search:
+        index.hnsw.efSearch = int(ef_search)
+
+
+def search_parameters(index, sel=None, nprobe: int = None, ef_search: int = None):
+    # Parameter per query (tidak mengubah index bersama antar sesi)
+    kwargs = {"sel": sel} if sel is not None else {}
+    ivf = _ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(nprobe=int(nprobe or ivf.nprobe), **kwargs)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search or index.hnsw.efSearch), **kwargs)
+    return faiss.SearchParameters(**kwargs) if kwargs else None
+
+
+# ====== Simpan & Muat ======
+def save_spec(index_dir: str, spec: dict):
+    with open(os.path.join(index_dir, SPEC_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=1)
+
+
+def load_spec(index_dir: str) -> dict:
+    path = os.path.join(index_dir, SPEC_FILENAME)
+    if not os.path.exists(path):
+        return {"spec": "flat", "factory": "Flat"}  # index lama dari FAISS.from_documents
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_index(path: str, mmap: bool = MMAP):
+    if mmap:
+        try:
+            # Kode vektor dibaca langsung dari page cache, tidak disalin ke heap proses
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+def save_vectorstore(vectorstore: FAISS, index_dir: str):
+    # Pengganti FAISS.save_local: dokumen ke SQLite, bukan pickle
+    os.makedirs(index_dir, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(index_dir, "index.faiss"))
+    docstore.write_docstore(index_dir, vectorstore.docstore, vectorstore.index_to_docstore_id)
+
+
+def load_vectorstore(index_dir: str, embeddings, mmap: bool = MMAP, in_memory: bool = False) -> FAISS:
+    # Pengganti FAISS.load_local: index bisa di-mmap read-only + default nprobe/efSearch dari spec,
+    # dokumen dibaca dari SQLite hanya untuk baris hasil pencarian (in_memory=True untuk build)
+    if docstore.is_legacy(index_dir):
+        raise FileNotFoundError(
+            f"{index_dir} masih memakai index.pkl; jalankan: python docstore.py migrate --index-dir {index_dir}")
+    index = read_index(os.path.join(index_dir, "index.faiss"), mmap)
+    spec = load_spec(index_dir)
+    apply_defaults(index,
+                   int(os.getenv("FAISS_NPROBE", "0")) or spec.get("nprobe"),
+                   int(os.getenv("FAISS_EF_SEARCH", "0")) or spec.get("ef_search"))
+    if in_memory:
+        store, index_to_docstore_id = docstore.load_in_memory(index_dir)
+    else:
+        store, index_to_docstore_id = docstore.open_docstore(index_dir)
+    return FAISS(embeddings, index, store, index_to_docstore_id)
@@ -0,0 +1,203 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+
+import build_vectorstore
+import dataset_store
+import faiss_index
+import retrieval
+import tools
+import tracing
+
+# ====== Konfigurasi ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.getenv("TRAVEL_INDEX_DIR", os.path.join(BASE_DIR, "faiss_travel_assistant"))
+ENABLED = os.getenv("HOT_RELOAD", "1") == "1"                          # 0 = snapshot hanya dimuat sekali
+POLL_INTERVAL = float(os.getenv("HOT_RELOAD_INTERVAL", "2"))           # detik antar pengecekan file
+REBUILD_VECTORS = os.getenv("HOT_RELOAD_REBUILD_VECTORS", "1") == "1"  # embed baris yang berubah saat CSV berubah
+
+
+# ====== Sidik File ======
+# Murah (hanya stat): nama, ukuran dan mtime. Isi file tidak dibaca di jalur polling.
+def fingerprint(paths: list) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def dataset_files(dataset_dir: str) -> list:
+    return [path for name in dataset_store.SCHEMAS
+            for path in (dataset_store.csv_path(name, dataset_dir), dataset_store.typed_path(name, dataset_dir))]
+
+
+def index_files(index_dir: str) -> list:
+    if not os.path.isdir(index_dir):
+        return []
+    return [os.path.join(index_dir, name) for name in sorted(os.listdir(index_dir))]
+
+
+# ====== Reloader ======
+# Thread polling memeriksa folder dataset & index. Jika ada yang berubah (dan sudah stabil satu interval,
+# supaya file yang sedang ditulis tidak ikut dimuat), snapshot baru dibangun penuh di background:
+# Arrow bertipe, vektor baris yang berubah, index lookup, gazetteer, FAISS & retriever. Baru setelah
+# semuanya siap, tools.publish() menukar snapshot; turn yang sedang berjalan tetap memakai yang lama.
+class SnapshotReloader:
+    def __init__(self, embeddings=None, dataset_dir: str = dataset_store.DATASET_DIR, index_dir: str = INDEX_DIR,
+                 interval: float = POLL_INTERVAL, rebuild_vectors: bool = REBUILD_VECTORS):
+        self.embeddings = embeddings
+        self.dataset_dir = dataset_dir
+        self.index_dir = index_dir
+        self.interval = interval
+        self.rebuild_vectors = rebuild_vectors
+        self.stats = {"reloads": 0, "failures": 0, "last_reload_s": None, "last_error": None, "loaded_at": None}
+        self._seen = None      # (sidik dataset, sidik index) dari snapshot yang aktif
+        self._pending = None   # sidik baru yang menunggu stabil
+        self._lock = threading.Lock()   # satu reload dalam satu waktu
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fingerprints(self) -> tuple:
+        return fingerprint(dataset_files(self.dataset_dir)), fingerprint(index_files(self.index_dir))
+
+    @staticmethod
+    def _version(fingerprints: tuple) -> str:
+        return hashlib.sha1("/".join(fingerprints).encode()).hexdigest()[:12]
+
+    def get_stats(self) -> dict:
+        return dict(self.stats, version=tools.current().version, watching=self._thread is not None)
+
+    # ====== Bangun Snapshot ======
+    def _load_vectors(self, catalog: tools.Catalog):
+        if not os.path.isdir(self.index_dir) or self.embeddings is None:
+            return None, None
+        vectorstore = faiss_index.load_vectorstore(self.index_dir, self.embeddings)
+        retriever = retrieval.load_retriever(vectorstore, self.index_dir, catalog.gazetteer)
+        return vectorstore, retriever
+
+    def load_initial(self) -> tools.Snapshot:
+        # Katalog awal tetap malas (cold start tidak berubah); vektor dimuat sekarang
+        with self._lock:
+            self._seen = self._fingerprints()
+            catalog = tools.Catalog(self.dataset_dir)
+            vectorstore, retriever = self._load_vectors(catalog)
+            self.stats["loaded_at"] = time.time()
+            return tools.publish(tools.Snapshot(self._version(self._seen), catalog, vectorstore, retriever))
+
+    def _refresh_typed(self) -> list:
+        # File Arrow yang basi dikonversi ulang; tanpa ini dataset_store.load jatuh ke CSV (lambat)
+        refreshed = []
+        for name in dataset_store.SCHEMAS:
+            if not os.path.exists(dataset_store.typed_path(name, self.dataset_dir)):
+                continue
+            _, _, fmt = dataset_store.load(name, self.dataset_dir)
+            if fmt == "csv":
+                dataset_store.convert(name, self.dataset_dir)
+                refreshed.append(name)
+        return refreshed
+
+    def _manifest_matches(self, manifest: dict, spec: dict) -> bool:
+        # Manifest harus milik index & dataset reloader ini; kalau tidak, build akan meng-embed ulang semua baris
+        if "ntotal" in spec and manifest.get("ntotal") != spec["ntotal"]:   # spec.json lama tanpa ntotal
+            return False
+        paths = build_vectorstore.dataset_paths(self.dataset_dir)
+        return all(os.path.abspath(os.path.join(build_vectorstore.BASE_DIR, entry.get("path", ""))) ==
+                   os.path.abspath(paths.get(label, "")) for label, entry in manifest.get("datasets", {}).items())
+
+    def _rebuild_vectors(self):
+        # Hanya baris yang berubah yang di-embed (manifest build_vectorstore); tanpa manifest yang cocok,
+        # build akan meng-embed ulang semua baris, jadi index dibiarkan dan perlu build manual
+        manifest = build_vectorstore.load_manifest(build_vectorstore.manifest_path(self.index_dir))
+        spec = faiss_index.load_spec(self.index_dir)
+        if manifest is None or self.embeddings is None or not self._manifest_matches(manifest, spec):
+            print("ℹ️ Index vektor tidak diperbarui (manifest tidak ada / tidak cocok dengan index, "
+                  "jalankan build_vectorstore.py).", file=sys.stderr)
+            return None
+        return build_vectorstore.build(
+            index_spec=manifest.get("index_spec", faiss_index.DEFAULT_SPEC),
+            nprobe=spec.get("nprobe", faiss_index.DEFAULT_NPROBE),
+            ef_search=spec.get("ef_search", faiss_index.DEFAULT_EF_SEARCH),
+            embeddings=self.embeddings, dataset_dir=self.dataset_dir, index_dir=self.index_dir)
+
+    def reload(self, reason: str = "manual") -> tools.Snapshot:
+        with self._lock:
+            previous = tools.current()
+            started = time.perf_counter()
+            fingerprints = self._fingerprints()
+            datasets_changed = self._seen is None or fingerprints[0] != self._seen[0]
+            with tracing.span("snapshot_reload", reason=reason, previous=previous.version) as reload_span:
+                try:
+                    if datasets_changed:
+                        reload_span.set(arrow_refreshed=self._refresh_typed())
+                        if self.rebuild_vectors and os.path.isdir(self.index_dir):
+                            report = self._rebuild_vectors()
+                            if report:
+                                reload_span.set(embedded=sum(r["embedded"] for r in report),
+                                                deleted=sum(r["deleted"] for r in report))
+                        fingerprints = self._fingerprints()   # konversi/build menulis file baru
+                    catalog = tools.Catalog(self.dataset_dir).warm()
+                    vectorstore, retriever = self._load_vectors(catalog)
+                except Exception as e:
+                    # Snapshot lama tetap aktif; sidik dicatat supaya file yang sama tidak dicoba terus
+                    self._seen = fingerprints
+                    self.stats["failures"] += 1
+                    self.stats["last_error"] = str(e)
+                    reload_span.set(result="error")
+                    tracing.incr("travel_snapshot_reloads_total", result="error")
+                    print(f"⚠️ Reload snapshot gagal, tetap memakai {previous.version}: {e}", file=sys.stderr)
+                    return previous
+                snapshot = tools.publish(tools.Snapshot(self._version(fingerprints), catalog, vectorstore, retriever))
+                reload_span.set(result="ok", version=snapshot.version)
+            self._seen = fingerprints
+            elapsed = time.perf_counter() - started
+            self.stats.update(reloads=self.stats["reloads"] + 1, last_reload_s=elapsed, last_error=None,
+                              loaded_at=time.time())
+            tracing.incr("travel_snapshot_reloads_total", result="ok")
+            print(f"🔄 Snapshot {previous.version} -> {snapshot.version} ({reason}, {elapsed:.2f} s)", file=sys.stderr)
+            return snapshot
+
+    # ====== Watcher ======
+    def poll(self) -> bool:
+        fingerprints = self._fingerprints()
+        if fingerprints == self._seen:
+            self._pending = None
+            return False
+        if fingerprints != self._pending:
+            self._pending = fingerprints   # tunggu satu interval lagi sampai file berhenti berubah
+            return False
+        self._pending = None
+        changed = [name for name, old, new in zip(("dataset", "index"), self._seen or ("", ""), fingerprints)
+                   if old != new]
+        self.reload(reason="+".join(changed) + " berubah")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:   # watcher tidak boleh mati karena satu error
+                print(f"⚠️ Watcher snapshot: {e}", file=sys.stderr)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+
+def start(embeddings=None, dataset_dir: str = dataset_store.DATASET_DIR, index_dir: str = INDEX_DIR,
+          watch: bool = ENABLED) -> SnapshotReloader:
+    # Muat snapshot pertama lalu (jika HOT_RELOAD=1) pantau perubahan file di background
+    reloader = SnapshotReloader(embeddings, dataset_dir, index_dir)
+    reloader.load_initial()
+    return reloader.start() if watch else reloader
@@ -0,0 +1,262 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # tanpa pyarrow: kolom list berupa teks "a,b,c" dari CSV
+    pa = None
+
+from dataset_store import DATE_FORMATS
+from table_index import TableIndex, normalize_key
+
+WORD_BITS = 64
+CHUNK_ROWS = 1 << 16   # baris per potongan saat membangun bitmap (matriks bool sementara tetap kecil)
+
+# Nama fasilitas lain (Inggris / singkatan) -> nama di dataset (ternormalisasi)
+FACILITY_ALIASES = {
+    "pool": "kolam renang", "swimming pool": "kolam renang", "kolam": "kolam renang",
+    "restaurant": "restoran", "parking": "parkir", "breakfast": "sarapan",
+    "wi-fi": "wifi", "internet": "wifi", "fitness": "gym", "air conditioning": "ac",
+}
+
+# order_by dari input tool -> kolom; arah default: harga termurah dulu, rating tertinggi dulu
+ORDER_COLUMNS = {"price": "price_per_night", "price_per_night": "price_per_night", "harga": "price_per_night",
+                 "rating": "rating"}
+DEFAULT_ASCENDING = {"price_per_night": True, "rating": False}
+
+
+class HotelQuery(NamedTuple):
+    location: str = None
+    check_in: object = None     # malam pertama menginap
+    check_out: object = None    # tanggal keluar (malam ini tidak ikut dicek); None = satu malam
+    min_price: float = None
+    max_price: float = None
+    facilities: tuple = ()
+    min_rating: float = None
+
+
+# ====== Kolom List -> (offset, item) ======
+# Item baris i ada di values[offsets[i]:offsets[i + 1]]; item yang tidak valid bernilai -1.
+# Kolom list Arrow (file bertipe) dibaca tanpa objek Python per item; teks CSV lewat pandas.
+def _is_arrow_list(column: pd.Series) -> bool:
+    return pa is not None and isinstance(column.dtype, pd.ArrowDtype) and pa.types.is_list(column.dtype.pyarrow_dtype)
+
+
+def _arrow_list(column: pd.Series):
+    array = pa.array(column)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    return array.offsets.to_numpy(), array.values
+
+
+def _split_text(column: pd.Series):
+    items = column.reset_index(drop=True).fillna("").astype(str).str.split(",").explode().str.strip()
+    items = items[items != ""]
+    counts = np.bincount(items.index.to_numpy(), minlength=len(column))
+    return np.concatenate([[0], np.cumsum(counts)]), items.reset_index(drop=True)
+
+
+def exploded_days(column: pd.Series) -> tuple:
+    # (offsets, hari sejak epoch int32)
+    if _is_arrow_list(column):
+        offsets, values = _arrow_list(column)
+        days = pc.fill_null(values.cast(pa.int32()), -1).to_numpy()
+        return offsets, np.where(pc.is_valid(values).to_numpy(zero_copy_only=False), days, -1).astype(np.int32)
+    offsets, items = _split_text(column)
+    return offsets, parse_days(items)
+
+
+def exploded_codes(column: pd.Series) -> tuple:
+    # (offsets, kode item, nama unik); normalisasi cukup per nama unik, bukan per item
+    if _is_arrow_list(column):
+        offsets, values = _arrow_list(column)
+        encoded = pc.dictionary_encode(pc.utf8_trim_whitespace(values))
+        codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False).astype(np.int32)
+        uniques = np.asarray(encoded.dictionary.to_pylist(), dtype=object)
+    else:
+        offsets, items = _split_text(column)
+        codes, uniques = pd.factorize(items.to_numpy())
+    return offsets, codes, uniques
+
+
+# ====== Tanggal -> hari sejak epoch ======
+def parse_days(column: pd.Series) -> np.ndarray:
+    # Kolom tanggal (Arrow/datetime) atau teks CSV dalam salah satu DATE_FORMATS; tidak dikenal = -1
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        parsed = column
+    else:
+        column = column.astype(str)
+        parsed = pd.Series(pd.NaT, index=column.index, dtype="datetime64[ns]")
+        for fmt in DATE_FORMATS:
+            parsed = parsed.fillna(pd.to_datetime(column, format=fmt, errors="coerce"))
+    days = parsed.to_numpy("datetime64[D]").astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), -1, days).astype(np.int32)
+
+
+def to_day(value) -> int:
+    if isinstance(value, str):
+        for fmt in DATE_FORMATS:
+            parsed = pd.to_datetime(value.strip(), format=fmt, errors="coerce")
+            if not pd.isna(parsed):
+                break
+    else:
+        parsed = pd.Timestamp(value)
+    if pd.isna(parsed):
+        raise ValueError(f"Tanggal tidak dikenali: {value!r}")
+    return int(np.datetime64(parsed.date(), "D").astype(np.int64))
+
+
+# ====== Bitmap ======
+def pack_bits(offsets: np.ndarray, bits: np.ndarray, n_bits: int) -> np.ndarray:
+    # Hasil: uint64[baris, word], bit b di word b // 64 posisi b % 64; bit -1 dilewati
+    n_rows = len(offsets) - 1
+    n_words = max(1, -(-n_bits // WORD_BITS))
+    words = np.zeros((n_rows, n_words), dtype=np.uint64)
+    as_bytes = words.view(np.uint8)
+    for start in range(0, n_rows, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, n_rows)
+        lo, hi = offsets[start], offsets[stop]
+        if lo == hi:
+            continue
+        rows = np.repeat(np.arange(stop - start, dtype=np.int32), np.diff(offsets[start:stop + 1]))
+        chunk_bits = bits[lo:hi]
+        valid = chunk_bits >= 0
+        dense = np.zeros((stop - start, n_words * WORD_BITS), dtype=bool)
+        dense[rows[valid], chunk_bits[valid]] = True
+        # bitorder little + word little-endian: byte k memegang bit 8k..8k+7
+        as_bytes[start:stop] = np.packbits(dense, axis=1, bitorder="little")
+    return words if np.little_endian else words.byteswap()
+
+
+def unpack_bits(words: np.ndarray, n_bits: int) -> np.ndarray:
+    # Kebalikan pack_bits: uint8[baris, n_bits] berisi 0/1
+    words = words if np.little_endian else words.byteswap()
+    return np.unpackbits(words.view(np.uint8), axis=1, bitorder="little")[:, :n_bits]
+
+
+def bit_mask(bits, n_words: int) -> np.ndarray:
+    mask = np.zeros(n_words, dtype=np.uint64)
+    for bit in bits:
+        mask[bit // WORD_BITS] |= np.uint64(1) << np.uint64(bit % WORD_BITS)
+    return mask
+
+
+def has_all(words: np.ndarray, positions: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    # True untuk baris yang punya semua bit di mask; hanya word yang tersentuh mask yang dibaca
+    touched = np.flatnonzero(mask)
+    selected = words[positions[:, None], touched]
+    return ((selected & mask[touched]) == mask[touched]).all(axis=1)
+
+
+# ====== Index Pencarian Hotel ======
+# Dibangun sekali per snapshot dari hotel_index (hash lokasi + rank harga/rating):
+# - kalender: satu bit per hari antara tanggal tersedia paling awal & paling akhir
+# - ketersediaan: bitmap per hotel (365 hari = 6 word uint64 per hotel)
+# - fasilitas: bitset per hotel dari kosakata kolom facilities
+# Query rentang tanggal + harga + fasilitas + rating menjadi operasi mask NumPy atas kandidat lokasi,
+# lalu top-k lewat argpartition atas rank harga/rating. Hanya posisi baris yang cocok yang dikembalikan.
+class HotelSearchIndex:
+    def __init__(self, table_index: TableIndex):
+        self.table_index = table_index
+        df = table_index.df
+        n = len(df)
+        self.price = df["price_per_night"].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.rating = df["rating"].to_numpy(dtype=np.float32, na_value=np.nan)
+
+        offsets, days = exploded_days(df["available_dates"])
+        known = days[days >= 0]
+        self.first_day = int(known.min()) if len(known) else 0
+        self.n_days = int(known.max()) - self.first_day + 1 if len(known) else 0
+        days = np.where(days >= 0, days - np.int32(self.first_day), -1)
+        self.availability = pack_bits(offsets, days, self.n_days)
+
+        offsets, codes, uniques = exploded_codes(df["facilities"])
+        # Nama yang sama setelah normalisasi ("wifi" / "WiFi ") berbagi satu bit
+        bit_of_unique, vocabulary = pd.factorize(pd.Series(uniques, dtype=object).map(normalize_key).to_numpy())
+        self.facility_bits = {name: bit for bit, name in enumerate(vocabulary)}
+        # Nama asli (mis. "Kolam Renang") untuk pesan ke pengguna, urut sesuai bit
+        self.facility_names = list(uniques[np.unique(bit_of_unique, return_index=True)[1]])
+        bits = np.where(codes >= 0, bit_of_unique[np.maximum(codes, 0)] if len(uniques) else -1, -1)
+        self.facilities = pack_bits(offsets, bits, len(vocabulary))
+
+    @property
+    def calendar(self) -> tuple:
+        start = np.datetime64(self.first_day, "D")
+        return start, start + np.timedelta64(max(self.n_days - 1, 0), "D")
+
+    @property
+    def nbytes(self) -> int:
+        return self.availability.nbytes + self.facilities.nbytes
+
+    def facility_bit(self, name: str) -> int:
+        key = normalize_key(name)
+        key = FACILITY_ALIASES.get(key, key)
+        bit = self.facility_bits.get(key)
+        if bit is None:
+            # Fallback substring seperti lookup lokasi ("kolam" -> "kolam renang")
+            bit = next((b for k, b in self.facility_bits.items() if key and key in k), None)
+        return bit
+
+    # ====== Filter ======
+    def _night_mask(self, query: HotelQuery):
+        if query.check_in is None:
+            return None
+        first = to_day(query.check_in) - self.first_day
+        last = (to_day(query.check_out) - self.first_day if query.check_out is not None else first + 1) - 1
+        if last < first:
+            raise ValueError("check_out harus setelah check_in.")
+        if first < 0 or last >= self.n_days:
+            return False   # di luar kalender: tidak ada hotel yang tersedia
+        return bit_mask(range(first, last + 1), self.availability.shape[1])
+
+    def matches(self, query: HotelQuery) -> np.ndarray:
+        positions = self.table_index.lookup(query.location)
+        if len(positions) == 0:
+            return positions
+
+        # Filter murah dulu (harga/rating per baris), bitmap hanya untuk baris yang masih lolos
+        keep = np.ones(len(positions), dtype=bool)
+        if query.min_price is not None:
+            keep &= self.price[positions] >= float(query.min_price)
+        if query.max_price is not None:
+            keep &= self.price[positions] <= float(query.max_price)
+        if query.min_rating is not None:
+            keep &= self.rating[positions] >= float(query.min_rating)
+        positions = positions[keep]
+
+        if query.facilities:
+            bits = [self.facility_bit(name) for name in query.facilities]
+            if None in bits:
+                return positions[:0]   # fasilitas tidak dikenal di dataset
+            positions = positions[has_all(self.facilities, positions, bit_mask(bits, self.facilities.shape[1]))]
+
+        nights = self._night_mask(query)
+        if nights is False:
+            return positions[:0]
+        if nights is not None:
+            positions = positions[has_all(self.availability, positions, nights)]
+        return positions
+
+    # ====== Ranking ======
+    def top(self, positions: np.ndarray, order_by: str = None, ascending: bool = None, limit: int = None) -> np.ndarray:
+        column = ORDER_COLUMNS.get(str(order_by).lower(), "price_per_night")
+        if ascending is None:
+            ascending = DEFAULT_ASCENDING[column]
+        rank = self.table_index.rank(column).astype(np.int64)
+        keys = rank[positions] if ascending else -rank[positions]
+        if limit is not None and 0 <= limit < len(positions):
+            # top-k tanpa mengurutkan semua kandidat
+            picked = np.argpartition(keys, limit)[:limit] if limit else np.empty(0, dtype=np.int64)
+            positions, keys = positions[picked], keys[picked]
+        return positions[np.argsort(keys, kind="stable")]
+
+    def search(self, query: HotelQuery, order_by: str = None, ascending: bool = None, limit: int = None) -> tuple:
+        # (posisi top-k terurut, jumlah semua hotel yang cocok)
+        positions = self.matches(query)
+        return self.top(positions, order_by, ascending, limit), len(positions)
+
+    def select(self, query: HotelQuery, order_by: str = None, ascending: bool = None, limit: int = None) -> pd.DataFrame:
+        return self.table_index.df.iloc[self.search(query, order_by, ascending, limit)[0]]
@@ -0,0 +1,216 @@
+import os
+import zlib
+import argparse
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import city_matcher
+
+# ====== Lokasi File ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES_PATH = os.path.join(BASE_DIR, "dataset", "intent_examples.csv")
+MODEL_PATH = os.path.join(BASE_DIR, "models", "intent_router.npz")
+
+N_FEATURES = 2 ** 14
+CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE", "0.45"))
+AGENT_INTENT = "agent"
+
+# Tool yang butuh kota; tanpa kota (dan tanpa last_city) pesan diteruskan ke agent
+CITY_INTENTS = {
+    "get_transport_schedule", "get_promo_by_city", "get_destination_info",
+    "get_hotel_availability", "get_recommendation_bundle",
+}
+
+CITY_TOKEN = "xkotax"
+MODE_TOKEN = "xmodax"
+
+
+class RouteDecision(NamedTuple):
+    intent: str
+    confidence: float
+    args: dict
+    tool: str       # None jika diteruskan ke agent
+    reason: str
+
+
+# ====== Fitur: char n-gram + kata, di-hash ======
+def mask_entities(text: str, gazetteer=None) -> str:
+    # Nama kota/moda diganti token umum agar model belajar pola kalimat, bukan nama kota
+    text = str(text).replace("{city}", CITY_TOKEN).replace("{mode}", MODE_TOKEN)
+    if gazetteer is None:
+        return text
+    out, last = [], 0
+    for m in gazetteer.find_all(text):
+        out.append(text[last:m.start])
+        out.append(f" {CITY_TOKEN if m.kind == 'city' else MODE_TOKEN} ")
+        last = m.end
+    out.append(text[last:])
+    return "".join(out)
+
+
+def _hash(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+
+
+def featurize(text: str):
+    words = city_matcher.normalize(text).split()
+    feats = {}
+    for i, word in enumerate(words):
+        grams = [f"w:{word}"]
+        if i + 1 < len(words):
+            grams.append(f"b:{word}_{words[i + 1]}")
+        padded = f" {word} "
+        for n in (3, 4, 5):
+            grams.extend(f"c:{padded[j:j + n]}" for j in range(max(1, len(padded) - n + 1)))
+        for gram in grams:
+            idx = _hash(gram)
+            feats[idx] = feats.get(idx, 0.0) + 1.0
+    if not feats:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(feats.keys(), dtype=np.int64)
+    values = np.log1p(np.fromiter(feats.values(), dtype=np.float32))
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def _to_csr(texts: list):
+    rows = [featurize(t) for t in texts]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r[0]) for r in rows])
+    indices = np.concatenate([r[0] for r in rows]) if rows else np.zeros(0, dtype=np.int64)
+    values = np.concatenate([r[1] for r in rows]) if rows else np.zeros(0, dtype=np.float32)
+    return indptr, indices, values
+
+
+def _scores(weights, bias, indptr, indices, values):
+    n = len(indptr) - 1
+    scores = np.tile(bias, (n, 1))
+    row_of = np.repeat(np.arange(n), np.diff(indptr))
+    np.add.at(scores, row_of, weights[indices] * values[:, None])
+    return scores
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# ====== Model Linear (regresi logistik multinomial) ======
+class IntentModel:
+    def __init__(self, labels: list, weights: np.ndarray, bias: np.ndarray):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(cls, texts: list, labels: list, epochs: int = 300, lr: float = 2.0, l2: float = 1e-4):
+        classes = sorted(set(labels))
+        y = np.array([classes.index(label) for label in labels])
+        indptr, indices, values = _to_csr(texts)
+        n = len(texts)
+        row_of = np.repeat(np.arange(n), np.diff(indptr))
+        weights = np.zeros((N_FEATURES, len(classes)), dtype=np.float32)
+        bias = np.zeros(len(classes), dtype=np.float32)
+        onehot = np.eye(len(classes), dtype=np.float32)[y]
+        for _ in range(epochs):
+            probs = _softmax(_scores(weights, bias, indptr, indices, values))
+            grad = (probs - onehot) / n
+            grad_w = np.zeros_like(weights)
+            np.add.at(grad_w, indices, values[:, None] * grad[row_of])
+            weights -= lr * (grad_w + l2 * weights)
+            bias -= lr * grad.sum(axis=0)
+        return cls(classes, weights, bias)
+
+    def predict_proba(self, texts: list) -> np.ndarray:
+        indptr, indices, values = _to_csr(texts)
+        return _softmax(_scores(self.weights, self.bias, indptr, indices, values))
+
+    def save(self, path: str = MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Hanya baris bobot yang tidak nol yang disimpan
+        rows = np.flatnonzero(np.abs(self.weights).sum(axis=1))
+        np.savez_compressed(path, labels=np.array(self.labels), rows=rows,
+                            weights=self.weights[rows].astype(np.float16), bias=self.bias)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH):
+        data = np.load(path)
+        weights = np.zeros((N_FEATURES, len(data["labels"])), dtype=np.float32)
+        weights[data["rows"]] = data["weights"].astype(np.float32)
+        return cls(data["labels"].tolist(), weights, data["bias"].astype(np.float32))
+
+
+def load_examples(path: str = EXAMPLES_PATH) -> pd.DataFrame:
+    return pd.read_csv(path)
+
+
+def train_model(examples: pd.DataFrame = None) -> IntentModel:
+    examples = load_examples() if examples is None else examples
+    texts = [mask_entities(t) for t in examples["text"]]
+    return IntentModel.train(texts, examples["intent"].tolist())
+
+
+# ====== Router ======
+class IntentRouter:
+    def __init__(self, model: IntentModel, gazetteer, threshold: float = CONFIDENCE_THRESHOLD):
+        self.model = model
+        self.gazetteer = gazetteer
+        self.threshold = threshold
+
+    def route(self, text: str, last_city: str = None) -> RouteDecision:
+        mentions = self.gazetteer.find_all(text)
+        probs = self.model.predict_proba([mask_entities(text, self.gazetteer)])[0]
+        best = int(np.argmax(probs))
+        intent, confidence = self.model.labels[best], float(probs[best])
+
+        cities = [m.value for m in mentions if m.kind == "city"]
+        modes = [m.value for m in mentions if m.kind == "mode"]
+        args = {}
+        if cities or last_city:
+            args["location"] = cities[0] if cities else last_city
+        if modes:
+            args["mode"] = modes[0]
+
+        if intent == AGENT_INTENT:
+            return RouteDecision(intent, confidence, args, None, "open-ended")
+        if confidence < self.threshold:
+            return RouteDecision(intent, confidence, args, None, "low-confidence")
+        if intent in CITY_INTENTS and "location" not in args:
+            return RouteDecision(intent, confidence, args, None, "missing-city")
+        return RouteDecision(intent, confidence, args, intent, "direct")
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router(gazetteer) -> IntentRouter:
+    # Model dimuat sekali per proses; jika file model belum ada, dilatih dari contoh berlabel
+    global _router
+    with _router_lock:
+        if _router is None or _router.gazetteer is not gazetteer:
+            # Snapshot data baru (hot reload) hanya mengganti gazetteer; model tetap dipakai
+            if _router is not None:
+                model = _router.model
+            else:
+                model = IntentModel.load() if os.path.exists(MODEL_PATH) else train_model()
+            _router = IntentRouter(model, gazetteer)
+        return _router
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latih model intent router secara offline.")
+    parser.add_argument("--examples", default=EXAMPLES_PATH)
+    parser.add_argument("--output", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    examples = load_examples(args.examples)
+    model = train_model(examples)
+    model.save(args.output)
+    train_acc = (np.argmax(model.predict_proba([mask_entities(t) for t in examples["text"]]), axis=1)
+                 == [model.labels.index(i) for i in examples["intent"]]).mean()
+    print(f"✅ Model disimpan ke {args.output} ({len(examples)} contoh, akurasi latih {train_acc:.1%})")
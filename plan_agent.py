@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+import tools
+import tracing
+
+# ====== Konfigurasi ======
+# react = agent LangChain (satu tool per round trip LLM), plan = rencana sekali + tool paralel + satu sintesis,
+# ab = dibagi per sesi (hash session_id) untuk perbandingan A/B
+AGENT_MODE = os.getenv("AGENT_MODE", "react")
+AGENT_MODES = ("react", "plan")
+MAX_TOOL_CALLS = 6
+TOOL_WORKERS = int(os.getenv("PLAN_TOOL_WORKERS", "16"))   # dibagi semua sesi dalam satu proses
+TOOL_RESULT_CHARS = 3000                                    # hasil tool dipotong sebelum masuk prompt sintesis
+
+PLAN_PROMPT = """Kamu adalah perencana untuk asisten perjalanan. Pilih SEMUA tool yang dibutuhkan untuk menjawab \
+pertanyaan sekaligus; tool dijalankan bersamaan, jadi jangan membuat panggilan yang bergantung pada hasil tool lain.
+
+Tool yang tersedia:
+{tools}
+
+Riwayat percakapan:
+{history}
+
+Pertanyaan: {question}
+
+Balas HANYA dengan JSON: {{"calls": [{{"tool": "<nama tool>", "input": "<input tool>"}}]}}
+Gunakan daftar kosong jika pertanyaan bisa dijawab tanpa tool. Maksimal {max_calls} panggilan."""
+
+SYNTHESIS_PROMPT = """Jawab pertanyaan pengguna dalam bahasa Indonesia berdasarkan hasil tool berikut. \
+Jangan mengarang data yang tidak ada di hasil tool.
+
+Riwayat percakapan:
+{history}
+
+Hasil tool:
+{results}
+
+Pertanyaan: {question}
+Jawaban:"""
+
+_JSON_RE = re.compile(r"\{.*\}", re.S)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def choose_mode(session_id: str, mode: str = AGENT_MODE) -> str:
+    if mode == "ab":
+        return AGENT_MODES[zlib.crc32(str(session_id).encode()) % len(AGENT_MODES)]
+    return mode if mode in AGENT_MODES else "react"
+
+
+def get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="plan-tool")
+        return _pool
+
+
+def _history_text(memory) -> str:
+    if memory is None:
+        return "-"
+    context = getattr(memory, "context", None)
+    if context is not None:
+        return context.render()   # ringkasan + turn terbaru, sudah dibatasi token
+    messages = memory.load_memory_variables({}).get("chat_history") or []
+    lines = [f"{'User' if m.type == 'human' else 'Bot'}: {m.content}" for m in messages]
+    return "\n".join(lines) or "-"
+
+
+def parse_plan(text: str, tool_names) -> list:
+    # {"calls": [{"tool": ..., "input": ...}]} (boleh di dalam blok ```json); tool yang tidak dikenal dibuang
+    match = _JSON_RE.search(text or "")
+    if match is None:
+        raise ValueError("Rencana tool bukan JSON")
+    plan = json.loads(match.group(0))
+    calls = plan.get("calls", []) if isinstance(plan, dict) else plan
+    parsed = []
+    for call in calls:
+        if not isinstance(call, dict) or call.get("tool") not in tool_names:
+            continue
+        tool_input = call.get("input", "")
+        if not isinstance(tool_input, str):
+            tool_input = json.dumps(tool_input, ensure_ascii=False)
+        if (call["tool"], tool_input) not in parsed:
+            parsed.append((call["tool"], tool_input))
+    return parsed[:MAX_TOOL_CALLS]
+
+
+# ====== Agent Rencana-lalu-Eksekusi ======
+# Satu panggilan LLM untuk rencana, semua tool dijalankan paralel di thread pool, lalu satu panggilan LLM
+# untuk jawaban akhir (di-stream ke sink). Pertanyaan multi-tool ("transport, hotel dan promo ke X")
+# selalu 2 panggilan LLM, bukan 1 + jumlah tool seperti agent ReAct.
+class PlanExecuteAgent:
+    def __init__(self, llm, tool_list: list, memory=None, llm_slot=None):
+        self.llm = llm
+        self.tools = {tool.name: tool for tool in tool_list}
+        self.memory = memory
+        self.llm_slot = llm_slot or nullcontext   # mis. upstream.get("gemini").guard
+        self.stats = {}
+
+    def _tool_descriptions(self) -> str:
+        return "\n".join(f"- {name}: {tool.description}" for name, tool in self.tools.items())
+
+    def plan(self, question: str, history: str, callbacks: list) -> list:
+        prompt = PLAN_PROMPT.format(tools=self._tool_descriptions(), history=history, question=question,
+                                    max_calls=MAX_TOOL_CALLS)
+        with tracing.span("plan") as plan_span, self.llm_slot():
+            response = self.llm.invoke([HumanMessage(content=prompt)], config={"callbacks": callbacks})
+            self.stats["llm_calls"] += 1
+            calls = parse_plan(response.content, self.tools)
+            plan_span.set(tools=[name for name, _ in calls])
+        return calls
+
+    def _run_tool(self, snapshot, name: str, tool_input: str) -> str:
+        # Thread pool tidak mewarisi contextvar: snapshot turn di-pin ulang di thread tool
+        with tools.pinned(snapshot):
+            try:
+                return str(self.tools[name].func(tool_input))
+            except Exception as e:
+                return f"⚠️ {name} gagal: {e}"
+
+    def execute(self, calls: list, view=None) -> list:
+        snapshot = tools.current()
+        for name, tool_input in calls:
+            if view is not None:
+                view.step(f"🔧 `{name}` ← {tool_input[:200]}")
+        with tracing.span("tools_parallel", count=len(calls)):
+            futures = [get_pool().submit(tracing.bind(self._run_tool), snapshot, name, tool_input)
+                       for name, tool_input in calls]
+            outputs = [future.result() for future in futures]
+        if view is not None:
+            for output in outputs:
+                view.step(f"📄 {output[:300]}{'…' if len(output) > 300 else ''}")
+        return [(name, tool_input, output) for (name, tool_input), output in zip(calls, outputs)]
+
+    def synthesize(self, question: str, history: str, results: list, sink, callbacks: list) -> str:
+        rendered = "\n\n".join(f"[{name}] {tool_input}\n{output[:TOOL_RESULT_CHARS]}"
+                               for name, tool_input, output in results) or "(tidak ada tool yang dipanggil)"
+        prompt = SYNTHESIS_PROMPT.format(history=history, results=rendered, question=question)
+        with self.llm_slot():
+            self.stats["llm_calls"] += 1
+            for chunk in self.llm.stream([HumanMessage(content=prompt)], config={"callbacks": callbacks}):
+                if chunk.content:
+                    if self.stats["first_llm_token_s"] is None:
+                        self.stats["first_llm_token_s"] = time.perf_counter() - sink.started
+                    sink.write(chunk.content)
+        return sink.text.strip()
+
+    def run(self, question: str, sink, view=None, callbacks: list = ()) -> str:
+        started = time.perf_counter()
+        self.stats = {"llm_calls": 0, "tool_calls": 0, "first_llm_token_s": None}
+        callbacks = list(callbacks)
+        history = _history_text(self.memory)
+        calls = self.plan(question, history, callbacks)
+        tools_started = time.perf_counter()
+        results = self.execute(calls, view)
+        self.stats.update(tool_calls=len(calls), plan_s=tools_started - started,
+                          tools_s=time.perf_counter() - tools_started)
+        answer = self.synthesize(question, history, results, sink, callbacks)
+        self.stats["wall_s"] = time.perf_counter() - started
+        if self.memory is not None and answer:
+            # Memory yang sama dengan agent ReAct: sesi tetap punya konteks walau mode berganti
+            # (memori sesi mengabaikan ini, turn dicatat ChatService)
+            self.memory.save_context({"input": question}, {"output": answer})
+        return answer
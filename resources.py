@@ -0,0 +1,106 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import streamlit as st
+from langchain.agents import initialize_agent
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_cohere import CohereEmbeddings
+
+from embedding_cache import CachedEmbeddings
+from session_memory import SessionChatMemory
+import hot_reload
+import upstream
+
+LLM_MODEL = upstream.GEMINI_MODEL
+EMBEDDING_MODEL = "embed-multilingual-light-v3.0"
+
+# ====== Statistik Build ======
+# Dicatat per proses: berapa kali tiap resource dibangun dan berapa lama.
+_build_stats = {}
+_stats_lock = threading.Lock()
+
+
+@contextmanager
+def _timed_build(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            stat = _build_stats.setdefault(name, {"builds": 0, "total_seconds": 0.0, "durations": []})
+            stat["builds"] += 1
+            stat["total_seconds"] += elapsed
+            stat["last_seconds"] = elapsed
+            stat["durations"] = (stat["durations"] + [elapsed])[-20:]
+
+
+def get_build_stats() -> dict:
+    with _stats_lock:
+        return {name: dict(stat, durations=list(stat["durations"])) for name, stat in _build_stats.items()}
+
+
+# ====== Pembuat Resource (tanpa Streamlit, dipakai juga oleh backend.py) ======
+def create_llm(google_api_key: str):
+    return ChatGoogleGenerativeAI(
+        model=LLM_MODEL,
+        temperature=0,
+        verbose=True,
+        streaming=True,  # token dikirim ke callback saat tiba
+        google_api_key=google_api_key,
+        # Timeout & retry klien mengikuti kebijakan upstream Gemini; breaker + slot dipasang di chat_service
+        timeout=upstream.POLICIES["gemini"].timeout_s,
+        max_retries=upstream.POLICIES["gemini"].retries,
+        **upstream.gemini_client_options()
+    )
+
+
+def create_embeddings(cohere_api_key: str) -> CachedEmbeddings:
+    cohere = CohereEmbeddings(
+        model=EMBEDDING_MODEL,
+        cohere_api_key=cohere_api_key,
+        **upstream.cohere_options()
+    )
+    # Cache query di depan Cohere: kota yang sama tidak di-embed ulang; hanya cache miss yang melewati
+    # lapisan upstream (slot, retry, circuit breaker)
+    return CachedEmbeddings(upstream.GuardedEmbeddings(cohere), model_name=EMBEDDING_MODEL)
+
+
+# Agent & memory dibuat per sesi oleh chat_service.py; waktunya tetap tercatat di statistik build
+def create_agent(llm, tool_list: list, memory):
+    with _timed_build("agent"):
+        return initialize_agent(
+            tools=tool_list,
+            llm=llm,
+            agent="chat-conversational-react-description",
+            verbose=True,
+            memory=memory
+        )
+
+
+def create_memory(context):
+    # chat_history agent dibaca dari memori sesi (session_memory.SessionMemory) yang dibatasi token
+    with _timed_build("memory"):
+        return SessionChatMemory(context=context, memory_key="chat_history")
+
+
+# ====== Resource Bersama (sekali per proses) ======
+@st.cache_resource(show_spinner=False)
+def get_llm(google_api_key: str):
+    with _timed_build("llm"):
+        return create_llm(google_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_embeddings(cohere_api_key: str):
+    with _timed_build("embeddings"):
+        return create_embeddings(cohere_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_reloader(cohere_api_key: str):
+    # Snapshot dataset + FAISS + retriever; watcher menukar snapshot saat file dataset/index berubah
+    embeddings = get_embeddings(cohere_api_key)
+    with _timed_build("snapshot"):
+        return hot_reload.start(embeddings)
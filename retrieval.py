@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import math
+from datetime import datetime
+
+import faiss
+import numpy as np
+import pandas as pd
+
+import city_matcher
+import faiss_index
+import tracing
+from table_index import normalize_key
+
+LEXICAL_FILENAME = "lexical.json"
+
+# ====== Metadata Dokumen ======
+# label dokumen -> (kode dataset, kolom kota, kolom moda, kolom tanggal)
+DATASET_FIELDS = {
+    "Transport Schedule": ("transport", "destination", "mode", "date"),
+    "Promo Travel": ("promo", "location", None, "start_date"),
+    "Destination Info": ("destination", "location", None, None),
+    "Hotel Availability": ("hotel", "location", None, None),
+}
+
+_FIELD_RE = re.compile(r"(?:^|, )([a-z_]+): ")
+
+
+def _iso_date(values: pd.Series) -> pd.Series:
+    parsed = pd.to_datetime(values, errors="coerce")
+    return parsed.dt.strftime("%Y-%m-%d").fillna("")
+
+
+def _iso_date_value(value: str) -> str:
+    for fmt in ("%m/%d/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return ""
+
+
+def document_metadata(df: pd.DataFrame, label: str) -> list:
+    dataset, city_col, mode_col, date_col = DATASET_FIELDS[label]
+    meta = pd.DataFrame({"dataset": dataset, "label": label}, index=df.index)
+    meta["city"] = df[city_col].astype(str).str.strip() if city_col in df.columns else ""
+    if mode_col in df.columns:
+        meta["mode"] = df[mode_col].astype(str).str.strip().str.lower()
+    if date_col in df.columns:
+        meta["date"] = _iso_date(df[date_col])
+    return meta.to_dict(orient="records")
+
+
+def parse_content(content: str) -> dict:
+    # Fallback untuk index lama tanpa metadata: "Label: col: val, col: val"
+    label, _, rest = content.partition(": ")
+    if label not in DATASET_FIELDS:
+        return {}
+    keys = list(_FIELD_RE.finditer(rest))
+    row = {}
+    for i, match in enumerate(keys):
+        end = keys[i + 1].start() if i + 1 < len(keys) else len(rest)
+        row[match.group(1)] = rest[match.end():end]
+    dataset, city_col, mode_col, date_col = DATASET_FIELDS[label]
+    meta = {"dataset": dataset, "label": label, "city": row.get(city_col, "").strip()}
+    if mode_col in row:
+        meta["mode"] = row[mode_col].strip().lower()
+    if date_col in row:
+        meta["date"] = _iso_date_value(row[date_col])
+    return meta
+
+
+def tokenize(text: str) -> list:
+    return city_matcher.normalize(text).split()
+
+
+# ====== Index Leksikal (BM25) + Filter Metadata ======
+class LexicalIndex:
+    def __init__(self, doc_ids: list, metadatas: list, doc_len: np.ndarray, postings: dict,
+                 k1: float = 1.2, b: float = 0.75):
+        self.doc_ids = list(doc_ids)
+        self.metadatas = list(metadatas)
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.postings = postings  # term -> (array posisi dokumen, array tf)
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+        self._build_filters()
+
+    def _build_filters(self):
+        self._filters = {}
+        for field in ("dataset", "city", "mode"):
+            values = {}
+            for pos, meta in enumerate(self.metadatas):
+                value = meta.get(field)
+                if value:
+                    values.setdefault(normalize_key(value), []).append(pos)
+            self._filters[field] = {k: np.array(v, dtype=np.int64) for k, v in values.items()}
+
+    @classmethod
+    def build(cls, doc_ids: list, texts: list, metadatas: list):
+        postings = {}
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        for pos, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[pos] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(pos)
+                postings[token][1].append(tf)
+        postings = {t: (np.array(p, dtype=np.int64), np.array(f, dtype=np.float32)) for t, (p, f) in postings.items()}
+        return cls(doc_ids, metadatas, doc_len, postings)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        # Index lama (tanpa lexical.json / metadata): bangun dari isi docstore
+        doc_ids, texts, metadatas = [], [], []
+        for i in sorted(vectorstore.index_to_docstore_id):
+            doc_id = vectorstore.index_to_docstore_id[i]
+            doc = vectorstore.docstore.search(doc_id)
+            doc_ids.append(doc_id)
+            texts.append(doc.page_content)
+            metadatas.append(doc.metadata or parse_content(doc.page_content))
+        return cls.build(doc_ids, texts, metadatas)
+
+    def save(self, index_dir: str):
+        data = {
+            "k1": self.k1, "b": self.b,
+            "doc_ids": self.doc_ids,
+            "metadatas": self.metadatas,
+            "doc_len": self.doc_len.astype(int).tolist(),
+            "postings": {t: [p.tolist(), f.astype(int).tolist()] for t, (p, f) in self.postings.items()},
+        }
+        with open(os.path.join(index_dir, LEXICAL_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, index_dir: str):
+        path = os.path.join(index_dir, LEXICAL_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {t: (np.array(p, dtype=np.int64), np.array(tf, dtype=np.float32))
+                    for t, (p, tf) in data["postings"].items()}
+        return cls(data["doc_ids"], data["metadatas"], data["doc_len"], postings, data["k1"], data["b"])
+
+    def filter(self, **conditions):
+        # None = tanpa filter; array kosong = filter tidak cocok dengan dokumen apa pun
+        result = None
+        for field, value in conditions.items():
+            if not value:
+                continue
+            positions = self._filters.get(field, {}).get(normalize_key(value), np.empty(0, dtype=np.int64))
+            result = positions if result is None else np.intersect1d(result, positions, assume_unique=True)
+        return result
+
+    def scores(self, query: str) -> np.ndarray:
+        n = len(self.doc_ids)
+        scores = np.zeros(n, dtype=np.float32)
+        if not n:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avgdl, 1e-6))
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            positions, tf = posting
+            idf = math.log(1 + (n - len(positions) + 0.5) / (len(positions) + 0.5))
+            scores[positions] += idf * tf * (self.k1 + 1) / (tf + norm[positions])
+        return scores
+
+
+# ====== Retrieval Hibrida ======
+class HybridRetriever:
+    def __init__(self, vectorstore, lexical: LexicalIndex, gazetteer=None, alpha: float = 0.5):
+        self.vectorstore = vectorstore
+        self.lexical = lexical
+        self.gazetteer = gazetteer
+        self.alpha = alpha  # bobot skor vektor vs leksikal
+        self.stats = {"lexical_only": 0, "hybrid": 0}
+        docstore_to_faiss = {doc_id: i for i, doc_id in vectorstore.index_to_docstore_id.items()}
+        self._faiss_ids = np.array([docstore_to_faiss.get(d, -1) for d in lexical.doc_ids], dtype=np.int64)
+        self._faiss_to_pos = {int(f): p for p, f in enumerate(self._faiss_ids) if f >= 0}
+
+    def _documents(self, positions) -> list:
+        docstore = self.vectorstore.docstore
+        return [docstore.search(self.lexical.doc_ids[p]) for p in positions]
+
+    def _vector_scores(self, query: str, candidates, fetch_k: int, nprobe: int = None, ef_search: int = None) -> dict:
+        embedding = np.array([self.vectorstore.embedding_function.embed_query(query)], dtype=np.float32)
+        index = self.vectorstore.index
+        sel = None
+        if candidates is not None:
+            # Hanya partisi yang relevan yang dicari (IDSelector di level FAISS)
+            faiss_ids = self._faiss_ids[candidates]
+            sel = faiss.IDSelectorBatch(faiss_ids[faiss_ids >= 0])
+        # nprobe (IVF) / efSearch (HNSW) per query; None = default index
+        params = faiss_index.search_parameters(index, sel, nprobe=nprobe, ef_search=ef_search)
+        fetch_k = min(fetch_k, index.ntotal)
+        with tracing.span("faiss", k=fetch_k, candidates=None if candidates is None else len(candidates),
+                          nprobe=nprobe, ef_search=ef_search):
+            distances, ids = index.search(embedding, fetch_k, params=params)
+        return {self._faiss_to_pos[int(i)]: 1.0 / (1.0 + float(d))
+                for d, i in zip(distances[0], ids[0]) if int(i) in self._faiss_to_pos}
+
+    def _top_lexical(self, scores: np.ndarray, pool: np.ndarray, k: int) -> np.ndarray:
+        return pool[np.argsort(-scores[pool], kind="stable")][:k]
+
+    def search(self, query: str, k: int = 5, dataset: str = None, city: str = None, mode: str = None,
+               allow_vector: bool = True, nprobe: int = None, ef_search: int = None) -> list:
+        if city is None and self.gazetteer is not None:
+            city = self.gazetteer.first_city(query)
+        lexical = self.lexical.scores(query)
+
+        # Query dengan kota yang persis: jawab dari filter metadata + BM25, tanpa panggilan embedding
+        if city:
+            city_pool = self.lexical.filter(dataset=dataset, city=city, mode=mode)
+            if len(city_pool):
+                self.stats["lexical_only"] += 1
+                return self._documents(self._top_lexical(lexical, city_pool, k))
+
+        candidates = self.lexical.filter(dataset=dataset, mode=mode)
+        pool = np.arange(len(lexical)) if candidates is None else candidates
+        if not allow_vector or not len(pool):
+            self.stats["lexical_only"] += 1
+            return self._documents(self._top_lexical(lexical, pool, k))
+
+        self.stats["hybrid"] += 1
+        fetch_k = max(4 * k, 20)
+        vector = self._vector_scores(query, candidates, fetch_k, nprobe=nprobe, ef_search=ef_search)
+        merged = set(vector) | set(self._top_lexical(lexical, pool, fetch_k).tolist())
+        lex_max = float(lexical[pool].max())
+        vec_max = max(vector.values()) if vector else 0.0
+        scored = []
+        for pos in merged:
+            lex = float(lexical[pos]) / lex_max if lex_max > 0 else 0.0
+            vec = vector.get(pos, 0.0) / vec_max if vec_max > 0 else 0.0
+            scored.append((self.alpha * vec + (1 - self.alpha) * lex, pos))
+        scored.sort(key=lambda item: -item[0])
+        return self._documents([pos for _, pos in scored[:k]])
+
+
+def load_retriever(vectorstore, index_dir: str, gazetteer=None) -> HybridRetriever:
+    lexical = LexicalIndex.load(index_dir)
+    if lexical is None or len(lexical.doc_ids) != vectorstore.index.ntotal:
+        lexical = LexicalIndex.from_vectorstore(vectorstore)
+    return HybridRetriever(vectorstore, lexical, gazetteer)
@@ -0,0 +1,238 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from typing import Any
+
+import pandas as pd
+from langchain_core.memory import BaseMemory
+from langchain_core.messages import AIMessage, HumanMessage
+
+import tools
+from table_index import TableRef
+
+# ====== Konfigurasi ======
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_PATH = os.getenv("SESSION_MEMORY_PATH", os.path.join(BASE_DIR, ".cache", "sessions.sqlite"))
+ENABLED = os.getenv("SESSION_MEMORY_STORE", "1") == "1"
+STORE_TTL = float(os.getenv("SESSION_MEMORY_TTL", str(7 * 24 * 60 * 60)))
+TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))     # batas keras ringkasan + turn terbaru
+SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))  # bagian budget untuk ringkasan
+ENTRY_TOKENS = 250              # satu entri (mis. jawaban panjang) dipotong sampai batas ini
+FOLD_TARGET = 0.6               # setelah melipat, turn terbaru mengisi <= 60% sisa budget (ringkasan tidak tiap turn)
+CHARS_PER_TOKEN = 4             # perkiraan kasar tokenizer Gemini, tanpa panggilan count_tokens ke API
+SUMMARIZER = os.getenv("MEMORY_SUMMARIZER", "llm")   # llm = ringkasan Gemini, extractive = tanpa LLM
+SUMMARY_PREFIX = "Ringkasan percakapan sebelumnya: "
+
+# Kolom yang dipakai deskriptor tabel: (kolom kunci, kolom harga)
+DESCRIPTOR_COLUMNS = {
+    "transport": ("destination", "price"),
+    "hotel": ("location", "price_per_night"),
+    "promo": ("location", None),
+    "destination": ("location", None),
+}
+
+SUMMARY_PROMPT = """Perbarui ringkasan percakapan asisten perjalanan berikut dalam bahasa Indonesia. \
+Pertahankan kota, tanggal, anggaran, preferensi dan keputusan pengguna; buang basa-basi. \
+Maksimal {max_words} kata.
+
+Ringkasan sebelumnya:
+{summary}
+
+Percakapan baru:
+{turns}
+
+Ringkasan baru:"""
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def clip(text: str, max_tokens: int, keep: str = "head") -> str:
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1] + "…" if keep == "head" else "…" + text[-(limit - 1):]
+
+
+def describe(msg) -> str:
+    # Tabel disimpan sebagai deskriptor pendek (dataset, jumlah baris, kota, rentang harga), bukan isi tabel
+    if isinstance(msg, TableRef):
+        df = tools.resolve_table(msg)
+        return _describe_frame(msg.dataset, df) if df is not None else str(msg)
+    if isinstance(msg, pd.DataFrame):
+        return _describe_frame("", msg)
+    return str(msg)
+
+
+def _describe_frame(dataset: str, df: pd.DataFrame) -> str:
+    parts = [f"tabel {dataset}".rstrip() + f": {len(df)} baris"]
+    key_column, price_column = DESCRIPTOR_COLUMNS.get(dataset, ("location", None))
+    if key_column in df.columns and len(df):
+        keys = list(dict.fromkeys(str(value) for value in df[key_column].head(50)))
+        parts.append(", ".join(keys[:3]) + (" dll" if len(keys) > 3 else ""))
+    if price_column in df.columns and len(df):
+        prices = pd.to_numeric(df[price_column], errors="coerce").dropna()
+        if len(prices):
+            parts.append(f"harga {prices.min():,.0f}–{prices.max():,.0f}".replace(",", "."))
+    return f"[{'; '.join(parts)}]"
+
+
+def render_turns(turns: list) -> str:
+    return "\n".join(f"{role}: {text}" for role, text in turns)
+
+
+def extractive_summary(summary: str, turns: list, max_tokens: int = SUMMARY_TOKENS) -> str:
+    # Tanpa LLM: potongan awal tiap pesan user/bot, bagian paling lama dibuang lebih dulu
+    lines = [summary] if summary else []
+    lines += [f"{role}: {clip(text, 30)}" for role, text in turns if role != "Table"]
+    return clip(" ".join(lines), max_tokens, keep="tail")
+
+
+# ====== Memori Sesi ======
+# Entri terbaru disimpan apa adanya (tabel sebagai deskriptor); begitu melewati budget, entri terlama
+# dilipat ke ringkasan berjalan. Ringkasan + entri terbaru tidak pernah melebihi TOKEN_BUDGET.
+class SessionMemory:
+    def __init__(self, session_id: str, summary: str = "", turns: list = None, budget: int = TOKEN_BUDGET,
+                 summary_tokens: int = SUMMARY_TOKENS):
+        self.session_id = session_id
+        self.summary = summary
+        self.turns = [tuple(turn) for turn in turns or []]   # (role, teks)
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.folds = 0
+
+    def add(self, role: str, msg):
+        self.turns.append((role, clip(describe(msg), ENTRY_TOKENS)))
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.render()) if self.summary or self.turns else 0
+
+    def _overflow(self) -> int:
+        # Jumlah entri terlama yang harus dilipat agar sisanya muat di budget
+        recent_budget = self.budget - self.summary_tokens - estimate_tokens(SUMMARY_PREFIX + "\n")
+        sizes = [estimate_tokens(f"{role}: {text}\n") for role, text in self.turns]
+        if sum(sizes) <= recent_budget:
+            return 0
+        target, kept = int(recent_budget * FOLD_TARGET), 0
+        for i in range(len(sizes) - 1, -1, -1):
+            if kept + sizes[i] > target:
+                return i + 1
+            kept += sizes[i]
+        return 0
+
+    def compact(self, summarizer=None) -> bool:
+        count = self._overflow()
+        if not count:
+            return False
+        folded, self.turns = self.turns[:count], self.turns[count:]
+        summary = None
+        if summarizer is not None:
+            try:
+                summary = summarizer(self.summary, folded)
+            except Exception:
+                summary = None   # ringkasan LLM gagal: jatuh ke ringkasan ekstraktif
+        self.summary = clip(summary or extractive_summary(self.summary, folded, self.summary_tokens),
+                            self.summary_tokens, keep="tail")
+        self.folds += 1
+        return True
+
+    def render(self) -> str:
+        parts = [SUMMARY_PREFIX + self.summary] if self.summary else []
+        if self.turns:
+            parts.append(render_turns(self.turns))
+        return "\n".join(parts) or "No previous context"
+
+    def messages(self) -> list:
+        messages = [HumanMessage(content=SUMMARY_PREFIX + self.summary)] if self.summary else []
+        for role, text in self.turns:
+            messages.append(AIMessage(content=text) if role in ("Bot", "Table") else HumanMessage(content=text))
+        return messages
+
+
+# ====== Adapter LangChain ======
+# Agent ReAct & plan_agent membaca chat_history dari memori sesi. Turn dicatat oleh ChatService di
+# akhir turn (termasuk cabang tabel), jadi save_context dari agent tidak menyimpan apa-apa.
+class SessionChatMemory(BaseMemory):
+    context: Any   # SessionMemory
+    memory_key: str = "chat_history"
+
+    @property
+    def memory_variables(self) -> list:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: dict) -> dict:
+        return {self.memory_key: self.context.messages()}
+
+    def save_context(self, inputs: dict, outputs: dict) -> None:
+        return None
+
+    def clear(self) -> None:
+        return None
+
+
+# ====== Penyimpanan SQLite ======
+class SessionStore:
+    def __init__(self, db_path: str = DEFAULT_STORE_PATH, ttl: float = STORE_TTL):
+        self.ttl = ttl
+        self.stats = {"loads": 0, "restored": 0, "saves": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_memory ("
+            "session_id TEXT PRIMARY KEY, summary TEXT, turns TEXT, tokens INTEGER, updated_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_session_memory_updated ON session_memory(updated_at)")
+        self._conn.commit()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM session_memory").fetchone()[0]
+            return dict(self.stats, entries=entries)
+
+    def load(self, session_id: str) -> SessionMemory:
+        with self._lock:
+            self.stats["loads"] += 1
+            row = self._conn.execute(
+                "SELECT summary, turns FROM session_memory WHERE session_id = ? AND updated_at > ?",
+                (session_id, time.time() - self.ttl)).fetchone()
+            if row is None:
+                return SessionMemory(session_id)
+            self.stats["restored"] += 1
+        return SessionMemory(session_id, row[0] or "", json.loads(row[1] or "[]"))
+
+    def save(self, memory: SessionMemory):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_memory (session_id, summary, turns, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (memory.session_id, memory.summary, json.dumps(memory.turns, ensure_ascii=False),
+                 memory.tokens(), time.time()))
+            self._conn.execute("DELETE FROM session_memory WHERE updated_at <= ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            self.stats["saves"] += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM session_memory WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SessionStore:
+    # Satu store per proses; None jika dimatikan (SESSION_MEMORY_STORE=0), memori hanya hidup di proses
+    global _store
+    if not ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
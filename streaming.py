@@ -0,0 +1,168 @@
+import re
+import json
+import time
+
+import streamlit as st
+from langchain_core.callbacks import BaseCallbackHandler
+
+import tracing
+import upstream
+
+MAX_TURN_METRICS = 50
+
+_FINAL_ANSWER_RE = re.compile(r'"action"\s*:\s*"Final Answer"\s*,\s*"action_input"\s*:\s*"', re.S)
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+# Parser bertahap untuk output agent conversational ReAct:
+#   ```json {"action": "Final Answer", "action_input": "..."} ```
+# Hanya isi action_input dari "Final Answer" yang diteruskan ke layar, token demi token.
+class FinalAnswerExtractor:
+    def __init__(self):
+        self.buffer = ""
+        self._pos = None       # posisi awal string action_input di buffer
+        self._done = False
+
+    def feed(self, token: str) -> str:
+        self.buffer += token
+        if self._done:
+            return ""
+        if self._pos is None:
+            match = _FINAL_ANSWER_RE.search(self.buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out = []
+        i = self._pos
+        while i < len(self.buffer):
+            ch = self.buffer[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch == "\\":
+                if i + 1 >= len(self.buffer):
+                    break  # tunggu token berikutnya
+                nxt = self.buffer[i + 1]
+                if nxt == "u":
+                    if i + 6 > len(self.buffer):
+                        break
+                    out.append(json.loads(f'"{self.buffer[i:i + 6]}"'))
+                    i += 6
+                    continue
+                out.append(_ESCAPES.get(nxt, nxt))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self._pos = i
+        return "".join(out)
+
+
+# Menulis token ke placeholder Streamlit dan mencatat waktu token pertama.
+# started = awal turn; sink pengganti (fallback) meneruskan started sink pertama agar TTFT & total
+# tetap dihitung dari awal turn, bukan dari awal fallback
+class TokenSink:
+    def __init__(self, placeholder, prefix: str = "🤖 **Bot:** ", started: float = None):
+        self.placeholder = placeholder
+        self.prefix = prefix
+        self.text = ""
+        self.started = started if started is not None else time.perf_counter()
+        self.first_token_s = None
+
+    def write(self, token: str):
+        if not token:
+            return
+        if self.first_token_s is None:
+            self.first_token_s = time.perf_counter() - self.started
+        self.text += token
+        self.placeholder.markdown(f"{self.prefix}{self.text}▌")
+
+    def close(self):
+        if self.text:
+            self.placeholder.markdown(f"{self.prefix}{self.text}")
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self.started
+
+
+# Token diteruskan ke callback (mis. antrean event backend.py) alih-alih placeholder Streamlit
+class CallbackSink(TokenSink):
+    def __init__(self, on_token, on_close=None, started: float = None):
+        super().__init__(placeholder=None, started=started)
+        self.on_token = on_token
+        self.on_close = on_close
+
+    def write(self, token: str):
+        if not token:
+            return
+        if self.first_token_s is None:
+            self.first_token_s = time.perf_counter() - self.started
+        self.text += token
+        self.on_token(token)
+
+    def close(self):
+        if self.on_close is not None:
+            self.on_close()
+
+
+class StreamlitAgentHandler(BaseCallbackHandler):
+    def __init__(self, sink: TokenSink, steps=None):
+        self.sink = sink
+        self.steps = steps  # container untuk langkah tool (mis. st.status)
+        self.first_llm_token_s = None
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self._extractor = FinalAnswerExtractor()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+        self._extractor = FinalAnswerExtractor()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+        self._extractor = FinalAnswerExtractor()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.first_llm_token_s is None:
+            self.first_llm_token_s = time.perf_counter() - self.sink.started
+        self.sink.write(self._extractor.feed(token))
+
+    def on_agent_action(self, action, **kwargs):
+        self.tool_calls += 1
+        if self.steps is not None:
+            self.steps.write(f"🔧 `{action.tool}` ← {str(action.tool_input)[:200]}")
+
+    def on_tool_end(self, output, **kwargs):
+        if self.steps is not None:
+            text = str(output)
+            self.steps.write(f"📄 {text[:300]}{'…' if len(text) > 300 else ''}")
+
+
+def stream_gemini(prompt: str, sink: TokenSink) -> str:
+    # Stream tidak di-retry (token yang sudah tampil tidak bisa diulang): breaker + slot + timeout klien saja
+    gemini = upstream.get("gemini")
+    call_started = time.perf_counter()
+    with tracing.span("llm", model=upstream.GEMINI_MODEL, source="fallback", streaming=True) as llm_span, gemini.guard():
+        response = upstream.gemini_model().generate_content(prompt, stream=True,
+                                                            request_options=upstream.gemini_request_options())
+        for chunk in response:
+            try:
+                sink.write(chunk.text)
+            except ValueError:
+                continue  # chunk tanpa teks (mis. hanya metadata keamanan)
+        # ttft_s span = sejak panggilan LLM ini; sink.first_token_s = sejak awal turn
+        ttft_s = sink.started + sink.first_token_s - call_started if sink.first_token_s is not None else None
+        llm_span.set(ttft_s=ttft_s, **tracing.gemini_usage(response))
+    sink.close()
+    return sink.text.strip()
+
+
+def record_turn_metrics(turn: dict):
+    # turn = TurnResult.metrics dari chat_service: path, ttft_s, total_s, first_llm_token_s
+    metrics = st.session_state.setdefault("turn_metrics", [])
+    metrics.append(dict(turn, at=time.time()))
+    del metrics[:-MAX_TURN_METRICS]
+    return metrics[-1]
@@ -0,0 +1,99 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_key(value) -> str:
+    return " ".join(str(value).lower().split())
+
+
+# Referensi ringkas ke sebagian baris dataset (disimpan di riwayat chat, bukan salinan DataFrame)
+class TableRef(NamedTuple):
+    dataset: str
+    positions: np.ndarray
+    version: str
+
+    def __str__(self):
+        return f"[tabel {self.dataset}: {len(self.positions)} baris]"
+
+
+# Index kecil di memori untuk satu DataFrame:
+# - hash index: key ternormalisasi (mis. lokasi) -> posisi baris
+# - sorted index: rank tiap baris untuk kolom harga / tanggal
+# Lookup tidak lagi men-scan seluruh tabel dengan str.contains.
+class TableIndex:
+    def __init__(self, df: pd.DataFrame, key_column: str, sort_columns=(), date_columns=()):
+        self.df = df
+        self.key_column = key_column
+
+        codes, uniques = self._key_codes(df[key_column])
+        # Posisi baris disimpan sebagai int32 (cukup sampai 2^31 baris, separuh memori int64)
+        pos_type = np.int32 if len(df) < 2 ** 31 else np.int64
+        order = np.argsort(codes, kind="stable").astype(pos_type)
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self._positions = {
+            key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(uniques)
+        }
+        self._all = np.arange(len(df), dtype=pos_type)
+
+        # rank[col][pos] = urutan baris pos jika tabel diurutkan menurut col
+        self._order = {}
+        self._rank = {}
+        for col in list(sort_columns) + list(date_columns):
+            if col not in df.columns:
+                continue
+            values = pd.to_datetime(df[col], errors="coerce") if col in date_columns else df[col]
+            col_order = np.argsort(values.to_numpy(), kind="stable").astype(pos_type)
+            rank = np.empty(len(df), dtype=pos_type)
+            rank[col_order] = np.arange(len(df), dtype=pos_type)
+            self._order[col] = col_order
+            self._rank[col] = rank
+
+    @staticmethod
+    def _key_codes(column: pd.Series):
+        # Kolom kategori (dari file Arrow bertipe): normalisasi cukup per kategori, bukan per baris
+        if isinstance(column.dtype, pd.CategoricalDtype) and not column.isna().any():
+            column = column.cat.remove_unused_categories()
+            category_codes, uniques = pd.factorize(column.cat.categories.map(normalize_key).to_numpy())
+            return category_codes[column.cat.codes.to_numpy()], uniques
+        return pd.factorize(column.map(normalize_key).to_numpy())
+
+    @property
+    def sortable_columns(self) -> list:
+        return list(self._order)
+
+    def rank(self, column: str) -> np.ndarray:
+        return self._rank[column]
+
+    def keys(self) -> list:
+        return list(self._positions)
+
+    def lookup(self, value=None) -> np.ndarray:
+        if value is None or normalize_key(value) == "":
+            return self._all
+        key = normalize_key(value)
+        exact = self._positions.get(key)
+        if exact is not None:
+            return exact
+        # Fallback substring seperti str.contains, tapi hanya atas key unik (bukan seluruh baris)
+        matches = [pos for k, pos in self._positions.items() if key in k]
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(matches))
+
+    def positions(self, value=None, order_by: str = None, ascending: bool = True, limit: int = None) -> np.ndarray:
+        positions = self.lookup(value)
+        if order_by in self._order:
+            if positions is self._all:
+                positions = self._order[order_by]
+            else:
+                positions = positions[np.argsort(self._rank[order_by][positions], kind="stable")]
+            if not ascending:
+                positions = positions[::-1]
+        if limit is not None and limit >= 0:
+            positions = positions[:limit]
+        return positions
+
+    def select(self, value=None, order_by: str = None, ascending: bool = True, limit: int = None) -> pd.DataFrame:
+        return self.df.iloc[self.positions(value, order_by, ascending, limit)]
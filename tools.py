@@ -1,26 +1,203 @@
 from datetime import datetime
+import os
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import NamedTuple
+import numpy as np
 import pandas as pd
 import json
 from langchain_community.vectorstores import FAISS
 from langchain_cohere import CohereEmbeddings
 
+import city_matcher
+import dataset_store
+import tracing
+import upstream
+from hotel_search import HotelQuery, HotelSearchIndex
+from table_index import TableIndex, TableRef
+from trip_bundle import BundleEngine, BundleQuery, DEFAULT_NIGHTS, DEFAULT_LIMIT as BUNDLE_LIMIT
+
 # ====== Load datasets ======
-TRANSPORT_PATH = "./dataset/Transport_schedule.csv"
-PROMO_PATH = "./dataset/promo_travel.csv"
-DESTINATION_PATH = "./dataset/destination_info.csv"
-HOTEL_PATH = "./dataset/hotel_availability.csv"
+# TRAVEL_DATASET_DIR bisa di-set untuk memakai dataset lain (mis. data sintetis benchmark)
+DATASET_DIR = os.getenv("TRAVEL_DATASET_DIR", "./dataset")
+
+DATASET_ATTRS = {
+    "transport": "df_transport",
+    "promo": "df_promo",
+    "destination": "df_destination",
+    "hotel": "df_hotel",
+}
+
+
+def _lazy(build):
+    # Dibangun saat pertama kali diakses, sekali per katalog (aman dipakai banyak sesi)
+    name = build.__name__
+
+    def getter(self):
+        value = self.__dict__.get(name)
+        if value is None:
+            with self._lock:
+                value = self.__dict__.get(name)
+                if value is None:
+                    value = self.__dict__[name] = build(self)
+        return value
+    return property(getter)
+
+
+# Dataset dimuat malas: file Arrow bertipe (di-memory-map) jika ada, selain itu CSV.
+# Import tools tidak lagi membaca data; akses pertama ke tabel/index/gazetteer yang memuatnya.
+class Catalog:
+    def __init__(self, dataset_dir: str = DATASET_DIR):
+        self.dataset_dir = dataset_dir
+        self.versions = {}   # dataset -> versi CSV sumber, dipakai untuk referensi tabel di riwayat chat
+        self.formats = {}    # dataset -> "arrow" / "csv"
+        self._lock = threading.RLock()
+
+    def _load(self, name: str) -> pd.DataFrame:
+        with tracing.span("dataset_load", dataset=name) as load_span:
+            df, version, fmt = dataset_store.load(name, self.dataset_dir)
+            load_span.set(format=fmt, rows=len(df))
+        self.versions[name] = version
+        self.formats[name] = fmt
+        return df
+
+    @_lazy
+    def df_transport(self):
+        return self._load("transport")
+
+    @_lazy
+    def df_promo(self):
+        return self._load("promo")
+
+    @_lazy
+    def df_destination(self):
+        return self._load("destination")
+
+    @_lazy
+    def df_hotel(self):
+        return self._load("hotel")
+
+    # Gazetteer kota & moda dari keempat dataset
+    @_lazy
+    def gazetteer(self):
+        return city_matcher.build_from_datasets(self.df_transport, self.df_promo, self.df_destination, self.df_hotel)
+
+    # Index lookup per dataset (hash lokasi -> baris, rank harga/tanggal)
+    @_lazy
+    def transport_index(self):
+        return TableIndex(self.df_transport, "destination", sort_columns=["price"], date_columns=["date"])
+
+    @_lazy
+    def promo_index(self):
+        return TableIndex(self.df_promo, "location", date_columns=["start_date", "end_date"])
+
+    @_lazy
+    def destination_index(self):
+        return TableIndex(self.df_destination, "location")
+
+    @_lazy
+    def hotel_index(self):
+        return TableIndex(self.df_hotel, "location", sort_columns=["price_per_night", "rating"])
+
+    # Bitmap ketersediaan per tanggal & bitset fasilitas untuk search_hotels
+    @_lazy
+    def hotel_search(self):
+        return HotelSearchIndex(self.hotel_index)
+
+    # Gabungan transport x hotel x promo untuk get_recommendation_bundle
+    @_lazy
+    def trip_bundles(self):
+        return BundleEngine(self.transport_index, self.hotel_search, self.promo_index)
+
+    def dataset(self, name: str) -> pd.DataFrame:
+        return getattr(self, DATASET_ATTRS[name])
+
+    def version(self, name: str) -> str:
+        self.dataset(name)
+        return self.versions[name]
+
+    def index(self, name: str) -> TableIndex:
+        return getattr(self, f"{name}_index")
+
+    @property
+    def datasets(self) -> dict:
+        return {name: self.dataset(name) for name in DATASET_ATTRS}
+
+    @property
+    def dataset_versions(self) -> dict:
+        return {name: self.version(name) for name in DATASET_ATTRS}
+
+    @property
+    def indexes(self) -> dict:
+        return {name: self.index(name) for name in DATASET_ATTRS}
+
+    def warm(self):
+        # Bangun semua struktur sekarang (dipakai reload di background, bukan di jalur request)
+        self.indexes, self.gazetteer, self.trip_bundles
+        return self
+
+
+# ====== Snapshot ======
+# Katalog + vectorstore + retriever yang dipakai bersama semua sesi. hot_reload.py membangun snapshot
+# baru di background lalu menukarnya sekaligus lewat publish(); turn yang sedang berjalan tetap
+# membaca snapshot yang di-pin saat turn dimulai (lihat pinned()).
+class Snapshot(NamedTuple):
+    version: str            # None sampai snapshot pertama dipublikasikan
+    catalog: Catalog
+    vectorstore: object = None
+    retriever: object = None
+
 
-df_transport = pd.read_csv(TRANSPORT_PATH)
-df_promo = pd.read_csv(PROMO_PATH)
-df_destination = pd.read_csv(DESTINATION_PATH)
-df_hotel = pd.read_csv(HOTEL_PATH)
+_snapshot = Snapshot(None, Catalog())
+_pinned = contextvars.ContextVar("tools_snapshot", default=None)
 
-# Load VectorDB (gunakan embeddings dari app.py)
-# Catatan: Jangan inisialisasi embeddings di sini, gunakan yang dari app.py
-# vectorstore akan diimpor dari app.py yang sudah dikonfigurasi
 
-# Di bagian atas tools.py, setelah memuat dataset
-print("Hotel Data:", df_hotel)  # Tambahkan ini untuk memeriksa isi df_hotel
+def current() -> Snapshot:
+    return _pinned.get() or _snapshot
+
+
+@contextmanager
+def pinned(snapshot: Snapshot = None):
+    snapshot = snapshot or current()
+    token = _pinned.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _pinned.reset(token)
+
+
+def publish(snapshot: Snapshot) -> Snapshot:
+    # Satu assignment: pembaca melihat snapshot lama atau baru, tidak pernah campuran
+    global _snapshot
+    _snapshot = snapshot
+    return snapshot
+
+
+# Nama lama tetap bisa dipakai (tools.df_hotel, tools.INDEXES, ...), dimuat saat diakses
+_LAZY_NAMES = {
+    "df_transport": "df_transport", "df_promo": "df_promo", "df_destination": "df_destination", "df_hotel": "df_hotel",
+    "gazetteer": "gazetteer",
+    "transport_index": "transport_index", "promo_index": "promo_index",
+    "destination_index": "destination_index", "hotel_index": "hotel_index", "hotel_search": "hotel_search",
+    "trip_bundles": "trip_bundles",
+    "DATASETS": "datasets", "DATASET_VERSIONS": "dataset_versions", "INDEXES": "indexes",
+    "DATASET_FORMATS": "formats",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        return getattr(current().catalog, _LAZY_NAMES[name])
+    if name in ("vectorstore", "retriever"):
+        return getattr(current(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+DEFAULT_LIMIT = 20  # batas baris yang dirender ke teks untuk LLM
+
+# VectorDB tidak dimuat di sini: vectorstore & retriever ikut snapshot yang dipublikasikan
+# oleh hot_reload.py (app.py / backend.py), dibaca lewat tools.vectorstore / tools.retriever
 
 def extract_args(input_str):
     try:
@@ -30,43 +207,117 @@ def extract_args(input_str):
         input_str = input_str.lower().strip()
         if "location:" in input_str:
             location_part = input_str.split("location:")[1].strip()
-            for city in df_hotel["location"].unique():
-                if city.lower() in location_part:
-                    print(f"Extracted location: {city}")  # Debugging
-                    return {"location": city}
+            city = current().catalog.gazetteer.first_city(location_part)
+            if city:
+                return {"location": city}
         return {"input": input_str}
 
+def table_ref(dataset: str, df: pd.DataFrame) -> TableRef:
+    # Dataset dimuat dengan RangeIndex, jadi label index = posisi baris
+    positions = df.index.to_numpy(dtype=np.int32)
+    return TableRef(dataset, positions, current().catalog.version(dataset))
+
+def resolve_table(ref: TableRef):
+    # None jika dataset sudah berganti versi sejak tabel disimpan
+    catalog = current().catalog
+    if ref.dataset not in DATASET_ATTRS or ref.version != catalog.version(ref.dataset):
+        return None
+    return catalog.dataset(ref.dataset).iloc[ref.positions]
+
+def _to_text(df: pd.DataFrame) -> str:
+    return dataset_store.as_text_frame(df).to_string(index=False)
+
+def query_options(args: dict, default_limit=DEFAULT_LIMIT) -> dict:
+    # Opsi opsional dari input JSON: {"limit": 5, "order_by": "price", "ascending": false}
+    limit = args.get("limit", default_limit)
+    ascending = args.get("ascending", True)
+    if isinstance(ascending, str):
+        ascending = ascending.lower() not in ("false", "desc", "0")
+    return {
+        "order_by": args.get("order_by"),
+        "ascending": bool(ascending),
+        "limit": int(limit) if limit is not None else None,
+    }
+
+def _list_arg(value) -> tuple:
+    # ["WiFi", "AC"] atau "WiFi, AC"
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(str(item).strip() for item in value or () if str(item).strip())
+
+def _rupiah(value) -> str:
+    return "Rp" + f"{value:,.0f}".replace(",", ".")
+
+def _day(value) -> str:
+    return pd.Timestamp(value).strftime("%d %b %Y")
+
+def bundle_summary(result: dict) -> str:
+    # Paket dari get_recommendation_bundle sebagai daftar singkat (chat & agent)
+    bundles = result.get("bundles")
+    if bundles is None:
+        return f"🧳 Tidak ada paket transport + hotel yang cocok untuk **{result['location']}**."
+    lines = [f"**Rekomendasi paket untuk kota {result['location']}:**"]
+    for i, row in enumerate(bundles.itertuples(index=False), 1):
+        line = (f"{i}. {_day(row.depart_date)} {row.mode} {row.provider} ({row.departure_time}-{row.arrival_time}) + "
+                f"{row.hotel} (rating {row.rating:.1f}), {_day(row.check_in)} - {_day(row.check_out)}: "
+                f"**{_rupiah(row.total_price)}**")
+        if row.savings > 0:
+            line += f" (hemat {_rupiah(row.savings)}: {row.promo})"
+        lines.append(line)
+    return "\n".join(lines)
+
 # ========== TOOLS ==========
+# Setiap tool tercatat sebagai span "tool" saat tracing aktif (lihat tracing.py)
+@tracing.traced("tool")
 def get_transport_schedule(input_str: str) -> str:
     args = extract_args(input_str)
-    destination = args.get("destination", args.get("input", input_str))
-    # Cari dalam VectorDB (diasumsikan diimpor dari app.py)
-    global vectorstore  # Gunakan vectorstore dari app.py
+    destination = args.get("destination", args.get("location", args.get("input", input_str)))
     query = f"transportasi ke {destination}"
-    results = vectorstore.similarity_search(query, k=5)  # Ambil 5 hasil teratas
+    snapshot = current()
+    try:
+        if snapshot.retriever is not None:
+            # Filter metadata (dataset transport + kota) dulu; kota yang dikenal tidak perlu embedding
+            city = snapshot.catalog.gazetteer.first_city(str(destination))
+            # nprobe / ef_search opsional dari input JSON untuk index IVF / HNSW
+            results = snapshot.retriever.search(query, k=5, dataset="transport", city=city, mode=args.get("mode"),
+                                       nprobe=args.get("nprobe"), ef_search=args.get("ef_search"))
+        else:
+            # Cari dalam VectorDB (diasumsikan diimpor dari app.py)
+            with tracing.span("faiss", k=5, path="similarity_search"):
+                results = snapshot.vectorstore.similarity_search(query, k=5)  # Ambil 5 hasil teratas
+    except upstream.UpstreamError:
+        # Embedding Cohere tidak tersedia (circuit terbuka / deadline): jadwal dari index lokal
+        match = snapshot.catalog.transport_index.select(str(destination), order_by="date", limit=5)
+        return _to_text(match) if not match.empty else f"🚫 Tidak ada jadwal ke **{destination}**."
     if results:
         transport_data = [doc.page_content for doc in results]
         return "\n".join(transport_data) if transport_data else f"🚫 Tidak ada jadwal ke **{destination}**."
     return f"🚫 Tidak ada jadwal ke **{destination}**."
 
+@tracing.traced("tool")
 def get_promo(input_str: str = "") -> str:
-    return df_promo.to_string(index=False)
+    args = extract_args(input_str) if input_str else {}
+    options = query_options(args)
+    options["order_by"] = options["order_by"] or "end_date"
+    return _to_text(current().catalog.promo_index.select(**options))
 
+@tracing.traced("tool")
 def get_promo_by_city(input_str: str) -> str:
     args = extract_args(input_str)
-    city = args.get("city", args.get("input", input_str))
-    match = df_promo[df_promo['location'].str.contains(city, case=False)]
+    city = args.get("city", args.get("location", args.get("input", input_str)))
+    match = current().catalog.promo_index.select(city, **query_options(args))
     if not match.empty:
-        return match.to_string(index=False)
+        return _to_text(match)
     else:
         return f"🎁 Tidak ada promo tersedia untuk kota **{city}**."
 
+@tracing.traced("tool")
 def get_destination_info(input_str: str) -> str:
     args = extract_args(input_str)
     location = args.get("location", args.get("input", input_str))
-    match = df_destination[df_destination['location'].str.contains(location, case=False)]
+    match = current().catalog.destination_index.select(location, **query_options(args))
     if not match.empty:
-        result = match.to_string(index=False)
+        result = _to_text(match)
         # Tambahkan prediksi cuaca sederhana berdasarkan waktu
         current_time = datetime.now().hour
         weather_note = "Cuaca mendukung untuk bepergian malam." if 18 <= current_time <= 23 else "Cuaca mungkin tidak ideal untuk bepergian malam, pertimbangkan waktu lain."
@@ -74,13 +325,41 @@ def get_destination_info(input_str: str) -> str:
     else:
         return f"📍 Tidak ada informasi tentang **{location}**."
 
+@tracing.traced("tool")
 def get_hotel_availability(input_str: str) -> str:
     args = extract_args(input_str)
     location = args.get("location", args.get("input", input_str))
-    match = df_hotel[df_hotel['location'].str.contains(location, case=False)]
-    print(f"Checking hotel availability for location: {location}")  # Debugging
-    return match.to_string(index=False) if not match.empty else f"🏨 Tidak ada hotel tersedia di **{location}**."
+    match = current().catalog.hotel_index.select(location, **query_options(args))
+    return _to_text(match) if not match.empty else f"🏨 Tidak ada hotel tersedia di **{location}**."
 
+@tracing.traced("tool")
+def search_hotels(input_str: str) -> str:
+    # Input JSON: {"location": "Bali", "check_in": "2025-06-24", "check_out": "2025-06-26", "max_price": 600000,
+    #              "facilities": ["Kolam Renang"], "min_rating": 4, "order_by": "price", "limit": 5}
+    args = extract_args(input_str)
+    ascending = args.get("ascending")
+    if isinstance(ascending, str):
+        ascending = ascending.lower() not in ("false", "desc", "0")
+    limit = args.get("limit", DEFAULT_LIMIT)
+    query = HotelQuery(location=args.get("location", args.get("input")), check_in=args.get("check_in"),
+                       check_out=args.get("check_out"), min_price=args.get("min_price"),
+                       max_price=args.get("max_price"), facilities=_list_arg(args.get("facilities")),
+                       min_rating=args.get("min_rating"))
+    catalog = current().catalog
+    index = catalog.hotel_search
+    unknown = [name for name in query.facilities if index.facility_bit(name) is None]
+    if unknown:
+        return f"⚠️ Fasilitas tidak dikenal: {', '.join(unknown)}. Pilihan: {', '.join(index.facility_names)}."
+    try:
+        positions, total = index.search(query, args.get("order_by"), ascending,
+                                        int(limit) if limit is not None else None)
+    except ValueError as e:
+        return f"⚠️ {e}"
+    if total == 0:
+        return f"🏨 Tidak ada hotel yang cocok di **{query.location or 'semua lokasi'}**."
+    return f"🏨 {total} hotel cocok, menampilkan {len(positions)}:\n" + _to_text(catalog.df_hotel.iloc[positions])
+
+@tracing.traced("tool")
 def get_translate_response(input_str: str, target_lang="id") -> str:
     args = extract_args(input_str)
     text = args.get("text", args.get("input", input_str))
@@ -92,25 +371,50 @@ def get_translate_response(input_str: str, target_lang="id") -> str:
     else:
         return f"(Translated [{lang}]) {text}"
 
+@tracing.traced("tool")
 def get_current_date(input_str: str = "") -> str:
     now = datetime.now()
     return now.strftime("📅 %A, %d %B %Y %H:%M")
 
+@tracing.traced("tool")
 def get_recommendation_bundle(input_str: str) -> dict:
+    # Input JSON opsional: {"location": "Bali", "date_from": "2025-06-20", "date_to": "2025-06-30", "nights": 2,
+    #                       "budget": 2500000, "mode": "pesawat", "facilities": ["WiFi"], "min_rating": 4,
+    #                       "order_by": "rating", "limit": 5}
     args = extract_args(input_str)
     location = args.get("location", args.get("input", input_str))
-    transport_df = df_transport[df_transport["destination"].str.contains(location, case=False)]
-    hotel_df = df_hotel[df_hotel["location"].str.contains(location, case=False)]
+    catalog = current().catalog  # transport, hotel & promo dari snapshot yang sama
+    query = BundleQuery(location, date_from=args.get("date_from"), date_to=args.get("date_to"),
+                        nights=int(args.get("nights") or DEFAULT_NIGHTS), budget=args.get("budget"),
+                        mode=args.get("mode"), facilities=_list_arg(args.get("facilities")),
+                        min_rating=args.get("min_rating"))
+    try:
+        bundles = catalog.trip_bundles.search(query, order_by=args.get("order_by") or "price",
+                                              limit=args.get("limit", BUNDLE_LIMIT))
+    except ValueError:   # tanggal tidak dikenali
+        bundles = None
+    if bundles is not None and not bundles.empty:
+        # Tabel UI hanya berisi jadwal & hotel yang dipakai paket
+        transport_df = catalog.df_transport.iloc[pd.unique(bundles["transport_position"])]
+        hotel_df = catalog.df_hotel.iloc[pd.unique(bundles["hotel_position"])]
+    else:
+        # Tidak ada kombinasi yang cocok: tampilkan semua jadwal & hotel kota seperti biasa
+        bundles = None
+        transport_df = catalog.transport_index.select(location, order_by="date")
+        hotel_df = catalog.hotel_index.select(location, order_by="price_per_night")
     return {
         "location": location.title(),
+        "bundles": bundles,
         "transport": transport_df if not transport_df.empty else None,
         "hotel": hotel_df if not hotel_df.empty else None
     }
 
+@tracing.traced("tool")
 def get_all_kendaraan_kota(input_str: str = "") -> str:
+    df_transport = current().catalog.df_transport
     if "mode" not in df_transport.columns or "destination" not in df_transport.columns:
         return "⚠️ Dataset transport tidak memiliki kolom 'mode' dan 'destination'."
-    grouped = df_transport.groupby("mode")["destination"].unique()
+    grouped = df_transport.groupby("mode", observed=True)["destination"].unique()
     result = "📋 **Daftar semua kendaraan dan kota tujuannya:**\n"
     for mode, destinations in grouped.items():
         kota_list = ", ".join(sorted(destinations))
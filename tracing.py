@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# ====== Konfigurasi ======
+# Tracing mati secara default; saat mati, span() & traced() hanya satu cek boolean
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_DIR = os.getenv("TRAVEL_TRACE_DIR", os.path.join(BASE_DIR, ".cache", "traces"))
+SPANS_PATH = os.path.join(TRACE_DIR, "spans.jsonl")
+METRICS_PATH = os.path.join(TRACE_DIR, "metrics.prom")
+METRICS_PORT = int(os.getenv("TRAVEL_METRICS_PORT", "0"))   # 0 = tanpa endpoint HTTP
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.getenv("TRAVEL_TRACING", "0") == "1"
+_current_trace = contextvars.ContextVar("travel_trace", default=None)
+_current_span = contextvars.ContextVar("travel_span", default=None)
+_lock = threading.Lock()
+_io_lock = threading.Lock()   # penulisan file JSONL/metrik dari banyak sesi
+_histograms = {}   # nama span -> [hitungan per bucket..., +Inf, sum]
+_counters = {}     # (nama metrik, label) -> nilai
+_server = None
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool):
+    global _enabled
+    _enabled = bool(value)
+
+
+# ====== Span & Trace ======
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "trace", "attrs", "started_at", "start", "duration_s", "_token")
+
+    def __init__(self, name: str, trace, parent_id: str, attrs: dict):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.trace = trace
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_s = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, error: BaseException = None):
+        if self.duration_s is not None:
+            return
+        self.duration_s = time.perf_counter() - self.start
+        if error is not None:
+            self.attrs["error"] = type(error).__name__
+        _record(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(exc)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "span",
+            "trace_id": self.trace.trace_id if self.trace is not None else None,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": round(self.duration_s * 1000, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+    def end(self, error: BaseException = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+# Satu trace = satu turn chat (routing -> tool/LLM -> render di rerun berikutnya)
+class Trace:
+    def __init__(self, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.spans = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_s = None
+
+    def summary(self) -> dict:
+        # Breakdown inklusif per nama span (span bersarang ikut terhitung di induknya)
+        breakdown = {}
+        for span in self.spans:
+            item = breakdown.setdefault(span.name, {"count": 0, "ms": 0.0})
+            item["count"] += 1
+            item["ms"] += span.duration_s * 1000
+        total = self.duration_s if self.duration_s is not None else time.perf_counter() - self.start
+        return dict(self.attrs, trace_id=self.trace_id, total_ms=total * 1000, breakdown=breakdown)
+
+
+class _Activation:
+    __slots__ = ("trace", "_token")
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        return False
+
+
+def start_span(name: str, trace: Trace = None, **attrs):
+    if not _enabled:
+        return _NOOP
+    parent = _current_span.get()
+    return Span(name, trace or _current_trace.get(), parent.span_id if parent else None, attrs)
+
+
+def span(name: str, **attrs):
+    if not _enabled:
+        return _NOOP
+    return start_span(name, **attrs)
+
+
+def traced(name: str, **static_attrs):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with start_span(name, function=fn.__name__, **static_attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(fn):
+    # Bawa trace/span aktif ke thread lain (mis. ThreadPoolExecutor)
+    if not _enabled:
+        return fn
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def begin_turn(**attrs):
+    return Trace(**attrs) if _enabled else None
+
+
+def activate(trace: Trace):
+    return _Activation(trace) if trace is not None else _NOOP
+
+
+def annotate(**attrs):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def end_turn(trace: Trace) -> dict:
+    if trace is None:
+        return None
+    trace.duration_s = time.perf_counter() - trace.start
+    summary = trace.summary()
+    record = {"type": "turn", "trace_id": trace.trace_id, "start": trace.started_at,
+              "duration_ms": round(summary["total_ms"], 3), "attrs": trace.attrs}
+    with _lock:
+        _observe("turn", trace.duration_s)
+        _count("travel_turns_total", (("branch", str(trace.attrs.get("branch", "unknown"))),))
+    _write_jsonl([s.to_dict() for s in trace.spans] + [record])
+    write_metrics()
+    return summary
+
+
+# ====== Agregasi Metrik ======
+def _observe(name: str, seconds: float):
+    hist = _histograms.setdefault(name, [0] * (len(BUCKETS) + 2))
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            hist[i] += 1
+    hist[len(BUCKETS)] += 1
+    hist[-1] += seconds
+
+
+def _count(metric: str, labels: tuple, value: float = 1):
+    _counters[(metric, labels)] = _counters.get((metric, labels), 0) + value
+
+
+def incr(metric: str, value: float = 1, **labels):
+    # Counter bebas di luar span (mis. hit/miss cache); label diurutkan agar stabil
+    if not _enabled:
+        return
+    with _lock:
+        _count(metric, tuple(sorted((k, str(v)) for k, v in labels.items())), value)
+
+
+def _record(span: Span):
+    with _lock:
+        _observe(span.name, span.duration_s)
+        for kind in ("input_tokens", "output_tokens"):
+            if span.attrs.get(kind):
+                _count("travel_llm_tokens_total", (("kind", kind[:-len("_tokens")]),), span.attrs[kind])
+    if span.trace is not None:
+        span.trace.spans.append(span)
+    else:
+        _write_jsonl([span.to_dict()])  # span di luar turn chat (mis. panel eksplorasi)
+
+
+def _write_jsonl(records: list):
+    lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+    with _io_lock:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        with open(SPANS_PATH, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP travel_span_duration_seconds Durasi span per nama.",
+        "# TYPE travel_span_duration_seconds histogram",
+    ]
+    with _lock:
+        for name, hist in sorted(_histograms.items()):
+            for bound, value in zip(BUCKETS, hist):
+                lines.append(f'travel_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {value}')
+            lines.append(f'travel_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {hist[len(BUCKETS)]}')
+            lines.append(f'travel_span_duration_seconds_sum{{span="{name}"}} {hist[-1]:.6f}')
+            lines.append(f'travel_span_duration_seconds_count{{span="{name}"}} {hist[len(BUCKETS)]}')
+        seen = set()
+        for (metric, labels), value in sorted(_counters.items()):
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str = METRICS_PATH):
+    text = render_prometheus()
+    with _io_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    # Endpoint /metrics untuk Prometheus; aman dipanggil di setiap rerun Streamlit
+    global _server
+    if not (_enabled and port):
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+# ====== Token LLM ======
+def gemini_usage(response) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return {}
+    return {"input_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "output_tokens": getattr(usage, "candidates_token_count", 0) or 0}
+
+
+def langchain_usage(response) -> dict:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0)}
+    return {}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    # Span "llm" per panggilan model di dalam agent, lengkap dengan jumlah token
+    def __init__(self, trace: Trace = None):
+        self.trace = trace or _current_trace.get()
+        self._spans = {}
+
+    def _start(self, serialized, run_id, kwargs):
+        params = kwargs.get("invocation_params") or ((serialized or {}).get("kwargs") or {})
+        model = params.get("model") or params.get("model_name") or params.get("_type", "")
+        self._spans[run_id] = start_span("llm", trace=self.trace, model=model, source="agent")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(serialized, run_id, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.set(**langchain_usage(response))
+            llm_span.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.end(error)
+
+
+def langchain_callbacks() -> list:
+    return [TracingCallbackHandler()] if _enabled else []
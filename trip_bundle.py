@@ -0,0 +1,244 @@
+import re
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from hotel_search import HotelQuery, HotelSearchIndex, parse_days, to_day, unpack_bits
+from table_index import TableIndex, normalize_key
+
+DEFAULT_NIGHTS = 2
+DEFAULT_LIMIT = 5
+
+# promo_type -> bagian biaya yang dipotong; tipe lain (mis. Promo Kuliner) tidak mengubah harga paket
+PROMO_TARGETS = {
+    "diskon hotel": "hotel",
+    "diskon penerbangan": "flight",
+    "paket transportasi": "transport",
+    "cashback wisata": "cashback",
+}
+FLIGHT_MODES = ("pesawat",)
+PERCENT = re.compile(r"(\d+(?:[.,]\d+)?)\s*%")
+RUPIAH = re.compile(r"Rp\s?([\d.]+)")
+HOTEL_NAME = re.compile(r"untuk hotel (.+?)(?:,|\.$|$)")
+
+
+class BundleQuery(NamedTuple):
+    location: str
+    date_from: object = None    # tanggal berangkat paling awal
+    date_to: object = None      # tanggal berangkat paling akhir
+    nights: int = DEFAULT_NIGHTS
+    budget: float = None        # total setelah promo
+    mode: str = None
+    facilities: tuple = ()
+    min_rating: float = None
+
+
+def _minutes(column: pd.Series) -> np.ndarray:
+    # "13:20" -> 800; kolom kategori cukup di-parse per kategori. Tidak dikenal = -1
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        per_category = _minutes(pd.Series(column.cat.categories.astype(str)))
+        codes = column.cat.codes.to_numpy()
+        return np.where(codes >= 0, per_category[codes], -1)
+    parts = column.astype(str).str.extract(r"(\d{1,2})[:.](\d{2})").astype(float)
+    return (parts[0] * 60 + parts[1]).fillna(-1).to_numpy(dtype=np.int32)
+
+
+def _savings(base: np.ndarray, percent: np.ndarray, amount: np.ndarray) -> np.ndarray:
+    # Potongan tiap promo (sumbu terakhir) untuk biaya base: persen, atau nominal yang tidak melebihi biaya
+    base = base[..., None]
+    return np.where(percent > 0, base * percent, np.minimum(amount, base))
+
+
+def _best(savings: np.ndarray, promos: np.ndarray) -> tuple:
+    # Promo dengan potongan terbesar di sumbu terakhir: (potongan, posisi promo atau -1)
+    if savings.shape[-1] == 0:
+        return np.zeros(savings.shape[:-1]), np.full(savings.shape[:-1], -1)
+    best = savings.argmax(axis=-1)
+    value = np.take_along_axis(savings, best[..., None], axis=-1)[..., 0]
+    return value, np.where(value > 0, promos[best], -1)
+
+
+def _per_group_top(keys: np.ndarray, groups: np.ndarray, k: int) -> np.ndarray:
+    # Indeks k key terkecil di setiap grup (tanpa loop per grup)
+    order = np.lexsort((keys, groups))
+    sorted_groups = groups[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups)
+    return order[rank < k]
+
+
+# ====== Mesin Paket Perjalanan ======
+# Menggabungkan keberangkatan transport, ketersediaan hotel (bitmap hotel_search) dan promo aktif:
+# - check-in = hari tiba (tiba lebih awal dari jam berangkat = keesokan harinya), menginap `nights` malam
+# - promo: satu potongan transport (aktif di hari berangkat), satu potongan hotel dan satu cashback
+#   (aktif selama menginap), masing-masing yang paling besar
+# Karena total = biaya transport + biaya hotel - cashback (terpisah per hari check-in), cukup k transport
+# termurah dan k hotel terbaik per hari check-in yang perlu dipasangkan; hasil top-k tetap sama persis.
+class BundleEngine:
+    def __init__(self, transport_index: TableIndex, hotel_search: HotelSearchIndex, promo_index: TableIndex):
+        self.transport_index = transport_index
+        self.hotel_search = hotel_search
+        self.promo_index = promo_index
+
+        transport = transport_index.df
+        self.depart_day = parse_days(transport["date"])
+        departure, arrival = _minutes(transport["departure_time"]), _minutes(transport["arrival_time"])
+        overnight = (departure >= 0) & (arrival >= 0) & (arrival < departure)
+        self.arrival_day = np.where(self.depart_day >= 0, self.depart_day + overnight, -1)
+        self.transport_price = transport["price"].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.mode_codes, modes = pd.factorize(transport["mode"].astype(str).map(normalize_key).to_numpy())
+        self.mode_code = {mode: code for code, mode in enumerate(modes)}
+        self.flight = np.isin(self.mode_codes, [self.mode_code[m] for m in FLIGHT_MODES if m in self.mode_code])
+
+        promos = promo_index.df
+        self.promo_start = parse_days(promos["start_date"])
+        self.promo_end = parse_days(promos["end_date"])
+        self.promo_target = promos["promo_type"].astype(str).map(normalize_key).map(PROMO_TARGETS).to_numpy()
+        text = promos["description"].astype(str)
+        self.promo_percent = (text.str.extract(PERCENT)[0].str.replace(",", ".").astype(float) / 100).fillna(0).to_numpy()
+        self.promo_amount = text.str.extract(RUPIAH)[0].str.replace(".", "").astype(float).fillna(0).to_numpy()
+        self.promo_hotel = self._hotel_targets(promos)
+        self.promo_text = (promos["promo_type"].astype(str) + ": " + text).to_numpy(dtype=object)
+
+    def _hotel_targets(self, promos: pd.DataFrame) -> np.ndarray:
+        # Promo hotel yang menyebut nama hotel hanya berlaku untuk hotel itu (-1 = semua hotel di kota,
+        # -2 = hotel yang disebut tidak ada). Dihitung sekali per snapshot, hanya untuk promo hotel.
+        targets = np.full(len(promos), -1, dtype=np.int64)
+        hotel_index = self.hotel_search.table_index
+        names = hotel_index.df["name"]
+        for pos in np.flatnonzero(self.promo_target == "hotel"):
+            match = HOTEL_NAME.search(str(promos["description"].iloc[pos]))
+            if match is None:
+                continue
+            candidates = hotel_index.lookup(promos["location"].iloc[pos])
+            same = names.iloc[candidates].astype(str).map(normalize_key).to_numpy() == normalize_key(match.group(1))
+            targets[pos] = candidates[same][0] if same.any() else -2
+        return targets
+
+    # ====== Query ======
+    def _departures(self, query: BundleQuery, nights: int) -> tuple:
+        hotels = self.hotel_search
+        t = self.transport_index.lookup(query.location).astype(np.int64)
+        keep = self.depart_day[t] >= 0
+        if query.date_from is not None:
+            keep &= self.depart_day[t] >= to_day(query.date_from)
+        if query.date_to is not None:
+            keep &= self.depart_day[t] <= to_day(query.date_to)
+        if query.mode:
+            keep &= self.mode_codes[t] == self.mode_code.get(normalize_key(query.mode), -1)
+        t = t[keep]
+        # Hari check-in relatif ke kalender hotel; seluruh malam menginap harus ada di kalender
+        check_in = self.arrival_day[t] - hotels.first_day
+        fits = (check_in >= 0) & (check_in + nights <= hotels.n_days)
+        return t[fits], check_in[fits]
+
+    def search(self, query: BundleQuery, order_by: str = "price", limit: int = DEFAULT_LIMIT) -> pd.DataFrame:
+        nights = max(1, int(query.nights or DEFAULT_NIGHTS))
+        limit = DEFAULT_LIMIT if limit is None else max(0, int(limit))
+        by_rating = str(order_by).lower() == "rating"
+        hotels = self.hotel_search
+
+        t, check_in = self._departures(query, nights)
+        h = hotels.matches(HotelQuery(location=query.location, facilities=tuple(query.facilities or ()),
+                                      min_rating=query.min_rating)).astype(np.int64)
+        if len(t) == 0 or len(h) == 0 or limit == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return self._frame(empty, empty, empty, np.empty((0, 3), dtype=np.int64), *(np.empty(0),) * 3, nights)
+        days, day_of = np.unique(check_in, return_inverse=True)   # hari check-in yang berbeda (D)
+        stay_first = days + hotels.first_day
+        stay_last = stay_first + nights - 1
+
+        # Promo kota tujuan yang tanggalnya valid
+        p = self.promo_index.lookup(query.location).astype(np.int64)
+        p = p[(self.promo_start[p] >= 0) & (self.promo_end[p] >= 0)]
+        start, end, target = self.promo_start[p], self.promo_end[p], self.promo_target[p]
+        percent, amount = self.promo_percent[p], self.promo_amount[p]
+
+        # Transport: potongan aktif di hari berangkat (diskon penerbangan hanya untuk pesawat)
+        depart = self.depart_day[t]
+        applies = ((target == "transport") | ((target == "flight") & self.flight[t][:, None]))
+        applies &= (start <= depart[:, None]) & (end >= depart[:, None])
+        t_save, t_promo = _best(_savings(self.transport_price[t], percent, amount) * applies, p)
+        t_cost = self.transport_price[t] - t_save
+
+        # Hotel: malam check_in..check_in+nights-1 tersedia semua (cumsum bitmap), potongan aktif selama menginap
+        free = np.zeros((len(h), hotels.n_days + 1), dtype=np.int32)
+        np.cumsum(unpack_bits(hotels.availability[h], hotels.n_days), axis=1, out=free[:, 1:])
+        available = free[:, days + nights] - free[:, days] == nights                        # (H, D)
+        active = (start[None, :] <= stay_last[:, None]) & (end[None, :] >= stay_first[:, None])   # (D, P)
+        for_hotel = (target == "hotel") & ((self.promo_hotel[p] == -1) | (self.promo_hotel[p][None, :] == h[:, None]))
+        base = nights * hotels.price[h]
+        h_save, h_promo = _best(_savings(base, percent, amount)[:, None, :] * (for_hotel[:, None, :] & active[None]),
+                                p)                                                           # (H, D)
+        h_cost = base[:, None] - h_save
+
+        # Cashback wisata per hari check-in
+        cash, cash_promo = _best(np.where((target == "cashback") & active, amount, 0.0), p)   # (D,)
+
+        # Budget: hotel hanya layak jika masih muat dengan transport termurah di hari itu
+        feasible = available
+        if query.budget is not None:
+            cheapest = np.full(len(days), np.inf)
+            np.minimum.at(cheapest, day_of, t_cost)
+            feasible = feasible & (h_cost + cheapest[None, :] - cash[None, :] <= float(query.budget))
+
+        # k hotel terbaik per hari (rating dulu jika diminta, lalu biaya) dan k transport termurah per hari
+        if by_rating:
+            weight = 2 * (np.nanmax(h_cost) + np.nanmax(t_cost) + 1)   # rating selalu lebih menentukan dari biaya
+            key = -hotels.rating[h].astype(np.float64)[:, None] * weight + h_cost
+        else:
+            key = h_cost
+        key = np.where(feasible, key, np.inf)
+        if len(h) > limit:
+            top_h = np.argpartition(key, limit - 1, axis=0)[:limit]                         # (k, D)
+        else:
+            top_h = np.broadcast_to(np.arange(len(h))[:, None], key.shape)
+        top_t = _per_group_top(t_cost, day_of, limit)
+
+        # Pasangan transport x hotel di hari check-in yang sama
+        pair_day = np.repeat(day_of[top_t], top_h.shape[0])
+        pair_t = np.repeat(top_t, top_h.shape[0])
+        pair_h = top_h[:, day_of[top_t]].T.ravel()
+        ok = np.isfinite(key[pair_h, pair_day])
+        pair_t, pair_h, pair_day = pair_t[ok], pair_h[ok], pair_day[ok]
+        total = t_cost[pair_t] + h_cost[pair_h, pair_day] - cash[pair_day]
+        if query.budget is not None:
+            ok = total <= float(query.budget)
+            pair_t, pair_h, pair_day, total = pair_t[ok], pair_h[ok], pair_day[ok], total[ok]
+
+        if by_rating:
+            order = np.lexsort((total, -hotels.rating[h[pair_h]]))[:limit]
+        else:
+            order = np.lexsort((-hotels.rating[h[pair_h]], total))[:limit]
+        pair_t, pair_h, pair_day = pair_t[order], pair_h[order], pair_day[order]
+        promos = np.stack([t_promo[pair_t], h_promo[pair_h, pair_day], cash_promo[pair_day]], axis=1)
+        savings = t_save[pair_t] + h_save[pair_h, pair_day] + cash[pair_day]
+        return self._frame(t[pair_t], h[pair_h], stay_first[pair_day], promos, self.transport_price[t[pair_t]],
+                           base[pair_h], savings, nights)
+
+    def _frame(self, t, h, check_in, promos, transport_price, hotel_price, savings, nights) -> pd.DataFrame:
+        transport = self.transport_index.df
+        hotel = self.hotel_search.table_index.df
+        # Maksimal tiga promo per paket (transport, hotel, cashback), digabung jadi satu teks
+        texts = np.where(promos >= 0, self.promo_text[promos], "") if len(self.promo_text) else np.full(promos.shape, "")
+        promo_text = pd.DataFrame(texts).agg(lambda row: " + ".join(x for x in row if x), axis=1) \
+            if len(t) else pd.Series([], dtype=object)
+        check_in = np.asarray(check_in, dtype="datetime64[D]")
+        # Hanya k baris terpilih yang diambil dari tabel (tipe kolom Arrow/kategori tetap)
+        trip = transport.iloc[t][["date", "mode", "provider", "departure_time", "arrival_time"]]
+        stay = hotel.iloc[h][["name", "rating"]]
+        return pd.concat([
+            trip.rename(columns={"date": "depart_date"}).reset_index(drop=True),
+            stay.rename(columns={"name": "hotel"}).reset_index(drop=True),
+            pd.DataFrame({
+                "check_in": check_in,
+                "check_out": check_in + np.timedelta64(nights, "D"),
+                "transport_price": transport_price,
+                "hotel_price": hotel_price,
+                "savings": savings,
+                "total_price": transport_price + hotel_price - savings,
+                "promo": promo_text.to_numpy(),
+                "transport_position": t,
+                "hotel_position": h,
+            }),
+        ], axis=1)
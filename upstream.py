@@ -0,0 +1,428 @@
+import os
+import time
+import random
+import threading
+from typing import NamedTuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+import google.generativeai as genai
+from requests.adapters import HTTPAdapter
+from langchain_core.embeddings import Embeddings
+
+try:
+    import httpx
+except ImportError:  # klien Cohere memakai httpx; tanpa httpx error transport dikenali dari status saja
+    httpx = None
+
+import tracing
+from concurrency import SingleFlight, UpstreamLimiter
+
+# ====== Konfigurasi ======
+GEMINI_MODEL = "gemini-2.0-flash"
+# Endpoint bisa diarahkan ke server lokal (benchmarks/fake_upstreams.py) untuk uji latensi & error
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")        # mis. http://127.0.0.1:8081 (transport REST)
+COHERE_BASE_URL = os.getenv("COHERE_BASE_URL")                # mis. http://127.0.0.1:8082
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+WIKIPEDIA_USER_AGENT = "travel-assistant/1.0"
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class Policy(NamedTuple):
+    concurrency: int          # panggilan serentak per proses (semaphore)
+    timeout_s: float          # batas satu percobaan
+    deadline_s: float         # batas total: antre slot + semua percobaan + backoff
+    retries: int
+    backoff_s: float          # basis backoff eksponensial (full jitter)
+    max_backoff_s: float
+    failure_threshold: int    # kegagalan beruntun sebelum circuit terbuka
+    reset_s: float            # lama circuit terbuka sebelum satu panggilan percobaan (half-open)
+
+
+def _policy(name: str, concurrency: int, timeout_s: float, deadline_s: float, retries: int,
+            backoff_s: float = 0.5, max_backoff_s: float = 8.0, failure_threshold: int = 5,
+            reset_s: float = 30.0) -> Policy:
+    prefix = name.upper()
+    return Policy(
+        int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        float(os.getenv(f"{prefix}_TIMEOUT_S", str(timeout_s))),
+        float(os.getenv(f"{prefix}_DEADLINE_S", str(deadline_s))),
+        int(os.getenv(f"{prefix}_RETRIES", str(retries))),
+        backoff_s, max_backoff_s,
+        int(os.getenv(f"{prefix}_BREAKER_FAILURES", str(failure_threshold))),
+        float(os.getenv(f"{prefix}_BREAKER_RESET_S", str(reset_s))),
+    )
+
+
+POLICIES = {
+    "gemini": _policy("gemini", 8, timeout_s=30, deadline_s=60, retries=2),
+    # SDK Cohere sudah mengulang 429/5xx sendiri (2x); retry di sini untuk timeout & koneksi putus
+    "cohere": _policy("cohere", 4, timeout_s=10, deadline_s=20, retries=1, backoff_s=0.25),
+    "wikipedia": _policy("wikipedia", 4, timeout_s=5, deadline_s=10, retries=2, backoff_s=0.25),
+}
+# Batas konkurensi per layanan hulu, dibagi semua sesi dalam satu proses
+LIMITS = {name: policy.concurrency for name, policy in POLICIES.items()}
+MAX_WAITING_FACTOR = 4   # antrean slot > concurrency x 4 = panggilan baru langsung ditolak
+
+
+# ====== Error ======
+class UpstreamError(RuntimeError):
+    def __init__(self, upstream: str, message: str):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class DeadlineExceeded(UpstreamError, TimeoutError):
+    pass
+
+
+class UpstreamUnavailable(UpstreamError):
+    pass
+
+
+def status_code(error) -> int:
+    for value in (getattr(error, "status_code", None), getattr(error, "code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int):
+            return int(value)
+    return None
+
+
+def is_retryable(error) -> bool:
+    # Error transport/timeout/429/5xx dicoba ulang dan dihitung circuit breaker; error permintaan
+    # (mis. 400, halaman tidak ada) berarti layanan hulu sehat
+    if isinstance(error, UpstreamError):
+        return False   # sudah dihitung oleh lapisan upstream-nya sendiri
+    if isinstance(error, (TimeoutError, ConnectionError, requests.ConnectionError, requests.Timeout)):
+        return True
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    return status_code(error) in RETRYABLE_STATUS
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # Full jitter: klien yang gagal bersamaan tidak mencoba ulang bersamaan
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# ====== Circuit Breaker ======
+# closed -> (failure_threshold gagal beruntun) -> open -> (reset_s) -> half_open: satu panggilan percobaan;
+# berhasil = closed, gagal = open lagi. Selama open, panggilan langsung gagal ke fallback cache/lokal.
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_s:
+                self.state, self._probing = "half_open", False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state, self.failures, self._probing = "closed", 0, False
+
+    def cancel(self):
+        # Panggilan percobaan batal sebelum sampai ke hulu (mis. antrean penuh): half-open boleh mencoba lagi
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state, self._opened_at, self._probing = "open", time.monotonic(), False
+                self.opens += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "opens": self.opens}
+
+
+# ====== Upstream ======
+class Upstream:
+    def __init__(self, name: str, policy: Policy, limiter: UpstreamLimiter):
+        self.name = name
+        self.policy = policy
+        self.limiter = limiter
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_s)
+        self.stats = {"calls": 0, "requests": 0, "coalesced": 0, "retries": 0, "errors": 0, "timeouts": 0,
+                      "shed": 0, "short_circuited": 0}
+        self._flight = SingleFlight()
+        # Satu thread per slot: percobaan yang melewati timeout ditinggal, slotnya baru kembali saat selesai
+        self._pool = ThreadPoolExecutor(max_workers=policy.concurrency, thread_name_prefix=f"upstream-{name}")
+        self._lock = threading.Lock()
+
+    def _count(self, stat: str, result: str = None):
+        with self._lock:
+            self.stats[stat] += 1
+        tracing.incr("travel_upstream_calls_total", upstream=self.name, result=result or stat)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats, **self.breaker.get_stats())
+
+    def _acquire(self, deadline: float):
+        timeout = max(0.0, deadline - time.monotonic())
+        if not self.limiter.acquire(self.name, timeout=timeout,
+                                    max_waiting=self.policy.concurrency * MAX_WAITING_FACTOR):
+            self._count("shed")
+            raise DeadlineExceeded(self.name, "antrean penuh, permintaan ditolak")
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(self.name, "circuit terbuka, layanan sementara dilewati")
+
+    def call(self, fn, *args, key=None, deadline_s: float = None, **kwargs):
+        # key: permintaan identik yang sedang berjalan digabung (single-flight), hanya satu yang ke hulu
+        with self._lock:
+            self.stats["calls"] += 1
+        deadline = time.monotonic() + (deadline_s or self.policy.deadline_s)
+        if key is None:
+            return self._call(fn, args, kwargs, deadline)
+        leader = []
+        result = self._flight.do((self.name, key), self._lead, leader, fn, args, kwargs, deadline)
+        if not leader:
+            self._count("coalesced")
+        return result
+
+    def _lead(self, leader: list, fn, args, kwargs, deadline: float):
+        leader.append(True)
+        return self._call(fn, args, kwargs, deadline)
+
+    def _call(self, fn, args, kwargs, deadline: float):
+        self._admit()
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, args, kwargs, deadline)
+            except UpstreamError:
+                self.breaker.cancel()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.success()
+                    raise
+                self.breaker.failure()
+                self._count("timeouts" if isinstance(e, TimeoutError) else "errors")
+                delay = backoff_delay(attempt, self.policy.backoff_s, self.policy.max_backoff_s)
+                if (attempt >= self.policy.retries or self.breaker.state == "open"
+                        or time.monotonic() + delay >= deadline):
+                    raise UpstreamUnavailable(self.name, f"gagal setelah {attempt + 1} percobaan: {e}") from e
+                time.sleep(delay)
+                attempt += 1
+                self._count("retries")
+                continue
+            self.breaker.success()
+            return result
+
+    def _attempt(self, fn, args, kwargs, deadline: float):
+        self._acquire(deadline)
+        with self._lock:
+            self.stats["requests"] += 1
+
+        def run():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.limiter.release(self.name)
+
+        try:
+            future = self._pool.submit(tracing.bind(run))
+        except RuntimeError:   # pool sudah ditutup (proses berhenti)
+            self.limiter.release(self.name)
+            raise
+        timeout = min(self.policy.timeout_s, max(0.0, deadline - time.monotonic()))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"{self.name}: tidak ada respons dalam {timeout:.1f} s") from None
+
+    @contextmanager
+    def guard(self):
+        # Untuk klien yang mengatur request-nya sendiri (stream Gemini, agent LangChain): circuit breaker
+        # dan slot konkurensi saja, tanpa retry (token stream yang sudah tampil tidak bisa diulang)
+        self._admit()
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["requests"] += 1
+        try:
+            self._acquire(time.monotonic() + self.policy.deadline_s)
+        except UpstreamError:
+            self.breaker.cancel()
+            raise
+        try:
+            yield self
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.failure()
+                self._count("timeouts" if isinstance(e, TimeoutError) else "errors")
+            elif not isinstance(e, UpstreamError):
+                self.breaker.success()
+            raise
+        else:
+            self.breaker.success()
+        finally:
+            self.limiter.release(self.name)
+
+
+_limiter = UpstreamLimiter(LIMITS)
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_limiter() -> UpstreamLimiter:
+    return _limiter
+
+
+def get(name: str) -> Upstream:
+    # Satu Upstream per layanan per proses: semaphore, single-flight & circuit breaker dibagi semua sesi
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            upstream = _upstreams[name] = Upstream(name, POLICIES[name], _limiter)
+        return upstream
+
+
+def get_stats() -> dict:
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    return {name: upstream.get_stats() for name, upstream in upstreams.items()}
+
+
+# ====== Gemini ======
+_gemini_key = None
+_gemini_models = {}
+_gemini_lock = threading.Lock()
+
+
+def gemini_client_options() -> dict:
+    # Dipakai juga oleh ChatGoogleGenerativeAI (resources.create_llm)
+    if GEMINI_API_ENDPOINT:
+        return {"transport": "rest", "client_options": {"api_endpoint": GEMINI_API_ENDPOINT}}
+    return {}
+
+
+def configure_gemini(api_key: str):
+    # genai.configure hanya saat key berubah; model (dan koneksinya) dipakai ulang antar panggilan
+    global _gemini_key
+    with _gemini_lock:
+        if api_key == _gemini_key:
+            return
+        genai.configure(api_key=api_key, **gemini_client_options())
+        _gemini_models.clear()
+        _gemini_key = api_key
+
+
+def gemini_model(name: str = GEMINI_MODEL):
+    with _gemini_lock:
+        model = _gemini_models.get(name)
+        if model is None:
+            model = _gemini_models[name] = genai.GenerativeModel(name)
+        return model
+
+
+def gemini_request_options() -> dict:
+    # retry=None: retry bawaan klien (503 sampai 600 s) dimatikan, diganti retry & deadline lapisan ini
+    return {"timeout": POLICIES["gemini"].timeout_s, "retry": None}
+
+
+def gemini_generate(prompt: str, source: str, key=None):
+    # Respons non-stream dengan retry/backoff; key = prompt identik yang sedang berjalan digabung
+    model = gemini_model()
+    with tracing.span("llm", model=GEMINI_MODEL, source=source) as llm_span:
+        response = get("gemini").call(model.generate_content, prompt, request_options=gemini_request_options(),
+                                      key=key)
+        llm_span.set(**tracing.gemini_usage(response))
+    return response
+
+
+# ====== Cohere ======
+class GuardedEmbeddings(Embeddings):
+    # Di bawah CachedEmbeddings: hanya cache miss yang lewat sini (slot, retry, breaker)
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def embed_query(self, text: str) -> list:
+        return get("cohere").call(self.embeddings.embed_query, text, key=("query", text))
+
+    def embed_documents(self, texts: list) -> list:
+        return get("cohere").call(self.embeddings.embed_documents, texts)
+
+    def embed(self, texts: list, input_type: str = None) -> list:
+        # CohereEmbeddings.embed(texts, input_type=...); embeddings lain: satu per satu
+        embed = getattr(self.embeddings, "embed", None)
+        if embed is None:
+            return get("cohere").call(lambda batch: [self.embeddings.embed_query(t) for t in batch], texts)
+        return get("cohere").call(embed, texts, input_type=input_type, key=(input_type, tuple(texts)))
+
+
+def cohere_options() -> dict:
+    # Retry tenacity langchain_cohere dimatikan: hanya retry SDK + lapisan ini
+    options = {"request_timeout": POLICIES["cohere"].timeout_s, "max_retries": 0}
+    if COHERE_BASE_URL:
+        options["base_url"] = COHERE_BASE_URL
+    return options
+
+
+# ====== Wikipedia ======
+class WikipediaClient:
+    def __init__(self, api_url: str = WIKIPEDIA_API_URL, pool_size: int = LIMITS["wikipedia"]):
+        self.api_url = api_url
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = WIKIPEDIA_USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _query(self, lang: str, **params) -> dict:
+        params.update(action="query", format="json", formatversion=2)
+        response = self._session.get(self.api_url.format(lang=lang), params=params,
+                                     timeout=POLICIES["wikipedia"].timeout_s)
+        response.raise_for_status()
+        return response.json().get("query", {})
+
+    def _page(self, lang: str, title: str, sentences: int) -> dict:
+        pages = self._query(lang, titles=title, prop="extracts|pageprops", ppprop="disambiguation", exintro=1,
+                            explaintext=1, exsentences=sentences, redirects=1).get("pages", [])
+        page = pages[0] if pages else {}
+        return None if page.get("missing") or page.get("invalid") else page
+
+    def summary(self, title: str, sentences: int = 3, auto_suggest: bool = True, lang: str = "id") -> str:
+        # None jika tidak ada halaman; halaman disambiguasi diganti pilihan pertamanya
+        page = self._page(lang, title, sentences)
+        if page is None and auto_suggest:
+            hits = self._query(lang, list="search", srsearch=title, srlimit=1).get("search", [])
+            page = self._page(lang, hits[0]["title"], sentences) if hits else None
+        if page is not None and "disambiguation" in page.get("pageprops", {}):
+            links = self._query(lang, titles=page["title"], prop="links", plnamespace=0, pllimit=1).get("pages", [])
+            options = links[0].get("links", []) if links else []
+            page = self._page(lang, options[0]["title"], sentences) if options else None
+        return (page or {}).get("extract") or None
+
+
+wikipedia_client = WikipediaClient()
+
+
+def wikipedia_summary(title: str, sentences: int = 3, auto_suggest: bool = True, lang: str = "id") -> str:
+    return get("wikipedia").call(wikipedia_client.summary, title, sentences=sentences, auto_suggest=auto_suggest,
+                                 lang=lang, key=(lang, title.lower(), sentences, auto_suggest))